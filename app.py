@@ -1,12 +1,41 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import plotly.graph_objects as go
-from PIL import Image
 import numpy as np
-import math
-import os
-from io import BytesIO
+import time
+from datetime import datetime
+
+from paperbag import (
+    CALCULATOR,
+    DEFAULT_PLANO_CATALOG,
+    GRAIN_DIRECTIONS,
+    LOD_LEVELS,
+    METRICS_PATH,
+    SWEEP_METRICS,
+    BulkQuote,
+    LayoutConstraints,
+    Pipeline,
+    ProductionRules,
+    allocate_gang_costs,
+    bag_frontier,
+    batch_run_size,
+    build_mockup,
+    draw_pattern,
+    is_paper,
+    default_store,
+    export_geometry,
+    metrics,
+    parse_quantities,
+    pattern_geometry,
+    pattern_size,
+    plan_gang_run,
+    prepare_artwork,
+    read_upload,
+    render_plano_layout,
+    restyle_mockup,
+    sensitivity_grid,
+    sensitivity_heatmap,
+    spec_hash,
+    tile_geometry,
+)
 
 # ==========================================
 # PAGE CONFIG
@@ -16,20 +45,51 @@ st.set_page_config(
     page_icon="🛍️",
     layout="wide"
 )
+rerun_start = time.perf_counter()
 
 # ==========================================
 # SESSION STATE INIT
 # ==========================================
+# Cost catalogs, layouts and quotes persist across sessions and restarts
+store = default_store()
+
 if 'cost_items' not in st.session_state:
-    st.session_state.cost_items = [
-        {"nama": "Kertas Ivory 250gr", "basis": "Per Lembar Plano", "harga": 5000, "batch": 1},
+    st.session_state.cost_items = store.load_catalog("cost_items_id", [
+        {"nama": "Kertas Ivory 250gr", "basis": "Per Lembar Plano", "harga": 5000, "batch": 1, "paper": True},
         {"nama": "Ongkos Cetak Offset", "basis": "Per Batch (Kelipatan Pcs)", "harga": 450000, "batch": 2000},
         {"nama": "Tali Kur & Pasang", "basis": "Per Pcs Tas", "harga": 700, "batch": 1}
-    ]
+    ])
+
+if 'plano_catalog' not in st.session_state:
+    st.session_state.plano_catalog = store.load_catalog(
+        "plano_catalog_id", [dict(sheet) for sheet in DEFAULT_PLANO_CATALOG]
+    )
+
+if 'processes' not in st.session_state:
+    st.session_state.processes = store.load_catalog("processes_id", [
+        {"nama": "Cetak Offset", "make_ready": 100, "spoilage": 2.0},
+        {"nama": "Laminasi", "make_ready": 20, "spoilage": 1.0},
+        {"nama": "Pond (Die-Cut)", "make_ready": 30, "spoilage": 1.5},
+        {"nama": "Lem & Finishing", "make_ready": 0, "spoilage": 1.0}
+    ])
+
+# Widgets in skipped tabs are not rendered and Streamlit drops the state of
+# unrendered widgets, so their values are kept in session state instead
+for key, default in {
+    "bag_color": "#D3D3D3",
+    "mockup_lod": "medium",
+    "handle_color": "#222222",
+    "wi_axes": "P × T",
+    "wi_metric": "pcs_per_plano",
+    "wi_span": 5.0,
+    "wi_res": 150,
+}.items():
+    st.session_state[key] = st.session_state.get(key, default)
 
 # ==========================================
 # SIDEBAR - INPUTS
 # ==========================================
+inputs_start = time.perf_counter()
 st.sidebar.title("🛍️ Paper Bag Calculator")
 st.sidebar.markdown("---")
 
@@ -46,8 +106,14 @@ qty = st.sidebar.number_input("Quantity Order (pcs)", value=1000, min_value=1, s
 
 st.sidebar.markdown("---")
 st.sidebar.header("📄 Ukuran Plano")
-plano_w = st.sidebar.number_input("Lebar Plano (cm)", value=109.0, min_value=10.0, step=1.0)
-plano_h = st.sidebar.number_input("Tinggi Plano (cm)", value=79.0, min_value=10.0, step=1.0)
+use_catalog = st.sidebar.checkbox(
+    "Pilih Plano Termurah dari Katalog",
+    value=False,
+    help="Coba semua ukuran di Katalog Plano (tab Settings) dan pakai yang total biayanya paling murah"
+)
+if not use_catalog:
+    plano_w = st.sidebar.number_input("Lebar Plano (cm)", value=109.0, min_value=10.0, step=1.0)
+    plano_h = st.sidebar.number_input("Tinggi Plano (cm)", value=79.0, min_value=10.0, step=1.0)
 
 # Margin Plano
 st.sidebar.subheader("Margin Bahan (cm)")
@@ -56,93 +122,117 @@ m_bottom = st.sidebar.number_input("Margin Bawah", value=1.0, min_value=0.0, ste
 m_left = st.sidebar.number_input("Margin Kiri", value=1.5, min_value=0.0, step=0.5)
 m_right = st.sidebar.number_input("Margin Kanan", value=1.5, min_value=0.0, step=0.5)
 
+# Press rules
+st.sidebar.subheader("Aturan Cetak")
+grain_labels = {None: "Bebas (boleh diputar)", "long": "Serat Panjang (long grain)", "short": "Serat Pendek (short grain)"}
+grain = st.sidebar.selectbox(
+    "Arah Serat Kertas", (None,) + GRAIN_DIRECTIONS, format_func=grain_labels.get,
+    help="Tinggi tas selalu searah serat kertas plano, jadi pola tidak diputar"
+)
+gripper = st.sidebar.number_input(
+    "Gripper (cm)", value=0.0, min_value=0.0, step=0.5,
+    help="Bagian tepi panjang plano yang dijepit mesin dan tidak bisa dicetak"
+)
+use_gutter = st.sidebar.checkbox(
+    "Gutter Bersama", value=False,
+    help="Pola bertetangga berbagi satu garis potong; margin di atas menjadi margin tepi plano"
+)
+gutter = st.sidebar.number_input("Lebar Gutter (cm)", value=0.3, min_value=0.0, step=0.1) if use_gutter else None
+
+# Production plan: make-ready, spoilage and overs on top of the good sheets
+st.sidebar.subheader("Rencana Produksi")
+use_plan = st.sidebar.checkbox(
+    "Hitung Make-Ready & Waste", value=False,
+    help="Tambahkan lembar make-ready per naik cetak, spoilage per proses dan overs ke kebutuhan plano"
+)
+production = None
+if use_plan:
+    overs = st.sidebar.number_input("Overs (%)", value=0.0, min_value=0.0, step=0.5, help="Tas lebih yang dicetak di atas quantity order")
+    run_size = st.sidebar.number_input(
+        "Pcs per Naik Cetak", value=batch_run_size(st.session_state.cost_items) or 0, min_value=0, step=500,
+        help="Order dipecah per jumlah ini, masing-masing dengan make-ready sendiri (0 = sekali naik cetak). "
+             "Awalnya batch terbesar di cost items 'Per Batch'."
+    )
+    with st.sidebar.expander("⚙️ Proses Produksi"):
+        processes = st.data_editor(
+            st.session_state.processes, num_rows="dynamic", key="process_editor",
+            column_config={
+                "nama": st.column_config.TextColumn("Proses", required=True),
+                "make_ready": st.column_config.NumberColumn("Make-Ready (lembar/naik)", min_value=0, step=1),
+                "spoilage": st.column_config.NumberColumn("Spoilage (%)", min_value=0.0, step=0.5),
+            }
+        )
+        if processes != st.session_state.processes:
+            st.session_state.processes = processes
+            store.save_catalog("processes_id", processes)
+    production = ProductionRules(processes, overs, run_size or None)
+
+# Profit margin: read by the Pricing, What-If and Bulk Quote tabs alike
+st.sidebar.markdown("---")
+st.sidebar.header("📈 Profit Margin")
+margin_type = st.sidebar.radio(
+    "Tipe Margin",
+    ["Persentase (%)", "Fix Total (Rp)", "Fix per Pcs (Rp)"]
+)
+margin_val = st.sidebar.number_input("Nilai Margin", value=30.0 if margin_type == "Persentase (%)" else 500000.0, min_value=0.0)
+metrics.observe_time("inputs", time.perf_counter() - inputs_start)
+
 # ==========================================
 # CALCULATIONS (BACKEND)
 # ==========================================
 
-# Pattern dimensions
-pola_w_net = lem + (2 * L) + (2 * P)
-pola_h_net = T + top_lip + (0.5 * P)
-area_cm2_per_pcs = pola_w_net * pola_h_net
-
-# Pattern with margins
-unit_w = pola_w_net + m_left + m_right
-unit_h = pola_h_net + m_top + m_bottom
-
-# Plano optimization
-def optimize_plano(PL_W, PL_H, U_W, U_H):
-    def check_layout(W_canvas, H_canvas, W_item, H_item):
-        cols = W_canvas // W_item
-        rows = H_canvas // H_item
-        rects = []
-        for r in range(int(rows)):
-            for c in range(int(cols)):
-                rects.append({
-                    'x': c * W_item, 
-                    'y': r * H_item, 
-                    'w': W_item, 
-                    'h': H_item, 
-                    'rot': False
-                })
-        
-        # Remainder space (rotated)
-        sisa_w = W_canvas - (cols * W_item)
-        if sisa_w >= H_item:
-            c_sisa = sisa_w // H_item
-            r_sisa = H_canvas // W_item
-            for r in range(int(r_sisa)):
-                for c in range(int(c_sisa)):
-                    rects.append({
-                        'x': (cols * W_item) + (c * H_item),
-                        'y': r * W_item,
-                        'w': H_item,
-                        'h': W_item,
-                        'rot': True
-                    })
-        return rects
-    
-    res1 = check_layout(PL_W, PL_H, U_W, U_H)
-    res2 = check_layout(PL_H, PL_W, U_W, U_H)
-    
-    if len(res1) >= len(res2):
-        return res1, PL_W, PL_H
-    else:
-        return res2, PL_H, PL_W
-
-layout_positions, final_plano_w, final_plano_h = optimize_plano(plano_w, plano_h, unit_w, unit_h)
-pcs_per_plano = len(layout_positions)
+# One dependency graph per session: only nodes downstream of a changed input run again
+if 'pipeline' not in st.session_state:
+    st.session_state.pipeline = Pipeline(CALCULATOR)
+pipe = st.session_state.pipeline
+
+layout_rules = LayoutConstraints(grain, gripper, gutter, margins=(m_top, m_bottom, m_left, m_right))
+pipe.update(
+    P=P, L=L, T=T, lem=lem, top_lip=top_lip, qty=qty,
+    m_top=m_top, m_bottom=m_bottom, m_left=m_left, m_right=m_right,
+    layout_rules=layout_rules, production=production,
+    margin_type=margin_type, margin_val=margin_val,
+    # Catalog mode: cheapest stock sheet, paper price taken from the catalog
+    plano_catalog=list(st.session_state.plano_catalog) if use_catalog else None,
+    plano_w=None if use_catalog else plano_w,
+    plano_h=None if use_catalog else plano_h,
+    base_cost_items=list(st.session_state.cost_items),
+    paper_item=("nama", "harga", "Kertas Plano", "Per Lembar Plano"),
+    subtotal_label="Subtotal (Rp)",
+)
+
+# Pattern dimensions, and pattern with margins (or bare pattern with shared gutters)
+pola_w_net, pola_h_net = pipe.get("pattern")
+area_cm2_per_pcs = pipe.get("area")
+unit_w, unit_h = pipe.get("unit")
+# Offset of the printed pattern inside its unit (drawings, die-lines)
+piece_left, piece_bottom, piece_top = (0.0, 0.0, 0.0) if use_gutter else (m_left, m_bottom, m_top)
+
+if pipe.get("sheet") is None:
+    st.error("⚠️ Ukuran pola lebih besar dari semua plano di katalog!")
+    st.stop()
+plano_w, plano_h = pipe.get("sheet")
+plano_ranking = pipe.get("plano_ranking") or []
+cost_items = pipe.get("cost_items")
+if use_catalog:
+    best_plano = plano_ranking[0]
+
+# Plano optimization: grid layout now, guillotine search on the shared worker pool
+with metrics.stage("layout"):
+    layout_positions, final_plano_w, final_plano_h = pipe.get("layout")
+pcs_per_plano = pipe.get("pcs_per_plano")
 
 if pcs_per_plano == 0:
     st.error("⚠️ Ukuran pola lebih besar dari plano! Sesuaikan dimensi atau ukuran plano.")
     st.stop()
 
-total_plano_req = math.ceil(qty / pcs_per_plano)
-efficiency = (pcs_per_plano * unit_w * unit_h) / (final_plano_w * final_plano_h) * 100
+# Production plan: good sheets plus overs, make-ready and spoilage per process
+plan = pipe.get("plan")
+total_plano_req = pipe.get("total_plano_req")
+efficiency = pipe.get("efficiency")
 
 # Cost calculation
-total_production_cost = 0
-breakdown_biaya = []
-
-for item in st.session_state.cost_items:
-    subtotal = 0
-    if item['basis'] == "Per Pesanan (Tetap)":
-        subtotal = item['harga']
-    elif item['basis'] == "Per Lembar Plano":
-        subtotal = item['harga'] * total_plano_req
-    elif item['basis'] == "Per Pcs Tas":
-        subtotal = item['harga'] * qty
-    elif item['basis'] == "Per Area (cm2)":
-        subtotal = item['harga'] * area_cm2_per_pcs * qty
-    elif item['basis'] == "Per Batch (Kelipatan Pcs)":
-        jumlah_batch = math.ceil(qty / item['batch'])
-        subtotal = item['harga'] * jumlah_batch
-    
-    total_production_cost += subtotal
-    breakdown_biaya.append({
-        "Item": item['nama'],
-        "Basis": item['basis'],
-        "Subtotal (Rp)": f"{subtotal:,.0f}"
-    })
+total_production_cost, breakdown_biaya = pipe.get("costs")
 
 # ==========================================
 # MAIN APP - TABS
@@ -150,379 +240,624 @@ for item in st.session_state.cost_items:
 st.title("🛍️ Paper Bag Production Calculator")
 st.markdown("**Professional Paper Bag Cost Estimation & Pattern Generator**")
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
+# Background layout search: poll it and rerun everything once it lands (whichever tab is open)
+@st.fragment(run_every=0.5)
+def layout_search_status():
+    if st.session_state.pipeline.last("layout_job").done():
+        st.rerun()
+    st.caption("🔄 Mencari layout plano yang lebih rapat... (sementara memakai layout grid)")
+
+if not pipe.last("layout_job").done():
+    layout_search_status()
+
+# Only the open tab runs (on_change="rerun"); the others are skipped entirely
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
     "💰 Pricing", 
     "📐 Pattern 2D", 
     "📦 Plano Layout", 
     "🎨 3D Mockup",
+    "🔥 What-If",
+    "📥 Bulk Quote",
     "⚙️ Settings"
-])
+], key="main_tab", on_change="rerun")
 
 # ==========================================
 # TAB 1: PRICING
 # ==========================================
 with tab1:
-    st.header("💰 Kalkulasi Harga Produksi")
-    
-    # Quick Info
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Pattern Size", f"{pola_w_net:.1f} × {pola_h_net:.1f} cm")
-    col2.metric("Pcs/Plano", f"{pcs_per_plano} pcs")
-    col3.metric("Total Plano", f"{total_plano_req} sheets")
-    col4.metric("Efficiency", f"{efficiency:.1f}%")
-    
-    st.markdown("---")
-    
-    # Profit Margin
-    st.subheader("📈 Profit Margin")
-    col_m1, col_m2 = st.columns(2)
-    
-    margin_type = col_m1.radio(
-        "Tipe Margin",
-        ["Persentase (%)", "Fix Total (Rp)", "Fix per Pcs (Rp)"]
-    )
-    
-    margin_val = col_m2.number_input("Nilai Margin", value=30.0 if margin_type == "Persentase (%)" else 500000.0, min_value=0.0)
-    
-    # Calculate profit
-    if margin_type == "Persentase (%)":
-        total_profit = total_production_cost * (margin_val / 100)
-    elif margin_type == "Fix Total (Rp)":
-        total_profit = margin_val
-    else:  # Fix per Pcs
-        total_profit = margin_val * qty
-    
-    total_selling_price = total_production_cost + total_profit
-    unit_price = total_selling_price / qty
-    
-    st.markdown("---")
-    
-    # Results
-    st.subheader("📊 Hasil Kalkulasi")
-    res1, res2, res3, res4 = st.columns(4)
-    
-    res1.metric(
-        "Biaya Produksi",
-        f"Rp {total_production_cost:,.0f}",
-        help="Total biaya material & produksi"
-    )
-    
-    res2.metric(
-        "Profit",
-        f"Rp {total_profit:,.0f}",
-        delta=f"{(total_profit/total_production_cost*100):.1f}% margin"
-    )
-    
-    res3.metric(
-        "Harga Jual",
-        f"Rp {total_selling_price:,.0f}",
-        help="Total yang dibayar customer"
-    )
-    
-    res4.metric(
-        "Harga per Pcs",
-        f"Rp {unit_price:,.0f}"
-    )
-    
-    # Breakdown
-    with st.expander("📋 Detail Breakdown Biaya"):
-        st.table(breakdown_biaya)
+    if tab1.open:
+        st.header("💰 Kalkulasi Harga Produksi")
+        
+        # Quick Info
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Pattern Size", f"{pola_w_net:.1f} × {pola_h_net:.1f} cm")
+        col2.metric("Pcs/Plano", f"{pcs_per_plano} pcs")
+        col3.metric(
+            "Total Plano", f"{total_plano_req} sheets",
+            help=f"{int(plan['net_sheets'])} lembar jadi + make-ready & spoilage" if production else None
+        )
+        col4.metric("Efficiency", f"{efficiency:.1f}%")
+        
+        # Catalog winner
+        if use_catalog:
+            st.success(f"🏆 Plano termurah: **{best_plano['name']} cm** @ Rp {best_plano['price']:,.0f}/lembar")
+            with st.expander("📄 Perbandingan Ukuran Plano"):
+                st.table([{
+                    "Plano (cm)": r['name'],
+                    "Harga/Lembar (Rp)": f"{r['price']:,.0f}",
+                    "Pcs/Plano": r['pcs_per_plano'],
+                    "Total Plano": r['total_plano_req'],
+                    "Efficiency": f"{r['efficiency']:.1f}%",
+                    "Biaya Produksi (Rp)": f"{r['production_cost']:,.0f}"
+                } for r in plano_ranking])
+        
+        if production:
+            with st.expander("🏭 Rencana Produksi"):
+                pl1, pl2, pl3, pl4 = st.columns(4)
+                pl1.metric("Tas Dicetak", f"{int(plan['good_pcs']):,} pcs", help="Quantity order + overs")
+                pl2.metric("Lembar Jadi", f"{int(plan['net_sheets']):,}")
+                pl3.metric("Naik Cetak", f"{int(plan['runs'])}×")
+                pl4.metric("Lembar per Naik", f"{int(plan['sheets_per_run']):,}")
+                st.table([{
+                    "Proses": name,
+                    "Make-Ready (lembar)": f"{mr:,}",
+                    "Spoilage (lembar)": f"{sp:,}",
+                } for name, mr, sp in zip(production.names, plan['make_ready'].tolist(), plan['spoilage'].tolist())])
+                st.caption(
+                    f"Total {total_plano_req:,} lembar plano: {int(plan['net_sheets']):,} jadi + "
+                    f"{int(plan['make_ready'].sum()):,} make-ready + {int(plan['spoilage'].sum()):,} spoilage. "
+                    "Spoilage dihitung mundur dari proses terakhir."
+                )
+        
+        st.markdown("---")
+        
+        # Calculate profit: a margin change only re-runs these two nodes
+        total_profit = pipe.get("profit")
+        total_selling_price, unit_price = pipe.get("price")
+        
+        st.markdown("---")
+        
+        # Results
+        st.subheader("📊 Hasil Kalkulasi")
+        res1, res2, res3, res4 = st.columns(4)
+        
+        res1.metric(
+            "Biaya Produksi",
+            f"Rp {total_production_cost:,.0f}",
+            help="Total biaya material & produksi"
+        )
+        
+        res2.metric(
+            "Profit",
+            f"Rp {total_profit:,.0f}",
+            delta=f"{(total_profit/total_production_cost*100):.1f}% margin"
+        )
+        
+        res3.metric(
+            "Harga Jual",
+            f"Rp {total_selling_price:,.0f}",
+            help="Total yang dibayar customer"
+        )
+        
+        res4.metric(
+            "Harga per Pcs",
+            f"Rp {unit_price:,.0f}"
+        )
+        
+        # Breakdown
+        with st.expander("📋 Detail Breakdown Biaya"):
+            st.table(breakdown_biaya)
+        
+        # Quote history, looked up by spec hash
+        quote_spec = dict(
+            P=P, L=L, T=T, qty=qty, plano_w=plano_w, plano_h=plano_h, lem=lem, top_lip=top_lip,
+            m_top=m_top, m_bottom=m_bottom, m_left=m_left, m_right=m_right
+        )
+        quote_spec["layout_rules"] = list(layout_rules.key())
+        if production:
+            quote_spec["production"] = list(production.key())
+        previous_quote = store.find_quote(spec_hash(quote_spec, cost_items, margin_type, margin_val))
+        if previous_quote:
+            st.caption(
+                f"🗂️ Spesifikasi ini pernah dikutip {datetime.fromtimestamp(previous_quote['created']):%d %b %Y %H:%M}: "
+                f"Rp {previous_quote['result']['unit_price']:,.0f}/pcs"
+            )
+        if st.button("💾 Simpan Quote", key="save_quote"):
+            store.save_quote(quote_spec, {
+                "pcs_per_plano": pcs_per_plano,
+                "total_plano_req": total_plano_req,
+                "production_cost": total_production_cost,
+                "selling_price": total_selling_price,
+                "unit_price": unit_price
+            }, cost_items, margin_type, margin_val)
+            st.success("✅ Quote disimpan")
+        
+        with st.expander("🗂️ Riwayat Quote"):
+            st.table([{
+                "Tanggal": f"{datetime.fromtimestamp(q['created']):%d %b %Y %H:%M}",
+                "P×L×T (cm)": f"{q['spec']['P']:g}×{q['spec']['L']:g}×{q['spec']['T']:g}",
+                "Qty": f"{q['spec']['qty']:,}",
+                "Harga Jual (Rp)": f"{q['result']['selling_price']:,.0f}",
+                "Harga per Pcs (Rp)": f"{q['result']['unit_price']:,.0f}"
+            } for q in store.recent_quotes(20)])
+        
+        # Price breaks over many quantities, one vectorized pass
+        with st.expander("📉 Price Break per Quantity"):
+            pb_text = st.text_input("Quantity (pisahkan dengan koma)", "1000, 2000, 5000, 10000, 20000", key="pb_qtys")
+            pipe.update(pb_qtys=parse_quantities(pb_text))
+            price_breaks = pipe.get("price_breaks")
+        
+            if price_breaks:
+                pb, pb_fill = price_breaks['table'], price_breaks['fill']
+                st.table([{
+                    "Qty": f"{q:,}",
+                    "Total Plano": f"{sheets:,}",
+                    "Harga Jual (Rp)": f"{total:,.0f}",
+                    "Harga per Pcs (Rp)": f"{unit:,.0f}",
+                    "Qty Penuh (plano sama)": f"{fill:,}"
+                } for q, sheets, total, unit, fill in zip(
+                    pb['qty'].tolist(), pb['total_plano_req'].tolist(),
+                    pb['selling_price'].tolist(), pb['unit_price'].tolist(), pb_fill.tolist()
+                )])
+            
+                # Curve: evenly spaced points plus both sides of every batch step
+                step_qty, step_kind, curve = price_breaks['step_qty'], price_breaks['step_kind'], price_breaks['curve']
+                st.line_chart({"Qty": curve['qty'], "Harga per Pcs (Rp)": curve['unit_price']}, x="Qty", y="Harga per Pcs (Rp)")
+            
+                if len(step_qty):
+                    st.caption("Harga per pcs naik mulai qty berikut (batch cetak baru); qty tepat sebelumnya paling hemat:")
+                    st.table([{
+                        "Qty Hemat": f"{q - 1:,}",
+                        "Batch Baru Mulai": f"{q:,}",
+                        "Pemicu": kind
+                    } for q, kind in zip(step_qty.tolist(), step_kind.tolist())])
+        
+        # Inverse: what fits a target price
+        with st.expander("🎯 Cari Ukuran dari Target Harga per Pcs"):
+            target_price = st.number_input("Target Harga per Pcs (Rp)", value=float(round(unit_price)), min_value=0.0, step=100.0, key="inv_target")
+        
+            pipe.update(target_price=target_price)
+            min_q = pipe.get("min_qty")
+            if min_q is None:
+                st.info("Ukuran saat ini tidak mencapai target sampai 200,000 pcs.")
+            else:
+                st.info(f"Ukuran saat ini ({P:g}×{L:g}×{T:g} cm) mencapai target mulai **{min_q:,} pcs**.")
+        
+            inv1, inv2, inv3 = st.columns(3)
+            inv_P = inv1.slider("Rentang P (cm)", 5.0, 60.0, (5.0, 40.0), step=0.5, key="inv_P")
+            inv_L = inv2.slider("Rentang L (cm)", 3.0, 30.0, (3.0, 20.0), step=0.5, key="inv_L")
+            inv_T = inv3.slider("Rentang T (cm)", 5.0, 60.0, (5.0, 45.0), step=0.5, key="inv_T")
+            inv_qtys = parse_quantities(st.text_input("Quantity yang dicoba", f"{qty}", key="inv_qtys")) or [qty]
+        
+            if st.button("🔍 Cari Ukuran", key="inv_search"):
+                front = bag_frontier(
+                    cost_items, inv_P, inv_L, inv_T, inv_qtys,
+                    margin_type=margin_type, margin_val=margin_val,
+                    plano_w=plano_w, plano_h=plano_h, lem=lem, top_lip=top_lip,
+                    m_top=m_top, m_bottom=m_bottom, m_left=m_left, m_right=m_right,
+                    constraints=layout_rules, production=production
+                )
+                fits = front['unit_price'] <= target_price
+                if not fits.any():
+                    st.warning("Tidak ada ukuran dalam rentang yang mencapai target harga.")
+                else:
+                    st.success(f"Tas terbesar dalam target: **{front['P'][fits][-1]:g}×{front['L'][fits][-1]:g}×{front['T'][fits][-1]:g} cm** @ {front['qty'][fits][-1]:,} pcs")
+                st.caption("Pareto: tiap baris lebih besar dari baris sebelumnya dengan harga per pcs lebih tinggi (layout grid, estimasi atas).")
+                st.table([{
+                    "P×L×T (cm)": f"{p:g}×{l:g}×{t:g}",
+                    "Volume (L)": f"{v / 1000:.2f}",
+                    "Qty": f"{q:,}",
+                    "Pcs/Plano": n,
+                    "Harga per Pcs (Rp)": f"{u:,.0f}"
+                } for p, l, t, v, q, n, u in zip(
+                    front['P'][fits].tolist(), front['L'][fits].tolist(), front['T'][fits].tolist(),
+                    front['volume_cm3'][fits].tolist(), front['qty'][fits].tolist(),
+                    front['pcs_per_plano'][fits].tolist(), front['unit_price'][fits].tolist()
+                )])
 
 # ==========================================
 # TAB 2: PATTERN 2D
 # ==========================================
 with tab2:
-    st.header("📐 Pola Paper Bag 2D")
-    
-    if st.button("🎨 Generate Pattern", key="gen_pattern"):
-        with st.spinner("Generating 2D pattern..."):
-            # Coordinates
-            x = [0]
-            for width in [lem, L, P, L, P]:
-                x.append(x[-1] + width)
-            
-            y_actual_top = T + top_lip
-            y_top_fold = T
-            y_green = 0.5 * L
-            y_base = 0
-            y_bottom = -(0.5 * P)
-            
-            y_hole_upper = T + (top_lip / 2)
-            y_hole_lower = T - (top_lip / 2)
-            
-            v_mids = [(x[1] + x[2]) / 2, (x[3] + x[4]) / 2]
-            p_panels = [(x[2], x[3]), (x[4], x[5])]
-            
-            # Plot
-            fig, ax = plt.subplots(figsize=(12, 8))
-            
-            # Vertical lines
-            for val_x in x:
-                ax.plot([val_x, val_x], [y_bottom, y_actual_top], color='black', lw=1)
-            
-            # Horizontal lines
-            ax.plot([x[0], x[-1]], [y_actual_top, y_actual_top], color='black', lw=1.5)
-            ax.plot([x[0], x[-1]], [y_top_fold, y_top_fold], color='black', ls='--', lw=1.2, label='Fold line (T)')
-            ax.plot([x[0], x[-1]], [y_bottom, y_bottom], color='black', lw=1.5)
-            ax.plot([x[0], x[-1]], [y_base, y_base], color='gray', ls=':', alpha=0.5)
-            ax.plot([x[0], x[-1]], [y_green, y_green], color='green', ls='--', lw=1, label='Gusset')
-            
-            # Gusset verticals
-            ax.plot([v_mids[0], v_mids[0]], [y_green, y_actual_top], color='blue', lw=1.5)
-            ax.plot([v_mids[1], v_mids[1]], [y_green, y_actual_top], color='blue', lw=1.5)
-            
-            # Holes
-            hole_size = 0.35
-            for p_start, p_end in p_panels:
-                h1_x = p_start + (0.25 * P)
-                h2_x = p_start + (0.75 * P)
-                for h_x in [h1_x, h2_x]:
-                    up_circ = plt.Circle((h_x, y_hole_upper), hole_size, color='blue', fill=False, lw=1.5)
-                    low_circ = plt.Circle((h_x, y_hole_lower), hole_size, color='blue', fill=False, lw=1.5)
-                    ax.add_patch(up_circ)
-                    ax.add_patch(low_circ)
-            
-            # Diagonals
-            p_mid1 = (x[2] + x[3]) / 2
-            p_mid2 = (x[4] + x[5]) / 2
-            
-            ax.plot([v_mids[0], x[0]], [y_green, y_green - (v_mids[0] - x[0])], color='red', lw=2)
-            ax.plot([v_mids[0], p_mid1], [y_green, y_bottom], color='red', lw=2)
-            ax.plot([p_mid1, v_mids[1]], [y_bottom, y_green], color='red', lw=2)
-            ax.plot([v_mids[1], p_mid2], [y_green, y_bottom], color='red', lw=2)
-            ax.plot([p_mid2, x[5]], [y_bottom, y_base], color='red', lw=2)
-            
-            ax.set_aspect('equal')
-            ax.set_title(f"Paper Bag Pattern: {P}×{L}×{T} cm", fontsize=14, fontweight='bold')
-            ax.set_xlabel("Width (cm)")
-            ax.set_ylabel("Height (cm)")
-            ax.grid(True, which='both', linestyle=':', alpha=0.3)
-            ax.legend()
-            
-            st.pyplot(fig)
-            
-            st.success(f"✅ Pattern generated: {pola_w_net:.1f} × {pola_h_net:.1f} cm")
+    if tab2.open:
+        st.header("📐 Pola Paper Bag 2D")
+        
+        if st.button("🎨 Generate Pattern", key="gen_pattern"):
+            with st.spinner("Generating 2D pattern..."):
+                fig = draw_pattern(P, L, T, lem, top_lip, title=f"Paper Bag Pattern: {P}×{L}×{T} cm")
+                
+                with metrics.stage("pyplot"):
+                    st.pyplot(fig)
+                
+                st.success(f"✅ Pattern generated: {pola_w_net:.1f} × {pola_h_net:.1f} cm")
+                
+                # Vector die-line for the die-maker
+                pattern_geom = pattern_geometry(P, L, T, lem, top_lip)
+                dl_cols = st.columns(3)
+                for col, fmt in zip(dl_cols, ("svg", "dxf", "pdf")):
+                    data, mime = export_geometry(pattern_geom, fmt)
+                    col.download_button(
+                        f"⬇️ Die-Line {fmt.upper()}", data,
+                        file_name=f"pola_{P:g}x{L:g}x{T:g}.{fmt}", mime=mime, key=f"dl_pattern_{fmt}"
+                    )
 
 # ==========================================
 # TAB 3: PLANO LAYOUT
 # ==========================================
 with tab3:
-    st.header("📦 Optimasi Layout Plano")
-    
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Pieces per Plano", f"{pcs_per_plano} pcs")
-    col2.metric("Total Plano Needed", f"{total_plano_req} sheets")
-    col3.metric("Material Efficiency", f"{efficiency:.1f}%")
-    
-    if st.button("🎨 Generate Layout", key="gen_plano"):
-        with st.spinner("Optimizing layout..."):
-            fig, ax = plt.subplots(figsize=(14, 10))
-            ax.set_aspect('equal')
-            
-            # Plano outline
-            ax.add_patch(patches.Rectangle(
-                (0, 0), final_plano_w, final_plano_h,
-                lw=3, edgecolor='black', facecolor='white'
-            ))
-            
-            # Draw each piece
-            for p in layout_positions:
-                # Material area (with margin)
-                ax.add_patch(patches.Rectangle(
-                    (p['x'], p['y']), p['w'], p['h'],
-                    lw=1, edgecolor='gray', ls='--',
-                    facecolor='#f0f0f0', alpha=0.5
-                ))
+    if tab3.open:
+        st.header("📦 Optimasi Layout Plano")
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Pieces per Plano", f"{pcs_per_plano} pcs")
+        col2.metric("Total Plano Needed", f"{total_plano_req} sheets")
+        col3.metric("Material Efficiency", f"{efficiency:.1f}%")
+        
+        if st.button("🎨 Generate Layout", key="gen_plano"):
+            with st.spinner("Optimizing layout..."):
+                layout_png = render_plano_layout(
+                    layout_positions, final_plano_w, final_plano_h,
+                    pola_w_net, pola_h_net, piece_left, piece_bottom, piece_top,
+                    title=f"Plano Layout: {pcs_per_plano} pcs on {final_plano_w}×{final_plano_h} cm sheet",
+                    gripper=gripper
+                )
+                st.image(layout_png)
                 
-                # Print area (net)
-                if not p['rot']:
-                    inner_x = p['x'] + m_left
-                    inner_y = p['y'] + m_bottom
-                    inner_w, inner_h = pola_w_net, pola_h_net
-                    color = 'skyblue'
-                else:
-                    inner_x = p['x'] + m_bottom
-                    inner_y = p['y'] + m_left
-                    inner_w, inner_h = pola_h_net, pola_w_net
-                    color = 'orange'
+                st.info(f"💡 Blue = Normal orientation | Orange = Rotated 90°")
+                st.success(f"✅ Efficiency: {efficiency:.1f}% | Waste: {100-efficiency:.1f}%")
                 
-                ax.add_patch(patches.Rectangle(
-                    (inner_x, inner_y), inner_w, inner_h,
-                    lw=1, edgecolor='blue', facecolor=color, alpha=0.7
-                ))
-            
-            ax.set_xlim(-5, final_plano_w + 5)
-            ax.set_ylim(-5, final_plano_h + 5)
-            ax.set_title(f"Plano Layout: {pcs_per_plano} pcs on {final_plano_w}×{final_plano_h} cm sheet", fontsize=14, fontweight='bold')
-            ax.set_xlabel("Width (cm)")
-            ax.set_ylabel("Height (cm)")
-            
-            st.pyplot(fig)
+                # Imposition: die-line tiled over every piece on the plano
+                plano_geom = tile_geometry(
+                    pattern_geometry(P, L, T, lem, top_lip), layout_positions,
+                    final_plano_w, final_plano_h, pola_w_net, pola_h_net, piece_left, piece_bottom, piece_top
+                )
+                dl_cols = st.columns(3)
+                for col, fmt in zip(dl_cols, ("svg", "dxf", "pdf")):
+                    data, mime = export_geometry(plano_geom, fmt)
+                    col.download_button(
+                        f"⬇️ Imposisi {fmt.upper()}", data,
+                        file_name=f"plano_{final_plano_w:g}x{final_plano_h:g}_{pcs_per_plano}pcs.{fmt}", mime=mime, key=f"dl_plano_{fmt}"
+                    )
+        
+        # Gang run: several bag sizes sharing one plano
+        st.markdown("---")
+        with st.expander("🧩 Gang Run (Beberapa Ukuran dalam Satu Plano)"):
+            st.caption("Lidah lem, lipatan atas, margin, plano dan cost items mengikuti pengaturan saat ini.")
+            gang_rows = st.data_editor(
+                [
+                    {"P": 15.0, "L": 8.0, "T": 20.0, "Qty": 1000},
+                    {"P": 20.0, "L": 10.0, "T": 25.0, "Qty": 500}
+                ],
+                num_rows="dynamic",
+                key="gang_skus"
+            )
             
-            st.info(f"💡 Blue = Normal orientation | Orange = Rotated 90°")
-            st.success(f"✅ Efficiency: {efficiency:.1f}% | Waste: {100-efficiency:.1f}%")
+            if st.button("🧩 Hitung Gang Run", key="gen_gang"):
+                gang_skus = []
+                for row in gang_rows:
+                    if not all(row.get(k) for k in ("P", "L", "T", "Qty")):
+                        continue
+                    g_w, g_h = pattern_size(row["P"], row["L"], row["T"], lem, top_lip)
+                    g_unit_w, g_unit_h = layout_rules.piece_size(g_w, g_h, m_top, m_bottom, m_left, m_right)
+                    gang_skus.append({
+                        "name": f"{row['P']:g}×{row['L']:g}×{row['T']:g}",
+                        "unit_w": g_unit_w,
+                        "unit_h": g_unit_h,
+                        "qty": int(row["Qty"]),
+                        "area_cm2_per_pcs": g_w * g_h
+                    })
+                
+                try:
+                    gang_plan = plan_gang_run(gang_skus, plano_w, plano_h, layout_rules) if gang_skus else None
+                except ValueError:
+                    gang_plan = None
+                    st.error("⚠️ Ada ukuran pola yang lebih besar dari plano!")
+                
+                if gang_plan:
+                    gang_costs = allocate_gang_costs(gang_plan, gang_skus, cost_items, subtotal_label="Subtotal (Rp)")
+                    
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Total Plano (Gang)", f"{gang_plan['total_plano_req']} sheets")
+                    col2.metric(
+                        "Total Plano (Terpisah)",
+                        f"{gang_plan['separate_plano_req']} sheets",
+                        delta=f"{gang_plan['separate_plano_req'] - gang_plan['total_plano_req']} sheets hemat"
+                    )
+                    col3.metric("Jumlah Plat", f"{len(gang_plan['runs'])}")
+                    
+                    st.table([{
+                        "Plat": f"#{n + 1}",
+                        "Isi per Plano": ", ".join(f"{gang_skus[i]['name']} × {run['per_sheet'][i]}" for i in run['skus']),
+                        "Plano": run['sheets']
+                    } for n, run in enumerate(gang_plan['runs'])])
+                    
+                    st.table([{
+                        "Ukuran (P×L×T)": sku['name'],
+                        "Qty": sku['qty'],
+                        "Alokasi Plano": f"{c['sheets']:,.1f}",
+                        "Biaya Produksi (Rp)": f"{c['production_cost']:,.0f}",
+                        "Biaya per Pcs (Rp)": f"{c['production_cost'] / sku['qty']:,.0f}"
+                    } for sku, c in zip(gang_skus, gang_costs)])
 
 # ==========================================
 # TAB 4: 3D MOCKUP
 # ==========================================
 with tab4:
-    st.header("🎨 3D Mockup Preview")
-    
-    col1, col2 = st.columns(2)
-    bag_color = col1.color_picker("Bag Color", "#D3D3D3")
-    handle_color = col2.color_picker("Handle Color", "#222222")
-    
-    if st.button("🎨 Generate 3D Mockup", key="gen_3d"):
-        with st.spinner("Rendering 3D mockup..."):
-            # Geometry
-            pinch = (L / 2) * 0.9
-            z_hole = T - 2.0
-            
-            def get_v(z_h, p_v):
-                return [
-                    [0, 0, z_h], [P, 0, z_h],
-                    [P - p_v, L/2, z_h], [P, L, z_h],
-                    [0, L, z_h], [p_v, L/2, z_h]
-                ]
-            
-            v_pts = get_v(0, pinch*0.5) + get_v(T, pinch)
-            vx = [v[0] for v in v_pts]
-            vy = [v[1] for v in v_pts]
-            vz = [v[2] for v in v_pts]
-            
-            fig = go.Figure()
-            
-            # Body mesh
-            def get_f(off_l, off_h):
-                f = []
-                for s in range(5):
-                    f.extend([
-                        [off_l+s, off_l+s+1, off_h+s+1],
-                        [off_l+s, off_h+s+1, off_h+s]
-                    ])
-                f.extend([
-                    [off_l+5, off_l+0, off_h+0],
-                    [off_l+5, off_h+0, off_h+5]
-                ])
-                return f
-            
-            faces = get_f(0, 6)
+    if tab4.open:
+        st.header("🎨 3D Mockup Preview")
+        
+        # Colour changes rerun only this fragment and restyle the kept figure;
+        # the mesh is rebuilt only when the bag size changes
+        @st.fragment
+        def mockup_view():
+            col1, col2 = st.columns(2)
+            bag_color = col1.color_picker("Bag Color", key="bag_color")
+            handle_color = col2.color_picker("Handle Color", key="handle_color")
+            col3, col4 = st.columns(2)
+            lod = col3.selectbox("Detail Mockup", list(LOD_LEVELS), key="mockup_lod")
+            art_file = col4.file_uploader("Artwork Depan", type=["png", "jpg", "jpeg"], key="mockup_art")
             
-            fig.add_trace(go.Mesh3d(
-                x=vx, y=vy, z=vz,
-                i=[f[0] for f in faces],
-                j=[f[1] for f in faces],
-                k=[f[2] for f in faces],
-                color=bag_color,
-                opacity=1.0,
-                flatshading=True,
-                name='Bag'
-            ))
+            if st.button("🎨 Generate 3D Mockup", key="gen_3d"):
+                st.session_state.show_mockup = True
             
-            # Handles
-            def handle(y_p, name):
-                hx, hz = [], []
-                for s in range(21):
-                    t = s / 20
-                    hx.append(P*0.25 + (P*0.5)*t)
-                    hz.append(z_hole + 6 * math.sin(math.pi * t))
-                fig.add_trace(go.Scatter3d(
-                    x=hx, y=[y_p]*21, z=hz,
-                    mode='lines',
-                    line=dict(color=handle_color, width=7),
-                    name=name
-                ))
+            if st.session_state.get("show_mockup"):
+                art_id = art_file.file_id if art_file is not None else None
+                if st.session_state.get("mockup_dims") != (P, L, T, lod, art_id):
+                    artwork = prepare_artwork(art_file.getvalue(), lod) if art_file is not None else None
+                    st.session_state.mockup_fig = build_mockup(P, L, T, 1.0, "cm", lod, artwork)
+                    st.session_state.mockup_dims = (P, L, T, lod, art_id)
+                fig = restyle_mockup(st.session_state.mockup_fig, bag_color, handle_color)
+                if metrics.enabled:
+                    metrics.observe_bytes("mockup_json", len(fig.to_json()))
+                with metrics.stage("plotly_mockup"):
+                    st.plotly_chart(fig, use_container_width=True)
+        
+        mockup_view()
+
+# ==========================================
+# TAB 5: WHAT-IF
+# ==========================================
+with tab5:
+    if tab5.open:
+        st.header("🔥 Analisa Sensitivitas")
+        
+        sweep_axes = {
+            "P × T": ("P", "T"),
+            "P × L": ("P", "L"),
+            "L × T": ("L", "T"),
+            "Lebar × Tinggi Plano": ("plano_w", "plano_h"),
+        }
+        wi1, wi2, wi3, wi4 = st.columns(4)
+        axes_label = wi1.selectbox("Sumbu", list(sweep_axes), key="wi_axes")
+        metric = wi2.selectbox("Tampilkan", list(SWEEP_METRICS), format_func=SWEEP_METRICS.get, key="wi_metric")
+        span = wi3.number_input("Rentang (± cm)", min_value=0.5, step=0.5, key="wi_span")
+        res = wi4.slider("Titik per Sumbu", 50, 300, step=10, key="wi_res")
+        
+        base_spec = dict(
+            P=P, L=L, T=T, qty=qty, plano_w=plano_w, plano_h=plano_h, lem=lem, top_lip=top_lip,
+            m_top=m_top, m_bottom=m_bottom, m_left=m_left, m_right=m_right
+        )
+        x_name, y_name = sweep_axes[axes_label]
+        x0, y0 = base_spec[x_name], base_spec[y_name]
+        grid = sensitivity_grid(
+            base_spec,
+            x_name, np.linspace(max(1.0, x0 - span), x0 + span, res),
+            y_name, np.linspace(max(1.0, y0 - span), y0 + span, res),
+            cost_items, margin_type, margin_val, constraints=layout_rules, production=production
+        )
+        heatmap = sensitivity_heatmap(grid, metric, f"{x_name} (cm)", f"{y_name} (cm)", marker=(x0, y0))
+        if metrics.enabled:
+            metrics.observe_bytes("what_if_json", len(heatmap.to_json()))
+        with metrics.stage("plotly_what_if"):
+            st.plotly_chart(heatmap, use_container_width=True)
+        
+        # Nearest point that gets more pieces out of the same sheet
+        X, Y = np.meshgrid(grid['x'], grid['y'])
+        pcs_grid = np.nan_to_num(grid['pcs_per_plano'])
+        pcs_here = pcs_grid[np.abs(grid['y'] - y0).argmin(), np.abs(grid['x'] - x0).argmin()]
+        better = pcs_grid > pcs_here
+        if better.any():
+            dist = np.where(better, np.hypot(X - x0, Y - y0), np.inf)
+            iy, ix = np.unravel_index(dist.argmin(), dist.shape)
+            st.info(
+                f"💡 {x_name} {grid['x'][ix]:.1f} × {y_name} {grid['y'][iy]:.1f} cm → "
+                f"**{int(pcs_grid[iy, ix])} pcs/plano** (sekarang {int(pcs_here)}), "
+                f"harga per pcs Rp {grid['unit_price'][iy, ix]:,.0f}"
+            )
+        st.caption(f"{res * res:,} titik, layout grid (tanpa optimasi guillotine).")
+
+# ==========================================
+# TAB 6: BULK QUOTE
+# ==========================================
+with tab6:
+    if tab6.open:
+        st.header("📥 Bulk Quote dari RFQ")
+        st.caption(
+            "Spreadsheet RFQ (CSV, JSONL atau Excel) dengan kolom P, L, T dan qty. Kolom plano_w, plano_h, "
+            "lem, top_lip dan m_* opsional; yang kosong, cost items, margin dan aturan cetak mengikuti pengaturan saat ini."
+        )
+        
+        upload = st.file_uploader("File RFQ", type=["csv", "jsonl", "xlsx"], key="bulk_file")
+        bq1, bq2 = st.columns([3, 1], vertical_alignment="bottom")
+        bulk_method = bq1.selectbox(
+            "Metode Layout", ["grid", "guillotine"], key="bulk_method",
+            format_func={"grid": "Grid (cepat)", "guillotine": "Guillotine (cepat jika ukuran berulang)"}.get
+        )
+        if bq2.button("▶️ Proses", key="bulk_run", type="primary", disabled=upload is None, use_container_width=True):
+            if st.session_state.get('bulk') is not None:
+                st.session_state.bulk.close()
+            bulk = st.session_state.bulk = BulkQuote()
+            st.session_state.bulk_name = upload.name.rsplit(".", 1)[0]
+            st.session_state.bulk_page = 1
+            progress = st.progress(0.0, text="Membaca file...")
+            preview = st.empty()
+            bulk_defaults = dict(
+                plano_w=plano_w, plano_h=plano_h, lem=lem, top_lip=top_lip,
+                m_top=m_top, m_bottom=m_bottom, m_left=m_left, m_right=m_right
+            )
+            try:
+                # Chunks are quoted and spooled to disk one at a time; only the newest page is shown
+                for count in bulk.run(
+                    read_upload(upload, upload.name), cost_items, margin_type, margin_val, bulk_method,
+                    defaults=bulk_defaults, constraints=layout_rules, production=production
+                ):
+                    progress.progress(min(upload.tell() / max(upload.size, 1), 1.0), text=f"{count:,} baris diproses...")
+                    preview.dataframe(bulk.page(bulk.pages - 1), use_container_width=True)
+            except (ValueError, KeyError, ImportError) as e:
+                st.error(f"⚠️ File tidak bisa diproses: {e}")
+            progress.empty()
+            preview.empty()
+        
+        bulk = st.session_state.get('bulk')
+        if bulk is not None and bulk.count:
+            if not bulk.done:
+                st.warning("⚠️ Proses terhenti sebelum selesai, hasil di bawah belum lengkap.")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Baris", f"{bulk.count:,}")
+            col2.metric("Valid", f"{bulk.valid:,}")
+            page_no = col3.number_input("Halaman", min_value=1, max_value=bulk.pages, step=1, key="bulk_page")
+            st.dataframe(bulk.page(page_no - 1), use_container_width=True)
+            st.caption(f"Halaman {page_no:,} dari {bulk.pages:,}, {bulk.page_size} baris per halaman.")
+            if bulk.rejected:
+                st.caption(f"⚠️ {bulk.rejected:,} baris ditolak (spesifikasi kosong atau bukan angka), alasan di kolom `error`.")
+            st.download_button(
+                "⬇️ Download Hasil (CSV)", bulk.open, file_name=f"{st.session_state.bulk_name}_quotes.csv",
+                mime="text/csv", on_click="ignore", key="dl_bulk"
+            )
+
+# ==========================================
+# TAB 7: SETTINGS
+# ==========================================
+with tab7:
+    if tab7.open:
+        st.header("⚙️ Cost Items Management")
+        
+        with st.expander("➕ Add New Cost Item", expanded=False):
+            col1, col2, col3, col4 = st.columns([3, 3, 2, 2])
             
-            handle(0, 'Front Handle')
-            handle(L, 'Back Handle')
+            new_nama = col1.text_input("Item Name", placeholder="e.g., Lamination")
+            new_basis = col2.selectbox(
+                "Calculation Basis",
+                ["Per Pesanan (Tetap)", "Per Lembar Plano", "Per Pcs Tas", "Per Area (cm2)", "Per Batch (Kelipatan Pcs)"]
+            )
+            new_harga = col3.number_input("Price (Rp)", min_value=0.0, value=0.0, format="%.2f")
+            new_batch = col4.number_input("Batch Size (Pcs)", min_value=1, value=1)
+            new_paper = st.checkbox(
+                "Item ini kertas",
+                help="Diganti harga katalog saat 'Pilih Plano Termurah dari Katalog' aktif"
+            )
             
-            # Holes
-            fig.add_trace(go.Scatter3d(
-                x=[P*0.25, P*0.75, P*0.25, P*0.75],
-                y=[-0.02, -0.02, L+0.02, L+0.02],
-                z=[z_hole]*4,
-                mode='markers',
-                marker=dict(size=8, color='black'),
-                name='Holes'
-            ))
+            if st.button("➕ Add Item"):
+                if new_nama:
+                    st.session_state.cost_items.append({
+                        "nama": new_nama,
+                        "basis": new_basis,
+                        "harga": new_harga,
+                        "batch": new_batch,
+                        "paper": new_paper
+                    })
+                    store.save_catalog("cost_items_id", st.session_state.cost_items)
+                    st.success(f"✅ Added: {new_nama}")
+                    st.rerun()
+                else:
+                    st.error("❌ Item name is required!")
+        
+        st.markdown("---")
+        st.subheader("📋 Current Cost Items")
+        
+        for i, item in enumerate(st.session_state.cost_items):
+            col1, col2, col3, col4, col5 = st.columns([3, 3, 2, 1, 1])
             
-            # Wireframe
-            edge_pairs = [
-                (0,1),(1,2),(2,3),(3,4),(4,5),(5,0),
-                (6,7),(7,8),(8,9),(9,10),(10,11),(11,6),
-                (0,6),(1,7),(2,8),
-                (3,9),(4,10),(5,11)
-            ]
-            ex, ey, ez = [], [], []
-            for p1, p2 in edge_pairs:
-                ex.extend([vx[p1], vx[p2], None])
-                ey.extend([vy[p1], vy[p2], None])
-                ez.extend([vz[p1], vz[p2], None])
+            col1.write(f"**{item['nama']}**" + (" 📄" if is_paper(item) else ""))
+            col2.write(f"_{item['basis']}_")
+            col3.write(f"Rp {item['harga']:,.0f}")
             
-            fig.add_trace(go.Scatter3d(
-                x=ex, y=ey, z=ez,
-                mode='lines',
-                line=dict(color='black', width=1),
-                showlegend=False
-            ))
+            if col4.button("✏️", key=f"edit_{i}"):
+                st.info("Edit feature coming soon!")
             
-            fig.update_layout(
-                scene=dict(
-                    aspectmode='data',
-                    camera=dict(eye=dict(x=1.5, y=1.5, z=1.2))
-                ),
-                title=f"3D Mockup: {P}×{L}×{T} cm"
-            )
+            if col5.button("🗑️", key=f"del_{i}"):
+                st.session_state.cost_items.pop(i)
+                store.save_catalog("cost_items_id", st.session_state.cost_items)
+                st.rerun()
+        
+        st.markdown("---")
+        st.header("📄 Katalog Plano")
+        st.caption("Dipakai saat 'Pilih Plano Termurah dari Katalog' aktif. Harga = harga kertas per lembar, menggantikan item kertas (📄) di atas.")
+        
+        with st.expander("➕ Add Plano Size", expanded=False):
+            col1, col2, col3 = st.columns(3)
+            new_plano_w = col1.number_input("Lebar (cm)", min_value=10.0, value=109.0, step=1.0, key="new_plano_w")
+            new_plano_h = col2.number_input("Tinggi (cm)", min_value=10.0, value=79.0, step=1.0, key="new_plano_h")
+            new_plano_harga = col3.number_input("Harga per Lembar (Rp)", min_value=0.0, value=5000.0, key="new_plano_harga")
             
-            st.plotly_chart(fig, use_container_width=True)
-            st.success("✅ 3D mockup generated!")
-
-# ==========================================
-# TAB 5: SETTINGS
-# ==========================================
-with tab5:
-    st.header("⚙️ Cost Items Management")
-    
-    with st.expander("➕ Add New Cost Item", expanded=False):
-        col1, col2, col3, col4 = st.columns([3, 3, 2, 2])
-        
-        new_nama = col1.text_input("Item Name", placeholder="e.g., Lamination")
-        new_basis = col2.selectbox(
-            "Calculation Basis",
-            ["Per Pesanan (Tetap)", "Per Lembar Plano", "Per Pcs Tas", "Per Area (cm2)", "Per Batch (Kelipatan Pcs)"]
-        )
-        new_harga = col3.number_input("Price (Rp)", min_value=0.0, value=0.0, format="%.2f")
-        new_batch = col4.number_input("Batch Size (Pcs)", min_value=1, value=1)
-        
-        if st.button("➕ Add Item"):
-            if new_nama:
-                st.session_state.cost_items.append({
-                    "nama": new_nama,
-                    "basis": new_basis,
-                    "harga": new_harga,
-                    "batch": new_batch
+            if st.button("➕ Add Plano"):
+                st.session_state.plano_catalog.append({
+                    "name": f"{new_plano_h:g} × {new_plano_w:g}",
+                    "w": new_plano_w,
+                    "h": new_plano_h,
+                    "price": new_plano_harga
                 })
-                st.success(f"✅ Added: {new_nama}")
+                store.save_catalog("plano_catalog_id", st.session_state.plano_catalog)
                 st.rerun()
-            else:
-                st.error("❌ Item name is required!")
-    
-    st.markdown("---")
-    st.subheader("📋 Current Cost Items")
-    
-    for i, item in enumerate(st.session_state.cost_items):
-        col1, col2, col3, col4, col5 = st.columns([3, 3, 2, 1, 1])
-        
-        col1.write(f"**{item['nama']}**")
-        col2.write(f"_{item['basis']}_")
-        col3.write(f"Rp {item['harga']:,.0f}")
-        
-        if col4.button("✏️", key=f"edit_{i}"):
-            st.info("Edit feature coming soon!")
-        
-        if col5.button("🗑️", key=f"del_{i}"):
-            st.session_state.cost_items.pop(i)
+        
+        for i, sheet in enumerate(st.session_state.plano_catalog):
+            col1, col2, col3 = st.columns([4, 3, 1])
+            col1.write(f"**{sheet['name']} cm**")
+            col2.write(f"Rp {sheet['price']:,.0f} / lembar")
+            
+            if col3.button("🗑️", key=f"del_plano_{i}"):
+                st.session_state.plano_catalog.pop(i)
+                store.save_catalog("plano_catalog_id", st.session_state.plano_catalog)
+                st.rerun()
+        
+        st.markdown("---")
+        st.header("🩺 Instrumentasi")
+        st.caption("Waktu per tahap, hit rate cache dan ukuran payload untuk semua sesi di proses ini.")
+        
+        st.toggle(
+            "Aktifkan Instrumentasi", value=metrics.enabled, key="metrics_on",
+            on_change=lambda: setattr(metrics, "enabled", st.session_state.metrics_on)
+        )
+        if METRICS_PATH:
+            st.caption(f"Snapshot ditulis ke `{METRICS_PATH}` setiap rerun.")
+        
+        snapshot = metrics.snapshot()
+        if snapshot["stages"]:
+            st.subheader("⏱️ Waktu per Tahap")
+            st.table([{
+                "Tahap": name,
+                "Jumlah": s["count"],
+                "Rata-rata (ms)": f"{s['mean_s'] * 1000:.2f}",
+                "Maks (ms)": f"{s['max_s'] * 1000:.2f}",
+                "Terakhir (ms)": f"{s['last_s'] * 1000:.2f}",
+            } for name, s in sorted(snapshot["stages"].items())])
+        st.subheader("🗃️ Cache")
+        st.table([{
+            "Cache": name,
+            "Isi": f"{c['size']} / {c['maxsize']}",
+            "Hit": c["hits"],
+            "Miss": c["misses"],
+            "Hit Rate": f"{c['hit_rate']:.1%}",
+        } for name, c in sorted(snapshot["caches"].items())])
+        if snapshot["bytes"] or snapshot["counters"]:
+            st.subheader("📦 Payload & Counter")
+            st.table([{
+                "Payload": name,
+                "Jumlah": b["count"],
+                "Rata-rata (KB)": f"{b['mean_bytes'] / 1024:.1f}",
+                "Terakhir (KB)": f"{b['last_bytes'] / 1024:.1f}",
+            } for name, b in sorted(snapshot["bytes"].items())] + [{
+                "Payload": name, "Jumlah": n, "Rata-rata (KB)": "-", "Terakhir (KB)": "-",
+            } for name, n in sorted(snapshot["counters"].items())])
+        
+        col1, col2, col3 = st.columns(3)
+        if col1.button("🔄 Reset Metrics", key="metrics_reset"):
+            metrics.reset()
             st.rerun()
+        col2.download_button("⬇️ JSON", metrics.to_json(), file_name="paperbag_metrics.json",
+                             mime="application/json", key="metrics_json")
+        col3.download_button("⬇️ Prometheus", metrics.to_prometheus(), file_name="paperbag_metrics.prom",
+                             mime="text/plain", key="metrics_prom")
 
 # ==========================================
 # FOOTER
@@ -533,4 +868,8 @@ st.markdown("""
     <p><strong>Paper Bag Calculator Pro</strong> v1.0 | Built with Streamlit</p>
     <p>For business inquiries: <a href='mailto:your@email.com'>chaharudin202@gmail.com</a></p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+metrics.observe_time("rerun", time.perf_counter() - rerun_start)
+if METRICS_PATH and metrics.enabled:
+    metrics.export(METRICS_PATH)
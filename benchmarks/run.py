@@ -0,0 +1,349 @@
+"""Benchmarks for the layout, costing and rendering hot paths.
+
+    python benchmarks/run.py                         # run everything
+    python benchmarks/run.py --only layout costs     # cases whose name starts with these
+    python benchmarks/run.py --save benchmarks/baseline.json
+    python benchmarks/run.py --compare benchmarks/baseline.json
+
+Each case reports throughput, p50/p99 latency and peak traced memory.
+import_* cases time a fresh interpreter doing only that import (subtract
+import_python, the bare interpreter); app_run is one full script run of
+app.py in a new session.
+--compare exits with status 1 when a case's p50 is slower than the
+baseline by more than --tolerance.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BAG_SIZES = [(10, 6, 15), (15, 8, 20), (20, 10, 25), (25, 12, 35), (35, 15, 40)]
+PLANO_SIZES = [(109, 79), (100, 65), (120, 90), (86, 61)]
+MARGINS = (1.0, 1.0, 1.5, 1.5)
+
+COST_BASES = ["Fixed per Order", "Per Plano Sheet", "Per Pcs Bag", "Per Area (cm2)", "Per Batch (Multiple Pcs)"]
+
+
+def _unit_sizes():
+    from paperbag.pattern import pattern_size, unit_size
+
+    for P, L, T in BAG_SIZES:
+        pola_w, pola_h = pattern_size(P, L, T, 2.0, 2.0)
+        yield (P, L, T), (pola_w, pola_h), unit_size(pola_w, pola_h, *MARGINS)
+
+
+def _layout_args():
+    return [(pw, ph, uw, uh) for (pw, ph), (_, _, (uw, uh)) in itertools.product(PLANO_SIZES, _unit_sizes())]
+
+
+def _cost_items(n):
+    return [{"name": f"Item {i}", "basis": COST_BASES[i % len(COST_BASES)], "price": 100 + i, "batch": 500}
+            for i in range(n)]
+
+
+# ==========================================
+# CASES
+# ==========================================
+# Each case factory returns (callable, list of argument tuples); calls cycle
+# through the arguments.
+
+def case_layout_grid():
+    from paperbag.layout import optimize_plano
+    return lambda *a: optimize_plano(*a, method="grid"), _layout_args()
+
+
+def case_layout_guillotine():
+    from paperbag.layout import optimize_plano
+    return lambda *a: optimize_plano(*a, method="guillotine"), _layout_args()
+
+
+def case_layout_constrained():
+    from paperbag.layout import LayoutConstraints, optimize_plano
+    rules = LayoutConstraints("long", gripper=1.0, gutter=0.3, margins=MARGINS)
+    return lambda *a: optimize_plano(*a, method="guillotine", constraints=rules), _layout_args()
+
+
+def case_layout_cached():
+    from paperbag.cache import cached_optimize_plano
+    return cached_optimize_plano, _layout_args()
+
+
+def case_layout_positions():
+    from paperbag.layout import optimize_plano
+    args = _layout_args()
+    return lambda *a: optimize_plano(*a, method="grid")[0].positions, args
+
+
+def _case_costs(n_items):
+    def factory():
+        from paperbag.costs import calculate_costs
+        items = _cost_items(n_items)
+        return lambda qty: calculate_costs(items, qty, qty // 4, 1400.0), [(q,) for q in (1000, 2500, 10000)]
+    return factory
+
+
+def case_quote_batch_100k():
+    import numpy as np
+    from paperbag.quote import quote_batch
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    specs = {
+        "P": rng.uniform(5, 40, n), "L": rng.uniform(3, 20, n),
+        "T": rng.uniform(5, 45, n), "qty": rng.integers(100, 50_000, n),
+    }
+    items = _cost_items(5)
+    return lambda: quote_batch(specs, items), [()]
+
+
+def case_price_curve_plan():
+    import numpy as np
+    from paperbag.pricebreak import price_curve
+    from paperbag.production import DEFAULT_PROCESSES, ProductionRules
+
+    qtys = np.arange(1, 200_001)
+    items = _cost_items(5)
+    production = ProductionRules(DEFAULT_PROCESSES, overs=3.0, run_size=2000)
+    return lambda: price_curve(qtys, 4, 1416.0, items, "Percentage (%)", 30.0, production), [()]
+
+
+def case_pipeline_margin():
+    from paperbag.layout import LayoutConstraints
+    from paperbag.pipeline import CALCULATOR, Pipeline
+
+    pipe = Pipeline(CALCULATOR)
+    pipe.update(
+        P=15.0, L=8.0, T=20.0, lem=2.0, top_lip=2.0, qty=5000,
+        m_top=MARGINS[0], m_bottom=MARGINS[1], m_left=MARGINS[2], m_right=MARGINS[3],
+        layout_rules=LayoutConstraints(margins=MARGINS), production=None,
+        plano_catalog=None, plano_w=109.0, plano_h=79.0, base_cost_items=_cost_items(10),
+        paper_item=("name", "price", "Paper Plano", "Per Plano Sheet"), subtotal_label="Subtotal ($)",
+        margin_type="Percentage (%)", margin_val=30.0,
+    )
+    pipe.get("price")
+
+    def run(margin_val):
+        # A rerun where only the margin moved: profit and price are recomputed
+        pipe.update(margin_val=margin_val)
+        return pipe.get("price")
+    return run, [(m,) for m in (25.0, 30.0, 35.0)]
+
+
+def case_bulk_import_20k():
+    from io import BytesIO
+    from paperbag.bulk import BulkQuote, read_upload
+
+    rows = "sku,P,L,T,qty\n" + "".join(
+        f"S{i},{5 + i % 35},{3 + i % 17},{5 + i % 40},{100 + i % 5000}\n" for i in range(20_000)
+    )
+    data = rows.encode()
+    items = _cost_items(5)
+
+    def run():
+        bulk = BulkQuote()
+        for _ in bulk.run(read_upload(BytesIO(data), "rfq.csv"), items, "Percentage (%)", 30.0):
+            pass
+        bulk.close()
+    return run, [()]
+
+
+def case_pattern_figure():
+    from io import BytesIO
+    from paperbag.render import draw_pattern
+
+    def run(P, L, T):
+        fig = draw_pattern(P, L, T, 2.0, 2.0, title="bench")
+        fig.savefig(BytesIO(), format="png")
+    return run, list(BAG_SIZES)
+
+
+def case_plano_render():
+    from paperbag.cache import cached_optimize_plano
+    from paperbag.render import image_cache, render_plano_layout
+
+    args = []
+    for (pw, ph), (_, (pola_w, pola_h), (uw, uh)) in itertools.product(PLANO_SIZES[:2], _unit_sizes()):
+        layout, fw, fh = cached_optimize_plano(pw, ph, uw, uh)
+        args.append((layout, fw, fh, pola_w, pola_h))
+
+    def run(layout, fw, fh, pola_w, pola_h):
+        image_cache.clear()
+        render_plano_layout(layout, fw, fh, pola_w, pola_h, MARGINS[2], MARGINS[1], MARGINS[0], title="bench")
+    return run, args
+
+
+def case_mockup_3d():
+    from paperbag.mockup import generate_3d_mockup
+
+    def run(P, L, T):
+        generate_3d_mockup(P, L, T, "#D3D3D3", "#222222", 1.0, "cm").to_json()
+    return run, list(BAG_SIZES)
+
+
+def case_mockup_lod():
+    from paperbag.mockup import LOD_LEVELS, generate_3d_mockup
+
+    def run(lod):
+        generate_3d_mockup(15, 8, 20, "#D3D3D3", "#222222", 1.0, "cm", lod=lod).to_json()
+    return run, [(lod,) for lod in LOD_LEVELS]
+
+
+def case_mockup_restyle():
+    from paperbag.mockup import build_mockup, restyle_mockup
+
+    fig = build_mockup(15, 8, 20, 1.0, "cm")
+    colors = [("#D3D3D3", "#222222"), ("#8B4513", "#FFFFFF"), ("#1E90FF", "#000000")]
+    return lambda bag, handle: restyle_mockup(fig, bag, handle).to_json(), colors
+
+
+def case_dieline_svg():
+    from paperbag.dieline import pattern_geometry, to_svg
+    return lambda P, L, T: to_svg(pattern_geometry(P, L, T, 2.0, 2.0)), list(BAG_SIZES)
+
+
+def _case_import(statement):
+    def factory():
+        import subprocess
+        cmd = [sys.executable, "-c", statement]
+        return lambda: subprocess.run(cmd, check=True, cwd=ROOT), [()]
+    return factory
+
+
+def case_app_run():
+    # Keep the benchmark off the user's persistent store
+    os.environ.setdefault("PAPERBAG_STORE", ":memory:")
+    from streamlit.testing.v1 import AppTest
+
+    path = os.path.join(ROOT, "app.py")
+    return lambda: AppTest.from_file(path, default_timeout=60).run(), [()]
+
+
+CASES = {
+    "layout_grid": (case_layout_grid, 2000),
+    "layout_guillotine": (case_layout_guillotine, 100),
+    "layout_constrained": (case_layout_constrained, 100),
+    "layout_cached": (case_layout_cached, 5000),
+    "layout_positions": (case_layout_positions, 1000),
+    "costs_1_item": (_case_costs(1), 5000),
+    "costs_10_items": (_case_costs(10), 2000),
+    "costs_100_items": (_case_costs(100), 500),
+    "costs_500_items": (_case_costs(500), 100),
+    "quote_batch_100k": (case_quote_batch_100k, 10),
+    "price_curve_plan": (case_price_curve_plan, 20),
+    "pipeline_margin": (case_pipeline_margin, 5000),
+    "bulk_import_20k": (case_bulk_import_20k, 5),
+    "pattern_figure": (case_pattern_figure, 10),
+    "plano_render": (case_plano_render, 10),
+    "mockup_3d": (case_mockup_3d, 50),
+    "mockup_lod": (case_mockup_lod, 50),
+    "mockup_restyle": (case_mockup_restyle, 50),
+    "dieline_svg": (case_dieline_svg, 500),
+    "import_python": (_case_import("pass"), 10),
+    "import_paperbag": (_case_import("import paperbag"), 10),
+    "import_paperbag_quote": (_case_import("import paperbag.quote"), 10),
+    "import_paperbag_render": (_case_import("import paperbag.render, paperbag.mockup"), 10),
+    "import_matplotlib": (_case_import("import matplotlib.figure"), 10),
+    "import_plotly": (_case_import("import plotly.graph_objects"), 10),
+    "import_streamlit": (_case_import("import streamlit"), 10),
+    "app_run": (case_app_run, 10),
+}
+
+
+# ==========================================
+# HARNESS
+# ==========================================
+
+def _percentile(sorted_vals, q):
+    idx = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+def run_case(name, factory, iterations, warmup=3):
+    fn, args = factory()
+    calls = list(itertools.islice(itertools.cycle(args), iterations))
+
+    for a in calls[:warmup]:
+        fn(*a)
+
+    latencies = []
+    start = time.perf_counter()
+    for a in calls:
+        t0 = time.perf_counter_ns()
+        fn(*a)
+        latencies.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - start
+
+    # Peak memory on a few calls (tracemalloc slows everything down, so separately)
+    tracemalloc.start()
+    for a in calls[:min(len(calls), 5)]:
+        fn(*a)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) / 1e6,
+        "p99_ms": _percentile(latencies, 0.99) / 1e6,
+        "peak_kib": peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base and res["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append((name, base["p50_ms"], res["p50_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="*", help="Run only cases whose name starts with one of these")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply iteration counts (e.g. 0.1 for a quick run)")
+    parser.add_argument("--save", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", help="Compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'case':<22}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>11}")
+    for name, (factory, iterations) in CASES.items():
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        res = run_case(name, factory, max(1, int(iterations * args.scale)))
+        results[name] = res
+        print(f"{name:<22}{res['ops_per_sec']:>12,.1f}{res['p50_ms']:>10.3f}{res['p99_ms']:>10.3f}{res['peak_kib']:>11,.0f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: p50 {before:.3f} ms -> {after:.3f} ms")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,35 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import plotly.graph_objects as go
-import numpy as np
-import math
-from io import BytesIO
+import time
+from datetime import datetime
+
+from paperbag import (
+    CALCULATOR,
+    DEFAULT_PLANO_CATALOG,
+    DEFAULT_PROCESSES,
+    GRAIN_DIRECTIONS,
+    LOD_LEVELS,
+    METRICS_PATH,
+    Basis,
+    BulkQuote,
+    LayoutConstraints,
+    Pipeline,
+    ProductionRules,
+    batch_run_size,
+    build_mockup,
+    default_store,
+    draw_pattern,
+    export_geometry,
+    is_paper,
+    metrics,
+    parse_quantities,
+    pattern_geometry,
+    prepare_artwork,
+    read_upload,
+    render_plano_layout,
+    restyle_mockup,
+    spec_hash,
+    tile_geometry,
+)
 
 # ==========================================
 # PAGE CONFIG
@@ -14,197 +39,32 @@ st.set_page_config(
     page_icon="🛍️",
     layout="wide"
 )
+rerun_start = time.perf_counter()
 
 # ==========================================
 # SESSION STATE INIT
 # ==========================================
+# Cost catalogs, layouts and quotes persist across sessions and restarts
+store = default_store()
+
 if 'cost_items' not in st.session_state:
-    st.session_state.cost_items = [
+    st.session_state.cost_items = store.load_catalog("cost_items_en", [
         {"name": "Overhead Cost", "basis": "Fixed per Order", "price": 100000, "batch": 1},
         {"name": "Packing Cost", "basis": "Per Pcs Bag", "price": 500, "batch": 1}
-    ]
+    ])
 
 if 'profit_margin' not in st.session_state:
     st.session_state.profit_margin = 30.0
 
-# ==========================================
-# HELPER FUNCTIONS
-# ==========================================
-
-def optimize_plano(PL_W, PL_H, U_W, U_H):
-    def check_layout(W_canvas, H_canvas, W_item, H_item):
-        cols = W_canvas // W_item
-        rows = H_canvas // H_item
-        rects = []
-        for r in range(int(rows)):
-            for c in range(int(cols)):
-                rects.append({
-                    'x': c * W_item, 
-                    'y': r * H_item, 
-                    'w': W_item, 
-                    'h': H_item, 
-                    'rot': False
-                })
-        
-        sisa_w = W_canvas - (cols * W_item)
-        if sisa_w >= H_item:
-            c_sisa = sisa_w // H_item
-            r_sisa = H_canvas // W_item
-            for r in range(int(r_sisa)):
-                for c in range(int(c_sisa)):
-                    rects.append({
-                        'x': (cols * W_item) + (c * H_item),
-                        'y': r * W_item,
-                        'w': H_item,
-                        'h': W_item,
-                        'rot': True
-                    })
-        return rects
-    
-    res1 = check_layout(PL_W, PL_H, U_W, U_H)
-    res2 = check_layout(PL_H, PL_W, U_W, U_H)
-    
-    if len(res1) >= len(res2):
-        return res1, PL_W, PL_H
-    else:
-        return res2, PL_H, PL_W
-
-def calculate_costs(cost_items, qty, total_plano_req, area_cm2_per_pcs):
-    """Calculate total production cost with safety check"""
-    if not cost_items or len(cost_items) == 0:
-        return 0, []
-    
-    total_cost = 0
-    breakdown = []
-    
-    for item in cost_items:
-        subtotal = 0
-        if item['basis'] == "Fixed per Order":
-            subtotal = item['price']
-        elif item['basis'] == "Per Plano Sheet":
-            subtotal = item['price'] * total_plano_req
-        elif item['basis'] == "Per Pcs Bag":
-            subtotal = item['price'] * qty
-        elif item['basis'] == "Per Area (cm2)":
-            subtotal = item['price'] * area_cm2_per_pcs * qty
-        elif item['basis'] == "Per Batch (Multiple Pcs)":
-            jumlah_batch = math.ceil(qty / item['batch']) if item['batch'] > 0 else 0
-            subtotal = item['price'] * jumlah_batch
-        
-        total_cost += subtotal
-        breakdown.append({
-            "Item": item['name'],
-            "Basis": item['basis'],
-            "Subtotal ($)": f"{subtotal:,.0f}"
-        })
-    
-    return total_cost, breakdown
+if 'plano_catalog' not in st.session_state:
+    st.session_state.plano_catalog = store.load_catalog(
+        "plano_catalog_en", [dict(sheet) for sheet in DEFAULT_PLANO_CATALOG]
+    )
 
-def generate_3d_mockup(P, L, T, bag_color, handle_color, conv, unit):
-    """Generate 3D mockup figure"""
-    pinch = (L / 2) * 0.9
-    z_hole = T - 2.0
-    
-    def get_v(z_h, p_v):
-        return [
-            [0, 0, z_h], [P, 0, z_h],
-            [P - p_v, L/2, z_h], [P, L, z_h],
-            [0, L, z_h], [p_v, L/2, z_h]
-        ]
-    
-    v_pts = get_v(0, pinch*0.5) + get_v(T, pinch)
-    vx = [v[0] for v in v_pts]
-    vy = [v[1] for v in v_pts]
-    vz = [v[2] for v in v_pts]
-    
-    fig = go.Figure()
-    
-    # Body mesh
-    def get_f(off_l, off_h):
-        f = []
-        for s in range(5):
-            f.extend([
-                [off_l+s, off_l+s+1, off_h+s+1],
-                [off_l+s, off_h+s+1, off_h+s]
-            ])
-        f.extend([
-            [off_l+5, off_l+0, off_h+0],
-            [off_l+5, off_h+0, off_h+5]
-        ])
-        return f
-    
-    faces = get_f(0, 6)
-    
-    fig.add_trace(go.Mesh3d(
-        x=vx, y=vy, z=vz,
-        i=[f[0] for f in faces],
-        j=[f[1] for f in faces],
-        k=[f[2] for f in faces],
-        color=bag_color,
-        opacity=1.0,
-        flatshading=True,
-        name='Bag'
-    ))
-    
-    # Handles
-    def handle(y_p, name):
-        hx, hz = [], []
-        for s in range(21):
-            t = s / 20
-            hx.append(P*0.25 + (P*0.5)*t)
-            hz.append(z_hole + 6 * math.sin(math.pi * t))
-        fig.add_trace(go.Scatter3d(
-            x=hx, y=[y_p]*21, z=hz,
-            mode='lines',
-            line=dict(color=handle_color, width=7),
-            name=name
-        ))
-    
-    handle(0, 'Front Handle')
-    handle(L, 'Back Handle')
-    
-    # Holes
-    fig.add_trace(go.Scatter3d(
-        x=[P*0.25, P*0.75, P*0.25, P*0.75],
-        y=[-0.02, -0.02, L+0.02, L+0.02],
-        z=[z_hole]*4,
-        mode='markers',
-        marker=dict(size=8, color='black'),
-        name='Holes'
-    ))
-    
-    # Wireframe
-    edge_pairs = [
-        (0,1),(1,2),(2,3),(3,4),(4,5),(5,0),
-        (6,7),(7,8),(8,9),(9,10),(10,11),(11,6),
-        (0,6),(1,7),(2,8),(3,9),(4,10),(5,11)
-    ]
-    ex, ey, ez = [], [], []
-    for p1, p2 in edge_pairs:
-        ex.extend([vx[p1], vx[p2], None])
-        ey.extend([vy[p1], vy[p2], None])
-        ez.extend([vz[p1], vz[p2], None])
-    
-    fig.add_trace(go.Scatter3d(
-        x=ex, y=ey, z=ez,
-        mode='lines',
-        line=dict(color='black', width=1),
-        showlegend=False
-    ))
-    
-    fig.update_layout(
-        scene=dict(
-            aspectmode='data',
-            camera=dict(eye=dict(x=1.5, y=1.5, z=1.2)),
-            xaxis_title=f"Length ({unit})",
-            yaxis_title=f"Width ({unit})",
-            zaxis_title=f"Height ({unit})"
-        ),
-        title=f"3D Mockup: {P/conv:.2f}×{L/conv:.2f}×{T/conv:.2f} {unit}",
-        height=500
+if 'processes' not in st.session_state:
+    st.session_state.processes = store.load_catalog(
+        "processes_en", [dict(process) for process in DEFAULT_PROCESSES]
     )
-    
-    return fig
 
 # ==========================================
 # MAIN HEADER
@@ -264,8 +124,14 @@ with tab1:
         
         with col_s1:
             st.markdown(f"**📄 Plano Size ({unit})**")
-            plano_w = st.number_input(f"Plano Width", value=109.0/conv, min_value=10.0/conv, step=1.0/conv, format="%.2f") * conv
-            plano_h = st.number_input(f"Plano Height", value=79.0/conv, min_value=10.0/conv, step=1.0/conv, format="%.2f") * conv
+            use_catalog = st.checkbox(
+                "Cheapest from Plano Catalog",
+                value=False,
+                help="Try every size in the Plano Catalog and use the one with the lowest total cost"
+            )
+            if not use_catalog:
+                plano_w = st.number_input(f"Plano Width", value=109.0/conv, min_value=10.0/conv, step=1.0/conv, format="%.2f") * conv
+                plano_h = st.number_input(f"Plano Height", value=79.0/conv, min_value=10.0/conv, step=1.0/conv, format="%.2f") * conv
             
         with col_s2:
             st.markdown(f"**📐 Folds & Glue ({unit})**")
@@ -281,32 +147,102 @@ with tab1:
             with col_m2:
                 m_left = st.number_input("Left", value=1.5/conv, min_value=0.0, step=0.5/conv, format="%.2f") * conv
                 m_right = st.number_input("Right", value=1.5/conv, min_value=0.0, step=0.5/conv, format="%.2f") * conv
+        
+        st.markdown("**🖨️ Press Rules**")
+        col_p1, col_p2, col_p3 = st.columns(3)
+        grain_labels = {None: "Free (pieces may turn)", "long": "Long grain", "short": "Short grain"}
+        grain = col_p1.selectbox(
+            "Paper Grain", (None,) + GRAIN_DIRECTIONS, format_func=grain_labels.get,
+            help="Bag height always runs along the sheet's grain, so pieces are never turned"
+        )
+        gripper = col_p2.number_input(
+            f"Gripper ({unit})", value=0.0, min_value=0.0, step=0.5/conv, format="%.2f",
+            help="Unprintable strip along a long edge of the sheet held by the press"
+        ) * conv
+        use_gutter = col_p3.checkbox(
+            "Shared Gutters", value=False,
+            help="Neighbouring pieces share one cut line; the print margins become sheet-edge margins"
+        )
+        gutter = col_p3.number_input(
+            f"Gutter ({unit})", value=0.3/conv, min_value=0.0, step=0.1/conv, format="%.2f"
+        ) * conv if use_gutter else None
+        
+        st.markdown("**🏭 Production Plan**")
+        use_plan = st.checkbox(
+            "Add Make-Ready & Waste", value=False,
+            help="Add make-ready sheets per press run, spoilage per process and overs to the plano count"
+        )
+        production = None
+        if use_plan:
+            col_r1, col_r2 = st.columns(2)
+            overs = col_r1.number_input("Overs (%)", value=0.0, min_value=0.0, step=0.5, help="Extra bags printed on top of the order quantity")
+            run_size = col_r2.number_input(
+                "Pcs per Press Run", value=batch_run_size(st.session_state.cost_items) or 0, min_value=0, step=500,
+                help="The order is split into runs of this size, each with its own make-ready (0 = one run). "
+                     "Starts at the largest 'Per Batch' cost item."
+            )
+            processes = st.data_editor(
+                st.session_state.processes, num_rows="dynamic", key="process_editor",
+                column_config={
+                    "name": st.column_config.TextColumn("Process", required=True),
+                    "make_ready": st.column_config.NumberColumn("Make-Ready (sheets/run)", min_value=0, step=1),
+                    "spoilage": st.column_config.NumberColumn("Spoilage (%)", min_value=0.0, step=0.5),
+                }
+            )
+            if processes != st.session_state.processes:
+                st.session_state.processes = processes
+                store.save_catalog("processes_en", processes)
+            production = ProductionRules(processes, overs, run_size or None)
+    
+    # CALCULATIONS: one dependency graph per session, only stale nodes run again
+    if 'pipeline' not in st.session_state:
+        st.session_state.pipeline = Pipeline(CALCULATOR)
+    pipe = st.session_state.pipeline
+    
+    layout_rules = LayoutConstraints(grain, gripper, gutter, margins=(m_top, m_bottom, m_left, m_right))
+    pipe.update(
+        P=P, L=L, T=T, lem=lem, top_lip=top_lip, qty=qty,
+        m_top=m_top, m_bottom=m_bottom, m_left=m_left, m_right=m_right,
+        layout_rules=layout_rules, production=production,
+        # Catalog mode: cheapest stock sheet, paper price taken from the catalog
+        plano_catalog=list(st.session_state.plano_catalog) if use_catalog else None,
+        plano_w=None if use_catalog else plano_w,
+        plano_h=None if use_catalog else plano_h,
+        base_cost_items=list(st.session_state.cost_items),
+        paper_item=("name", "price", "Paper Plano", "Per Plano Sheet"),
+        subtotal_label="Subtotal ($)",
+    )
     
-    # CALCULATIONS
-    pola_w_net = lem + (2 * L) + (2 * P)
-    pola_h_net = T + top_lip + (0.5 * P)
-    area_cm2_per_pcs = pola_w_net * pola_h_net
+    pola_w_net, pola_h_net = pipe.get("pattern")
+    area_cm2_per_pcs = pipe.get("area")
+    unit_w, unit_h = pipe.get("unit")
+    piece_left, piece_bottom, piece_top = (0.0, 0.0, 0.0) if use_gutter else (m_left, m_bottom, m_top)
     
-    unit_w = pola_w_net + m_left + m_right
-    unit_h = pola_h_net + m_top + m_bottom
+    if pipe.get("sheet") is None:
+        st.error("⚠️ Pattern size exceeds every plano in the catalog!")
+        st.stop()
+    plano_w, plano_h = pipe.get("sheet")
+    plano_ranking = pipe.get("plano_ranking") or []
+    cost_items = pipe.get("cost_items")
+    if use_catalog:
+        best_plano = plano_ranking[0]
     
-    layout_positions, final_plano_w, final_plano_h = optimize_plano(plano_w, plano_h, unit_w, unit_h)
-    pcs_per_plano = len(layout_positions)
+    # Grid layout now, guillotine search on the shared worker pool
+    with metrics.stage("layout"):
+        layout_positions, final_plano_w, final_plano_h = pipe.get("layout")
+    pcs_per_plano = pipe.get("pcs_per_plano")
     
     if pcs_per_plano == 0:
         st.error("⚠️ Pattern size exceeds plano! Please adjust dimensions or plano size.")
         st.stop()
     
-    total_plano_req = math.ceil(qty / pcs_per_plano)
-    efficiency = (pcs_per_plano * unit_w * unit_h) / (final_plano_w * final_plano_h) * 100
+    # Production plan: good sheets plus overs, make-ready and spoilage per process
+    plan = pipe.get("plan")
+    total_plano_req = pipe.get("total_plano_req")
+    efficiency = pipe.get("efficiency")
     
     # Calculate costs with safety check
-    total_production_cost, breakdown_biaya = calculate_costs(
-        st.session_state.cost_items, 
-        qty, 
-        total_plano_req, 
-        area_cm2_per_pcs
-    )
+    total_production_cost, breakdown_biaya = pipe.get("costs")
     
     # PROFIT MARGIN
     st.markdown("---")
@@ -327,14 +263,11 @@ with tab1:
         
         if margin_type == "Percentage (%)":
             st.session_state.profit_margin = margin_val
-            total_profit = total_production_cost * (margin_val / 100)
-        elif margin_type == "Fixed Total ($)":
-            total_profit = margin_val
-        else:
-            total_profit = margin_val * qty
+        # A margin change only re-runs the profit and price nodes
+        pipe.update(margin_type=margin_type, margin_val=margin_val)
+        total_profit = pipe.get("profit")
     
-    total_selling_price = total_production_cost + total_profit
-    unit_price = total_selling_price / qty if qty > 0 else 0
+    total_selling_price, unit_price = pipe.get("price")
     
     # KEY METRICS
     st.markdown("---")
@@ -366,6 +299,93 @@ with tab1:
         help="Customer price per piece"
     )
     
+    # Background layout search: poll it and rerun everything once it lands
+    @st.fragment(run_every=0.5)
+    def layout_search_status():
+        if st.session_state.pipeline.last("layout_job").done():
+            st.rerun()
+        st.caption("🔄 Searching for a tighter plano layout... (showing the grid layout meanwhile)")
+    
+    if not pipe.last("layout_job").done():
+        layout_search_status()
+    
+    # Quote history, looked up by spec hash
+    quote_spec = dict(
+        P=P, L=L, T=T, qty=qty, plano_w=plano_w, plano_h=plano_h, lem=lem, top_lip=top_lip,
+        m_top=m_top, m_bottom=m_bottom, m_left=m_left, m_right=m_right
+    )
+    quote_spec["layout_rules"] = list(layout_rules.key())
+    if production:
+        quote_spec["production"] = list(production.key())
+    previous_quote = store.find_quote(spec_hash(quote_spec, cost_items, margin_type, margin_val))
+    if previous_quote:
+        st.caption(
+            f"🗂️ Quoted before on {datetime.fromtimestamp(previous_quote['created']):%d %b %Y %H:%M}: "
+            f"$ {previous_quote['result']['unit_price']:,.0f}/pcs"
+        )
+    if st.button("💾 Save Quote", key="save_quote"):
+        store.save_quote(quote_spec, {
+            "pcs_per_plano": pcs_per_plano,
+            "total_plano_req": total_plano_req,
+            "production_cost": total_production_cost,
+            "selling_price": total_selling_price,
+            "unit_price": unit_price
+        }, cost_items, margin_type, margin_val)
+        st.success("✅ Quote saved")
+    
+    with st.expander("🗂️ Quote History", expanded=False):
+        st.table([{
+            "Date": f"{datetime.fromtimestamp(q['created']):%d %b %Y %H:%M}",
+            f"P×L×T ({unit})": f"{q['spec']['P']/conv:.2f}×{q['spec']['L']/conv:.2f}×{q['spec']['T']/conv:.2f}",
+            "Qty": f"{q['spec']['qty']:,}",
+            "Customer Pays ($)": f"{q['result']['selling_price']:,.0f}",
+            "Price per Pcs ($)": f"{q['result']['unit_price']:,.0f}"
+        } for q in store.recent_quotes(20)])
+    
+    # Price breaks over many quantities, one vectorized pass
+    with st.expander("📉 Quantity Price Breaks", expanded=False):
+        pb_text = st.text_input("Quantities (comma separated)", "1000, 2000, 5000, 10000, 20000", key="pb_qtys")
+        pipe.update(pb_qtys=parse_quantities(pb_text))
+        price_breaks = pipe.get("price_breaks")
+        
+        if price_breaks:
+            pb, pb_fill = price_breaks['table'], price_breaks['fill']
+            st.table([{
+                "Qty": f"{q:,}",
+                "Total Plano": f"{sheets:,}",
+                "Total Price ($)": f"{total:,.0f}",
+                "Price per Pcs ($)": f"{unit:,.2f}",
+                "Full-Sheet Qty": f"{fill:,}"
+            } for q, sheets, total, unit, fill in zip(
+                pb['qty'].tolist(), pb['total_plano_req'].tolist(),
+                pb['selling_price'].tolist(), pb['unit_price'].tolist(), pb_fill.tolist()
+            )])
+            
+            # Curve: evenly spaced points plus both sides of every batch step
+            step_qty, step_kind, curve = price_breaks['step_qty'], price_breaks['step_kind'], price_breaks['curve']
+            st.line_chart({"Qty": curve['qty'], "Price per Pcs ($)": curve['unit_price']}, x="Qty", y="Price per Pcs ($)")
+            
+            if len(step_qty):
+                st.caption("Unit price jumps at these quantities (a new print batch starts); the quantity just before is the sweet spot:")
+                st.table([{
+                    "Best Qty": f"{q - 1:,}",
+                    "New Batch From": f"{q:,}",
+                    "Trigger": kind
+                } for q, kind in zip(step_qty.tolist(), step_kind.tolist())])
+    
+    # Catalog winner
+    if use_catalog:
+        st.success(f"🏆 Cheapest plano: **{best_plano['plano_h']/conv:.2f}×{best_plano['plano_w']/conv:.2f} {unit}** @ $ {best_plano['price']:,.0f}/sheet")
+        with st.expander("📄 Plano Size Comparison"):
+            st.table([{
+                f"Plano ({unit})": f"{r['plano_h']/conv:.2f}×{r['plano_w']/conv:.2f}",
+                "Price/Sheet ($)": f"{r['price']:,.0f}",
+                "Pcs/Plano": r['pcs_per_plano'],
+                "Total Plano": r['total_plano_req'],
+                "Efficiency": f"{r['efficiency']:.1f}%",
+                "Production Cost ($)": f"{r['production_cost']:,.0f}"
+            } for r in plano_ranking])
+    
     # COST ITEMS MANAGEMENT
     st.markdown("---")
     with st.expander("💰 Manage Cost Items", expanded=True):
@@ -376,11 +396,15 @@ with tab1:
         new_name = col1.text_input("Item Name", placeholder="e.g., Paper Material", key="new_item_name")
         new_basis = col2.selectbox(
             "Calculation Basis",
-            ["Fixed per Order", "Per Plano Sheet", "Per Pcs Bag", "Per Area (cm2)", "Per Batch (Multiple Pcs)"],
+            [basis.value for basis in Basis],
             key="new_item_basis"
         )
         new_price = col3.number_input("Price ($)", min_value=0.0, value=0.0, format="%.2f", key="new_item_price")
         new_batch = col4.number_input("Batch Size", min_value=1, value=1, key="new_item_batch")
+        new_paper = st.checkbox(
+            "This item is the paper", key="new_item_paper",
+            help="Replaced by the catalog price when 'Cheapest from Plano Catalog' is on"
+        )
         
         if st.button("➕ Add Item"):
             if new_name.strip():
@@ -388,8 +412,10 @@ with tab1:
                     "name": new_name,
                     "basis": new_basis,
                     "price": new_price,
-                    "batch": new_batch
+                    "batch": new_batch,
+                    "paper": new_paper
                 })
+                store.save_catalog("cost_items_en", st.session_state.cost_items)
                 st.success(f"✅ Added: {new_name}")
                 st.rerun()
             else:
@@ -406,12 +432,13 @@ with tab1:
             for i, item in enumerate(st.session_state.cost_items):
                 col1, col2, col3, col4 = st.columns([3, 3, 2, 1])
                 
-                col1.write(f"**{item['name']}**")
+                col1.write(f"**{item['name']}**" + (" 📄" if is_paper(item) else ""))
                 col2.write(f"_{item['basis']}_")
                 col3.write(f"$ {item['price']:,.0f}")
                 
                 if col4.button("🗑️", key=f"del_{i}"):
                     st.session_state.cost_items.pop(i)
+                    store.save_catalog("cost_items_en", st.session_state.cost_items)
                     st.rerun()
         
         # Detailed breakdown
@@ -420,6 +447,35 @@ with tab1:
             st.subheader("📋 Cost Breakdown")
             st.table(breakdown_biaya)
     
+    # PLANO CATALOG
+    st.markdown("---")
+    with st.expander("📄 Plano Catalog", expanded=False):
+        st.caption("Used when 'Cheapest from Plano Catalog' is on. Price = paper cost per sheet, replacing the paper items (📄) in the cost list.")
+        col1, col2, col3 = st.columns(3)
+        new_plano_w = col1.number_input(f"Width ({unit})", min_value=10.0/conv, value=109.0/conv, step=1.0/conv, format="%.2f", key="new_plano_w") * conv
+        new_plano_h = col2.number_input(f"Height ({unit})", min_value=10.0/conv, value=79.0/conv, step=1.0/conv, format="%.2f", key="new_plano_h") * conv
+        new_plano_price = col3.number_input("Price per Sheet ($)", min_value=0.0, value=5000.0, key="new_plano_price")
+        
+        if st.button("➕ Add Plano"):
+            st.session_state.plano_catalog.append({
+                "name": f"{new_plano_h:g} × {new_plano_w:g}",
+                "w": new_plano_w,
+                "h": new_plano_h,
+                "price": new_plano_price
+            })
+            store.save_catalog("plano_catalog_en", st.session_state.plano_catalog)
+            st.rerun()
+        
+        for i, sheet in enumerate(st.session_state.plano_catalog):
+            col1, col2, col3 = st.columns([4, 3, 1])
+            col1.write(f"**{sheet['h']/conv:.2f}×{sheet['w']/conv:.2f} {unit}**")
+            col2.write(f"$ {sheet['price']:,.0f} / sheet")
+            
+            if col3.button("🗑️", key=f"del_plano_{i}"):
+                st.session_state.plano_catalog.pop(i)
+                store.save_catalog("plano_catalog_en", st.session_state.plano_catalog)
+                st.rerun()
+    
     # MATERIAL EFFICIENCY
     st.markdown("---")
     with st.expander("📦 Material Efficiency & Layout", expanded=False):
@@ -428,111 +484,166 @@ with tab1:
         col2.metric("Total Plano Needed", f"{total_plano_req} sheets")
         col3.metric("Material Efficiency", f"{efficiency:.1f}%")
         
+        if production:
+            st.markdown(
+                f"**🏭 Production Plan:** {int(plan['good_pcs']):,} bags printed in {int(plan['runs'])} run(s) of "
+                f"{int(plan['sheets_per_run']):,} sheets; {int(plan['net_sheets']):,} good sheets + "
+                f"{int(plan['make_ready'].sum()):,} make-ready + {int(plan['spoilage'].sum()):,} spoilage"
+            )
+            st.table([{
+                "Process": name,
+                "Make-Ready (sheets)": f"{mr:,}",
+                "Spoilage (sheets)": f"{sp:,}",
+            } for name, mr, sp in zip(production.names, plan['make_ready'].tolist(), plan['spoilage'].tolist())])
+        
         if st.button("🎨 Show Plano Layout", key="show_plano"):
             with st.spinner("Generating layout..."):
-                fig, ax = plt.subplots(figsize=(14, 10))
-                ax.set_aspect('equal')
-                
-                ax.add_patch(patches.Rectangle(
-                    (0, 0), final_plano_w/conv, final_plano_h/conv,
-                    lw=3, edgecolor='black', facecolor='white'
-                ))
-                
-                for p in layout_positions:
-                    ax.add_patch(patches.Rectangle(
-                        (p['x']/conv, p['y']/conv), p['w']/conv, p['h']/conv,
-                        lw=1, edgecolor='gray', ls='--',
-                        facecolor='#f0f0f0', alpha=0.5
-                    ))
-                    
-                    if not p['rot']:
-                        inner_x = p['x'] + m_left
-                        inner_y = p['y'] + m_bottom
-                        inner_w, inner_h = pola_w_net, pola_h_net
-                        color = 'skyblue'
-                    else:
-                        inner_x = p['x'] + m_bottom
-                        inner_y = p['y'] + m_left
-                        inner_w, inner_h = pola_h_net, pola_w_net
-                        color = 'orange'
-                    
-                    ax.add_patch(patches.Rectangle(
-                        (inner_x/conv, inner_y/conv), inner_w/conv, inner_h/conv,
-                        lw=1, edgecolor='blue', facecolor=color, alpha=0.7
-                    ))
-                
-                ax.set_xlim(-5/conv, (final_plano_w + 5)/conv)
-                ax.set_ylim(-5/conv, (final_plano_h + 5)/conv)
-                ax.set_title(f"Plano Layout: {pcs_per_plano} pcs on {final_plano_w/conv:.2f}×{final_plano_h/conv:.2f} {unit} sheet", fontsize=14, fontweight='bold')
-                ax.set_xlabel(f"Width ({unit})")
-                ax.set_ylabel(f"Height ({unit})")
-                
-                st.pyplot(fig)
+                layout_png = render_plano_layout(
+                    layout_positions, final_plano_w, final_plano_h,
+                    pola_w_net, pola_h_net, piece_left, piece_bottom, piece_top,
+                    title=f"Plano Layout: {pcs_per_plano} pcs on {final_plano_w/conv:.2f}×{final_plano_h/conv:.2f} {unit} sheet",
+                    conv=conv, unit=unit, gripper=gripper
+                )
+                st.image(layout_png)
                 st.info(f"💡 Blue = Normal | Orange = Rotated 90°")
+                
+                # Imposition: die-line tiled over every piece on the plano (cm)
+                plano_geom = tile_geometry(
+                    pattern_geometry(P, L, T, lem, top_lip), layout_positions,
+                    final_plano_w, final_plano_h, pola_w_net, pola_h_net, piece_left, piece_bottom, piece_top
+                )
+                dl_cols = st.columns(3)
+                for col, fmt in zip(dl_cols, ("svg", "dxf", "pdf")):
+                    data, mime = export_geometry(plano_geom, fmt)
+                    col.download_button(
+                        f"⬇️ Imposition {fmt.upper()}", data,
+                        file_name=f"plano_{pcs_per_plano}pcs.{fmt}", mime=mime, key=f"dl_plano_{fmt}"
+                    )
     
     # PATTERN 2D
     st.markdown("---")
     with st.expander("📐 2D Technical Pattern", expanded=False):
         if st.button("🎨 Generate Pattern", key="gen_pattern"):
             with st.spinner("Generating pattern..."):
-                x = [0]
-                for width in [lem, L, P, L, P]:
-                    x.append(x[-1] + width)
-                
-                y_actual_top = T + top_lip
-                y_top_fold = T
-                y_green = 0.5 * L
-                y_base = 0
-                y_bottom = -(0.5 * P)
-                
-                y_hole_upper = T + (top_lip / 2)
-                y_hole_lower = T - (top_lip / 2)
-                
-                v_mids = [(x[1] + x[2]) / 2, (x[3] + x[4]) / 2]
-                p_panels = [(x[2], x[3]), (x[4], x[5])]
-                
-                fig, ax = plt.subplots(figsize=(12, 8))
-                
-                for val_x in x:
-                    ax.plot([val_x/conv, val_x/conv], [y_bottom/conv, y_actual_top/conv], color='black', lw=1)
-                
-                ax.plot([x[0]/conv, x[-1]/conv], [y_actual_top/conv, y_actual_top/conv], color='black', lw=1.5)
-                ax.plot([x[0]/conv, x[-1]/conv], [y_top_fold/conv, y_top_fold/conv], color='black', ls='--', lw=1.2, label='Fold line')
-                ax.plot([x[0]/conv, x[-1]/conv], [y_bottom/conv, y_bottom/conv], color='black', lw=1.5)
-                ax.plot([x[0]/conv, x[-1]/conv], [y_green/conv, y_green/conv], color='green', ls='--', lw=1, label='Gusset')
-                
-                ax.plot([v_mids[0]/conv, v_mids[0]/conv], [y_green/conv, y_actual_top/conv], color='blue', lw=1.5)
-                ax.plot([v_mids[1]/conv, v_mids[1]/conv], [y_green/conv, y_actual_top/conv], color='blue', lw=1.5)
-
-                plt.plot([x[0], x[-1]], [y_base, y_base], color='blue', ls=':', alpha=0.5) 
-                
-                hole_size = 0.35
-                for p_start, p_end in p_panels:
-                    h1_x = p_start + (0.25 * P)
-                    h2_x = p_start + (0.75 * P)
-                    for h_x in [h1_x, h2_x]:
-                        up_circ = plt.Circle((h_x/conv, y_hole_upper/conv), hole_size, color='blue', fill=False, lw=1.5)
-                        low_circ = plt.Circle((h_x/conv, y_hole_lower/conv), hole_size, color='blue', fill=False, lw=1.5)
-                        ax.add_patch(up_circ)
-                        ax.add_patch(low_circ)
-                
-                p_mid1 = (x[2] + x[3]) / 2
-                p_mid2 = (x[4] + x[5]) / 2
+                fig = draw_pattern(
+                    P, L, T, lem, top_lip,
+                    title=f"Paper Bag Pattern: {P/conv:.2f}×{L/conv:.2f}×{T/conv:.2f} {unit}",
+                    conv=conv, unit=unit
+                )
                 
-                ax.plot([v_mids[0]/conv, x[0]/conv], [y_green/conv, (y_green - (v_mids[0] - x[0]))/conv], color='red', lw=2)
-                ax.plot([v_mids[0]/conv, p_mid1/conv], [y_green/conv, y_bottom/conv], color='red', lw=2)
-                ax.plot([p_mid1/conv, v_mids[1]/conv], [y_bottom/conv, y_green/conv], color='red', lw=2)
-                ax.plot([v_mids[1]/conv, p_mid2/conv], [y_green/conv, y_bottom/conv], color='red', lw=2)
-                ax.plot([p_mid2/conv, x[5]/conv], [y_bottom/conv, y_base/conv], color='red', lw=2)
+                with metrics.stage("pyplot"):
+                    st.pyplot(fig)
                 
-                ax.set_aspect('equal')
-                ax.set_title(f"Paper Bag Pattern: {P/conv:.2f}×{L/conv:.2f}×{T/conv:.2f} {unit}", fontsize=14, fontweight='bold')
-                ax.set_xlabel(f"Width ({unit})")
-                ax.set_ylabel(f"Height ({unit})")
-                ax.grid(True, which='both', linestyle=':', alpha=0.3)
-                ax.legend()
-                
-                st.pyplot(fig)
+                # Vector die-line for the die-maker (cm)
+                pattern_geom = pattern_geometry(P, L, T, lem, top_lip)
+                dl_cols = st.columns(3)
+                for col, fmt in zip(dl_cols, ("svg", "dxf", "pdf")):
+                    data, mime = export_geometry(pattern_geom, fmt)
+                    col.download_button(
+                        f"⬇️ Die-Line {fmt.upper()}", data,
+                        file_name=f"pattern_{P:g}x{L:g}x{T:g}cm.{fmt}", mime=mime, key=f"dl_pattern_{fmt}"
+                    )
+    
+    # BULK IMPORT
+    st.markdown("---")
+    with st.expander("📥 Bulk RFQ Import", expanded=False):
+        st.caption(
+            "RFQ spreadsheet (CSV, JSONL or Excel) with P, L, T and qty columns in cm. plano_w, plano_h, lem, "
+            "top_lip and m_* are optional; blanks, cost items, margin and press rules follow the settings above."
+        )
+        upload = st.file_uploader("RFQ File", type=["csv", "jsonl", "xlsx"], key="bulk_file")
+        bq1, bq2 = st.columns([3, 1], vertical_alignment="bottom")
+        bulk_method = bq1.selectbox(
+            "Layout Method", ["grid", "guillotine"], key="bulk_method",
+            format_func={"grid": "Grid (fast)", "guillotine": "Guillotine (fast when sizes repeat)"}.get
+        )
+        if bq2.button("▶️ Process", key="bulk_run", type="primary", disabled=upload is None, use_container_width=True):
+            if st.session_state.get('bulk') is not None:
+                st.session_state.bulk.close()
+            bulk = st.session_state.bulk = BulkQuote()
+            st.session_state.bulk_name = upload.name.rsplit(".", 1)[0]
+            st.session_state.bulk_page = 1
+            progress = st.progress(0.0, text="Reading file...")
+            preview = st.empty()
+            bulk_defaults = dict(
+                plano_w=plano_w, plano_h=plano_h, lem=lem, top_lip=top_lip,
+                m_top=m_top, m_bottom=m_bottom, m_left=m_left, m_right=m_right
+            )
+            try:
+                # Chunks are quoted and spooled to disk one at a time; only the newest page is shown
+                for count in bulk.run(
+                    read_upload(upload, upload.name), cost_items, margin_type, margin_val, bulk_method,
+                    defaults=bulk_defaults, constraints=layout_rules, production=production
+                ):
+                    progress.progress(min(upload.tell() / max(upload.size, 1), 1.0), text=f"{count:,} rows quoted...")
+                    preview.dataframe(bulk.page(bulk.pages - 1), use_container_width=True)
+            except (ValueError, KeyError, ImportError) as e:
+                st.error(f"⚠️ Could not process the file: {e}")
+            progress.empty()
+            preview.empty()
+        
+        bulk = st.session_state.get('bulk')
+        if bulk is not None and bulk.count:
+            if not bulk.done:
+                st.warning("⚠️ Processing stopped early, the results below are incomplete.")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Rows", f"{bulk.count:,}")
+            col2.metric("Valid", f"{bulk.valid:,}")
+            page_no = col3.number_input("Page", min_value=1, max_value=bulk.pages, step=1, key="bulk_page")
+            st.dataframe(bulk.page(page_no - 1), use_container_width=True)
+            st.caption(f"Page {page_no:,} of {bulk.pages:,}, {bulk.page_size} rows per page.")
+            if bulk.rejected:
+                st.caption(f"⚠️ {bulk.rejected:,} rows rejected (blank or non-numeric spec), see the `error` column.")
+            st.download_button(
+                "⬇️ Download Results (CSV)", bulk.open, file_name=f"{st.session_state.bulk_name}_quotes.csv",
+                mime="text/csv", on_click="ignore", key="dl_bulk"
+            )
+    
+    # INSTRUMENTATION
+    st.markdown("---")
+    with st.expander("🩺 Performance Debug", expanded=False):
+        st.caption("Per-stage timings, cache hit rates and payload sizes for every session in this process.")
+        st.toggle(
+            "Enable Instrumentation", value=metrics.enabled, key="metrics_on",
+            on_change=lambda: setattr(metrics, "enabled", st.session_state.metrics_on)
+        )
+        if METRICS_PATH:
+            st.caption(f"Snapshot written to `{METRICS_PATH}` on every rerun.")
+        
+        snapshot = metrics.snapshot()
+        if snapshot["stages"]:
+            st.table([{
+                "Stage": name,
+                "Count": s["count"],
+                "Mean (ms)": f"{s['mean_s'] * 1000:.2f}",
+                "Max (ms)": f"{s['max_s'] * 1000:.2f}",
+                "Last (ms)": f"{s['last_s'] * 1000:.2f}",
+            } for name, s in sorted(snapshot["stages"].items())])
+        st.table([{
+            "Cache": name,
+            "Entries": f"{c['size']} / {c['maxsize']}",
+            "Hits": c["hits"],
+            "Misses": c["misses"],
+            "Hit Rate": f"{c['hit_rate']:.1%}",
+        } for name, c in sorted(snapshot["caches"].items())])
+        if snapshot["bytes"] or snapshot["counters"]:
+            st.table([{
+                "Payload": name,
+                "Count": b["count"],
+                "Mean (KB)": f"{b['mean_bytes'] / 1024:.1f}",
+                "Last (KB)": f"{b['last_bytes'] / 1024:.1f}",
+            } for name, b in sorted(snapshot["bytes"].items())] + [{
+                "Payload": name, "Count": n, "Mean (KB)": "-", "Last (KB)": "-",
+            } for name, n in sorted(snapshot["counters"].items())])
+        
+        col1, col2, col3 = st.columns(3)
+        if col1.button("🔄 Reset Metrics", key="metrics_reset"):
+            metrics.reset()
+            st.rerun()
+        col2.download_button("⬇️ JSON", metrics.to_json(), file_name="paperbag_metrics.json",
+                             mime="application/json", key="metrics_json")
+        col3.download_button("⬇️ Prometheus", metrics.to_prometheus(), file_name="paperbag_metrics.prom",
+                             mime="text/plain", key="metrics_prom")
 
 # ==========================================
 # TAB 2: CUSTOMER PREVIEW RESULTS
@@ -556,14 +667,33 @@ with tab2:
     # 3D Mockup
     st.subheader("🎨 3D Preview")
     
-    col1, col2 = st.columns(2)
-    bag_color = col1.color_picker("Bag Color", "#D3D3D3")
-    handle_color = col2.color_picker("Handle Color", "#222222")
-    
-    if st.button("🎨 Generate Preview", type="primary"):
-        with st.spinner("Rendering 3D mockup..."):
-            fig = generate_3d_mockup(P, L, T, bag_color, handle_color, conv, unit)
-            st.plotly_chart(fig, use_container_width=True)
+    # Colour changes rerun only this fragment and restyle the kept figure;
+    # the mesh is rebuilt only when the bag size or unit changes
+    @st.fragment
+    def mockup_view():
+        col1, col2 = st.columns(2)
+        bag_color = col1.color_picker("Bag Color", "#D3D3D3", key="bag_color")
+        handle_color = col2.color_picker("Handle Color", "#222222", key="handle_color")
+        col3, col4 = st.columns(2)
+        lod = col3.selectbox("Preview Detail", list(LOD_LEVELS), index=list(LOD_LEVELS).index("medium"), key="mockup_lod")
+        art_file = col4.file_uploader("Front Artwork", type=["png", "jpg", "jpeg"], key="mockup_art")
+        
+        if st.button("🎨 Generate Preview", type="primary", key="gen_3d"):
+            st.session_state.show_mockup = True
+        
+        if st.session_state.get("show_mockup"):
+            art_id = art_file.file_id if art_file is not None else None
+            if st.session_state.get("mockup_dims") != (P, L, T, unit, lod, art_id):
+                artwork = prepare_artwork(art_file.getvalue(), lod) if art_file is not None else None
+                st.session_state.mockup_fig = build_mockup(P, L, T, conv, unit, lod, artwork)
+                st.session_state.mockup_dims = (P, L, T, unit, lod, art_id)
+            fig = restyle_mockup(st.session_state.mockup_fig, bag_color, handle_color)
+            if metrics.enabled:
+                metrics.observe_bytes("mockup_json", len(fig.to_json()))
+            with metrics.stage("plotly_mockup"):
+                st.plotly_chart(fig, use_container_width=True)
+    
+    mockup_view()
     
     st.markdown("---")
     st.button("💵 Request Quote", type="primary", disabled=True, help="Feature available when embedded on your website")
@@ -577,4 +707,8 @@ st.markdown("""
     <p><strong>Paper Bag Calculator Pro</strong> v1.0 | Built with Streamlit</p>
     <p>For business inquiries: <a href='mailto:chaharudin202@gmail.com'>chaharudin202@gmail.com</a></p>
 </div>
-""", unsafe_allow_html=True) 
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+metrics.observe_time("rerun", time.perf_counter() - rerun_start)
+if METRICS_PATH and metrics.enabled:
+    metrics.export(METRICS_PATH)
@@ -0,0 +1,97 @@
+"""Core math for the Paper Bag Calculator (no Streamlit imports).
+
+Public names are loaded lazily from their submodules on first access, so
+``import paperbag`` (and the CLI) stays cheap until the math is needed.
+"""
+import importlib
+
+_EXPORTS = {
+    "BulkQuote": "paperbag.bulk",
+    "read_upload": "paperbag.bulk",
+    "LRUCache": "paperbag.cache",
+    "cached_optimize_plano": "paperbag.cache",
+    "layout_cache": "paperbag.cache",
+    "DEFAULT_PLANO_CATALOG": "paperbag.catalog",
+    "rank_planos": "paperbag.catalog",
+    "Basis": "paperbag.costs",
+    "CostRules": "paperbag.costs",
+    "calculate_costs": "paperbag.costs",
+    "compile_cost_items": "paperbag.costs",
+    "calculate_profit": "paperbag.costs",
+    "cost_totals": "paperbag.costs",
+    "is_paper": "paperbag.costs",
+    "without_paper": "paperbag.costs",
+    "export_geometry": "paperbag.dieline",
+    "pattern_geometry": "paperbag.dieline",
+    "tile_geometry": "paperbag.dieline",
+    "GangPattern": "paperbag.gang",
+    "allocate_gang_costs": "paperbag.gang",
+    "plan_gang_run": "paperbag.gang",
+    "LayoutJob": "paperbag.jobs",
+    "cached_layouts": "paperbag.jobs",
+    "nesting_pool": "paperbag.jobs",
+    "submit_layout": "paperbag.jobs",
+    "METRICS_PATH": "paperbag.instrumentation",
+    "Metrics": "paperbag.instrumentation",
+    "metrics": "paperbag.instrumentation",
+    "LOD_LEVELS": "paperbag.mockup",
+    "build_mockup": "paperbag.mockup",
+    "generate_3d_mockup": "paperbag.mockup",
+    "mockup_faces": "paperbag.mockup",
+    "mockup_geometry": "paperbag.mockup",
+    "prepare_artwork": "paperbag.mockup",
+    "restyle_mockup": "paperbag.mockup",
+    "GRAIN_DIRECTIONS": "paperbag.layout",
+    "PLACEMENT_DTYPE": "paperbag.layout",
+    "BlockLayout": "paperbag.layout",
+    "LayoutConstraints": "paperbag.layout",
+    "PlanoLayout": "paperbag.layout",
+    "count_pieces": "paperbag.layout",
+    "optimize_plano": "paperbag.layout",
+    "search_plano": "paperbag.layout",
+    "guillotine_blocks": "paperbag.nesting",
+    "pattern_size": "paperbag.pattern",
+    "unit_size": "paperbag.pattern",
+    "CALCULATOR": "paperbag.pipeline",
+    "Graph": "paperbag.pipeline",
+    "Pipeline": "paperbag.pipeline",
+    "cost_steps": "paperbag.pricebreak",
+    "fill_up_qty": "paperbag.pricebreak",
+    "parse_quantities": "paperbag.pricebreak",
+    "price_curve": "paperbag.pricebreak",
+    "DEFAULT_PROCESSES": "paperbag.production",
+    "ProductionRules": "paperbag.production",
+    "batch_run_size": "paperbag.production",
+    "plan_production": "paperbag.production",
+    "plano_sheets": "paperbag.production",
+    "quote_batch": "paperbag.quote",
+    "QuoteService": "paperbag.server",
+    "serve": "paperbag.server",
+    "ResultStore": "paperbag.store",
+    "default_store": "paperbag.store",
+    "spec_hash": "paperbag.store",
+    "SWEEP_METRICS": "paperbag.sensitivity",
+    "sensitivity_grid": "paperbag.sensitivity",
+    "sensitivity_heatmap": "paperbag.sensitivity",
+    "bag_frontier": "paperbag.solver",
+    "min_qty_for_price": "paperbag.solver",
+    "pareto_front": "paperbag.solver",
+    "draw_pattern": "paperbag.render",
+    "image_cache": "paperbag.render",
+    "render_plano_layout": "paperbag.render",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'paperbag' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
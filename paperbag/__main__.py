@@ -0,0 +1,5 @@
+import sys
+
+from paperbag.cli import main
+
+sys.exit(main())
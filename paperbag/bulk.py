@@ -0,0 +1,163 @@
+"""Bulk RFQ import: quote an uploaded spec sheet chunk by chunk.
+
+Rows are read lazily from CSV, JSONL or Excel, quoted through the same
+quote_batch pipeline as the CLI and spooled to a temporary CSV on disk.
+Only one chunk and the byte offset of each results page are held in
+memory, so any page (or the whole file, for download) can be read back
+without keeping the results around.
+"""
+import csv
+import io
+import itertools
+import os
+import tempfile
+import weakref
+
+from paperbag.cli import QUOTE_COLUMNS, quote_chunks, read_rows
+
+BULK_FORMATS = ("csv", "jsonl", "xlsx")
+BULK_CHUNK_SIZE = 2000
+DEFAULT_PAGE_SIZE = 50
+
+
+def detect_upload_format(name):
+    """File format from an upload's name."""
+    lower = name.lower()
+    if lower.endswith((".xlsx", ".xlsm")):
+        return "xlsx"
+    if lower.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if lower.endswith((".csv", ".txt")):
+        return "csv"
+    raise ValueError(f"Unsupported file type: {name}")
+
+
+def _text_rows(fileobj, fmt):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        yield from read_rows(text, fmt)
+    finally:
+        # Hand the binary file back to its owner instead of closing it
+        text.detach()
+
+
+def _excel_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Excel import needs openpyxl (pip install openpyxl)") from None
+
+    # read_only streams the sheet XML row by row instead of building the workbook
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        names = ["" if h is None else str(h).strip() for h in header]
+        for values in rows:
+            if all(v is None for v in values):
+                continue
+            yield {name: "" if v is None else v for name, v in zip(names, values) if name}
+    finally:
+        workbook.close()
+
+
+def read_upload(fileobj, name):
+    """Yield spec rows as dicts from a binary file object (CSV, JSONL or .xlsx)."""
+    fmt = detect_upload_format(name)
+    fileobj.seek(0)
+    if fmt == "xlsx":
+        return _excel_rows(fileobj)
+    return _text_rows(fileobj, fmt)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _parse_quote(row):
+    """Quote columns read back from the spool CSV as numbers."""
+    for name in QUOTE_COLUMNS:
+        value = row.get(name)
+        if name == "valid":
+            row[name] = value == "True"
+        elif name == "error":
+            row[name] = value or None
+        elif name in ("pcs_per_plano", "total_plano_req"):
+            row[name] = int(value) if value else None
+        else:
+            row[name] = float(value) if value else None
+    return row
+
+
+class BulkQuote:
+    """Quotes of one uploaded spec file, spooled to a temporary CSV.
+
+    ``run()`` quotes chunk by chunk and yields the row count after each
+    chunk so callers can show progress; ``page()`` reads one page of
+    results back. Rows with a missing or malformed spec are kept in the
+    results with ``valid=False`` and the reason in ``error``; ``rejected``
+    counts them. The spool file is removed by ``close()`` or when the
+    object is garbage collected.
+    """
+
+    def __init__(self, page_size=DEFAULT_PAGE_SIZE):
+        fd, self.path = tempfile.mkstemp(prefix="paperbag_bulk_", suffix=".csv")
+        os.close(fd)
+        self.page_size = page_size
+        self.fieldnames = None
+        self.count = 0
+        self.valid = 0
+        self.rejected = 0
+        self.done = False
+        self._pages = []  # file offset of the first row of each page
+        self._finalizer = weakref.finalize(self, _remove, self.path)
+
+    @property
+    def pages(self):
+        return len(self._pages)
+
+    def run(self, rows, cost_items, margin_type, margin_val, method="grid",
+            chunk_size=BULK_CHUNK_SIZE, defaults=None, constraints=None, production=None):
+        """Quote ``rows`` into the spool file, yielding the row count per chunk."""
+        with open(self.path, "w", newline="", encoding="utf-8") as out:
+            writer = None
+            for quotes in quote_chunks(rows, cost_items, margin_type, margin_val, method,
+                                       chunk_size, defaults, constraints, production):
+                if writer is None:
+                    first = quotes[0][0]
+                    self.fieldnames = list(first) + [c for c in QUOTE_COLUMNS if c not in first]
+                    writer = csv.DictWriter(out, self.fieldnames, extrasaction="ignore")
+                    writer.writeheader()
+                for row, quote in quotes:
+                    if self.count % self.page_size == 0:
+                        self._pages.append(out.tell())
+                    record = dict(row)
+                    record.update(quote)
+                    writer.writerow(record)
+                    self.count += 1
+                    self.valid += bool(quote["valid"])
+                    self.rejected += quote["pcs_per_plano"] is None
+                out.flush()
+                yield self.count
+        self.done = True
+
+    def page(self, index):
+        """Rows of results page ``index`` (0-based) as dicts."""
+        if not 0 <= index < len(self._pages):
+            return []
+        with open(self.path, newline="", encoding="utf-8") as f:
+            f.seek(self._pages[index])
+            reader = csv.DictReader(f, self.fieldnames)
+            return [_parse_quote(row) for row in itertools.islice(reader, self.page_size)]
+
+    def open(self):
+        """The spool CSV as a binary file, for downloads."""
+        return open(self.path, "rb")
+
+    def close(self):
+        self._finalizer()
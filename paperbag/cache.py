@@ -0,0 +1,116 @@
+"""Process-wide LRU caches.
+
+Module globals survive Streamlit reruns, so one cache is shared by every
+session served by the same process.
+"""
+import threading
+from collections import OrderedDict
+
+from paperbag.layout import search_plano
+from paperbag.instrumentation import metrics
+
+# Dimensions are rounded to this many decimals (cm) before keying, so
+# unit conversions like 43/2.54*2.54 still hit the same entry
+KEY_DECIMALS = 4
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with least-recently-used eviction."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Optional slower tier with get(key, default)/put(key, value), e.g. a ResultStore
+        self.backing = None
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        if self.backing is not None:
+            value = self.backing.get(key, _MISSING)
+            if value is not _MISSING:
+                self._insert(key, value)
+                return value
+        return default
+
+    def put(self, key, value):
+        self._insert(key, value)
+        if self.backing is not None:
+            self.backing.put(key, value)
+
+    def _insert(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def layout_key(PL_W, PL_H, U_W, U_H):
+    """Normalized cache key for a (plano, unit size) pair."""
+    return tuple(round(float(v), KEY_DECIMALS) for v in (PL_W, PL_H, U_W, U_H))
+
+
+def constraints_key(constraints):
+    """Key suffix for layout constraints; empty for the plain engine so old keys still match."""
+    if constraints is None or constraints.free:
+        return ()
+    return constraints.key()
+
+
+layout_cache = LRUCache(maxsize=2048)
+metrics.watch_cache("layout", layout_cache)
+
+
+def cached_optimize_plano(PL_W, PL_H, U_W, U_H, method="guillotine", constraints=None):
+    """optimize_plano backed by the shared layout cache.
+
+    A guillotine search that runs out of time falls back to the grid; that
+    result is returned but not cached, so a later call can search again.
+    """
+    key = layout_key(PL_W, PL_H, U_W, U_H) + (method,) + constraints_key(constraints)
+    value = layout_cache.get(key, _MISSING)
+    if value is _MISSING:
+        with metrics.stage("optimize_plano"):
+            value, finished = search_plano(*key[:5], constraints=constraints)
+        if finished:
+            layout_cache.put(key, value)
+        else:
+            metrics.count("layout_search_timeout")
+    return value
@@ -0,0 +1,70 @@
+"""Stock plano catalog: pick the cheapest sheet size for a job."""
+import numpy as np
+
+from paperbag.costs import cost_totals, without_paper
+from paperbag.jobs import cached_layouts
+from paperbag.production import plano_sheets
+
+
+def _sheet(w, h, price):
+    return {"name": f"{h:g} × {w:g}", "w": float(w), "h": float(h), "price": float(price)}
+
+
+# Common offset plano sizes (cm). Prices are placeholders to be replaced
+# with the supplier's price list in the Settings tab.
+DEFAULT_PLANO_CATALOG = [
+    _sheet(86, 61, 3000),
+    _sheet(92, 61, 3250),
+    _sheet(90, 65, 3400),
+    _sheet(100, 65, 3800),
+    _sheet(100, 70, 4050),
+    _sheet(102, 72, 4250),
+    _sheet(104, 79, 4750),
+    _sheet(109, 79, 5000),
+    _sheet(110, 80, 5100),
+    _sheet(119, 84, 5800),
+    _sheet(120, 90, 6250),
+    _sheet(125, 90, 6500),
+]
+
+
+def rank_planos(catalog, unit_w, unit_h, qty, cost_items, area_cm2_per_pcs, method="guillotine",
+                constraints=None, production=None):
+    """Evaluate every catalog sheet and rank them by total production cost.
+
+    The catalog price is the paper cost per sheet; it replaces the paper
+    items of ``cost_items`` (see ``is_paper``) and is added to the rest.
+    Layouts go through the shared cache, uncached sheets are searched in
+    parallel, and the costs of all sheets are evaluated in one vectorized
+    pass. Returns a list of dicts, cheapest first; sheets the pattern does
+    not fit on are left out.
+    """
+    sizes = [(sheet["w"], sheet["h"], unit_w, unit_h) for sheet in catalog]
+    rows = []
+    for sheet, (layout, final_w, final_h) in zip(catalog, cached_layouts(sizes, method, constraints)):
+        if len(layout) > 0:
+            rows.append((sheet, layout, final_w, final_h))
+    if not rows:
+        return []
+
+    pcs = np.array([len(r[1]) for r in rows])
+    price = np.array([r[0]["price"] for r in rows])
+    area = np.array([r[0]["w"] * r[0]["h"] for r in rows])
+    sheets = plano_sheets(qty, pcs, production)
+    total = cost_totals(without_paper(cost_items), qty, sheets, area_cm2_per_pcs) + price * sheets
+    efficiency = (pcs * unit_w * unit_h) / area * 100
+
+    ranked = []
+    for idx in np.argsort(total, kind="stable"):
+        sheet, layout, final_w, final_h = rows[idx]
+        ranked.append({
+            "name": sheet["name"],
+            "plano_w": sheet["w"],
+            "plano_h": sheet["h"],
+            "price": sheet["price"],
+            "pcs_per_plano": int(pcs[idx]),
+            "total_plano_req": int(sheets[idx]),
+            "efficiency": float(efficiency[idx]),
+            "production_cost": float(total[idx]),
+        })
+    return ranked
@@ -0,0 +1,259 @@
+"""Headless batch quoting: ``python -m paperbag quote specs.csv --costs costs.json``.
+
+Reads specs as CSV or JSONL, quotes them in chunks through quote_batch and
+streams the results out as CSV or JSONL. Only argparse/csv/json are loaded
+at start-up; NumPy and the pricing core are imported with the first chunk.
+
+``python -m paperbag serve`` runs the HTTP quoting service (paperbag.server).
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Quote columns appended after the input columns
+QUOTE_COLUMNS = [
+    "pola_w_net", "pola_h_net", "unit_w", "unit_h",
+    "valid", "pcs_per_plano", "total_plano_req", "efficiency",
+    "production_cost", "profit", "selling_price", "unit_price", "error",
+]
+
+# Spec columns that must be a number above zero in every row
+POSITIVE_COLUMNS = ("P", "L", "T", "qty")
+
+
+def _detect_format(path, explicit):
+    if explicit:
+        return explicit
+    if path and path.lower().endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def _open(path, mode):
+    if path in (None, "-"):
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def read_rows(stream, fmt):
+    """Yield spec rows as dicts."""
+    if fmt == "jsonl":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(stream)
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_row(row, defaults):
+    """Spec values of one row as floats, or (None, error message).
+
+    Blank cells take the default for their column; required columns have
+    no default.
+    """
+    spec = {}
+    for name, default in defaults.items():
+        value = row.get(name)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if default is None:
+                return None, f"{name} is required"
+            spec[name] = float(default)
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None, f"{name} is not a number: {value!r}"
+        if not math.isfinite(number) or number < 0 or (name in POSITIVE_COLUMNS and number <= 0):
+            return None, f"{name} is out of range: {value!r}"
+        spec[name] = number
+    return spec, None
+
+
+def _columns(chunk, defaults):
+    """Spec columns of the rows that parse, their indices and an error per row."""
+    specs = {name: [] for name in defaults}
+    good, errors = [], []
+    for i, row in enumerate(chunk):
+        spec, error = _parse_row(row, defaults)
+        errors.append(error)
+        if spec is not None:
+            good.append(i)
+            for name, value in spec.items():
+                specs[name].append(value)
+    return specs, good, errors
+
+
+def _to_list(column):
+    """NumPy column -> list of plain Python values, NaN as None."""
+    values = column.tolist()
+    if column.dtype.kind == "f":
+        values = [None if math.isnan(v) else v for v in values]
+    return values
+
+
+def quote_chunks(rows, cost_items, margin_type, margin_val, method, chunk_size,
+                 defaults=None, constraints=None, production=None):
+    """Yield one list of (input row, quote dict) pairs per chunk of rows.
+
+    ``defaults`` fills blank spec cells (before the built-in SPEC_DEFAULTS);
+    ``constraints`` are the layout rules and ``production`` the production
+    plan. Rows with a missing or malformed spec are not quoted: they come
+    back with ``valid=False`` and the reason in ``error``.
+    """
+    from paperbag.quote import SPEC_DEFAULTS, quote_batch
+
+    spec_defaults = dict(SPEC_DEFAULTS, **(defaults or {}))
+    for chunk in chunked(rows, chunk_size):
+        specs, good, errors = _columns(chunk, spec_defaults)
+        quotes = [dict.fromkeys(QUOTE_COLUMNS) for _ in chunk]
+        if good:
+            result = quote_batch(specs, cost_items, margin_type, margin_val, method, constraints, production)
+            columns = [_to_list(result[name]) for name in QUOTE_COLUMNS[:-1]]
+            for i, values in zip(good, zip(*columns)):
+                quotes[i].update(zip(QUOTE_COLUMNS, values))
+        for quote, error in zip(quotes, errors):
+            if error is not None:
+                quote["valid"] = False
+                quote["error"] = error
+            elif not quote["valid"]:
+                quote["error"] = "pattern does not fit the plano"
+        yield list(zip(chunk, quotes))
+
+
+def quote_stream(rows, cost_items, margin_type, margin_val, method, chunk_size, production=None):
+    """Yield (input row, quote dict) pairs, quoting chunk by chunk."""
+    for quotes in quote_chunks(rows, cost_items, margin_type, margin_val, method, chunk_size,
+                               production=production):
+        yield from quotes
+
+
+def write_quotes(stream, fmt, quotes):
+    writer = None
+    count = 0
+    for row, quote in quotes:
+        record = dict(row)
+        record.update(quote)
+        if fmt == "jsonl":
+            stream.write(json.dumps(record) + "\n")
+        else:
+            if writer is None:
+                writer = csv.DictWriter(stream, fieldnames=list(record))
+                writer.writeheader()
+            writer.writerow(record)
+        count += 1
+    return count
+
+
+def load_production(path):
+    """ProductionRules from a JSON file ({"processes": [...], "overs": %, "run_size": pcs}), or None."""
+    if not path:
+        return None
+    from paperbag.production import ProductionRules
+
+    with open(path, encoding="utf-8") as f:
+        plan = json.load(f)
+    return ProductionRules(plan.get("processes", ()), plan.get("overs", 0.0), plan.get("run_size"))
+
+
+def cmd_quote(args):
+    with open(args.costs, encoding="utf-8") as f:
+        cost_items = json.load(f)
+
+    in_fmt = _detect_format(args.input, args.input_format)
+    out_fmt = _detect_format(args.output, args.output_format)
+
+    with _open(args.input, "r") as src, _open(args.output, "w") as dst:
+        quotes = quote_stream(
+            read_rows(src, in_fmt), cost_items,
+            args.margin_type, args.margin_val, args.method, args.chunk_size,
+            load_production(args.production)
+        )
+        count = write_quotes(dst, out_fmt, quotes)
+    print(f"Quoted {count} specs", file=sys.stderr)
+    return 0
+
+
+def cmd_serve(args):
+    import logging
+
+    from paperbag.server import serve
+    from paperbag.store import default_store
+
+    # Opening the store also puts it behind the layout cache, shared with the apps
+    store = default_store()
+    if args.costs:
+        with open(args.costs, encoding="utf-8") as f:
+            cost_items = json.load(f)
+    else:
+        cost_items = store.load_catalog(args.catalog)
+    if not cost_items:
+        print(f"No cost items: pass --costs or save the '{args.catalog}' catalog from the app", file=sys.stderr)
+        return 2
+
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(message)s")
+    serve(
+        cost_items, args.host, args.port,
+        margin_type=args.margin_type, margin_val=args.margin_val, method=args.method,
+        workers=args.workers, max_pending=args.max_pending, cors_origin=args.cors_origin or None,
+        production=load_production(args.production),
+    )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="paperbag", description="Paper bag calculator (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    q = sub.add_parser("quote", help="Quote a CSV/JSONL file of bag specs")
+    q.add_argument("input", nargs="?", default="-", help="Spec file (CSV or JSONL), '-' for stdin")
+    q.add_argument("-o", "--output", default="-", help="Output file, '-' for stdout")
+    q.add_argument("--costs", required=True, help="JSON list of cost items (same fields as the app)")
+    q.add_argument("--input-format", choices=["csv", "jsonl"])
+    q.add_argument("--output-format", choices=["csv", "jsonl"])
+    q.add_argument("--margin-type", default="Percentage (%)",
+                   help="Percentage (%%), Fixed Total or Fixed per Pcs (app labels also accepted)")
+    q.add_argument("--margin-val", type=float, default=30.0)
+    q.add_argument("--method", choices=["grid", "guillotine"], default="grid")
+    q.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    q.add_argument("--production", help="JSON production plan: processes, overs and run size")
+    q.set_defaults(func=cmd_quote)
+
+    s = sub.add_parser("serve", help="Run the HTTP/JSON quoting service")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--costs", help="JSON list of cost items (default: the catalog saved by the app)")
+    s.add_argument("--catalog", default="cost_items_en", help="Store catalog to price with when --costs is not given")
+    s.add_argument("--margin-type", default="Percentage (%)",
+                   help="Percentage (%%), Fixed Total or Fixed per Pcs (app labels also accepted)")
+    s.add_argument("--margin-val", type=float, default=30.0)
+    s.add_argument("--method", choices=["grid", "guillotine"], default="guillotine")
+    s.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                   help="Computations running at once")
+    s.add_argument("--max-pending", type=int, default=1024,
+                   help="Computations allowed to wait before answering 503")
+    s.add_argument("--production", help="JSON production plan: processes, overs and run size")
+    s.add_argument("--cors-origin", default="*", help="Access-Control-Allow-Origin value ('' to omit)")
+    s.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
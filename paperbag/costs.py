@@ -0,0 +1,186 @@
+"""Cost items and profit margin.
+
+Cost items are dicts as kept in ``st.session_state.cost_items``. Both the
+Indonesian (nama/harga, "Per Lembar Plano") and English (name/price,
+"Per Plano Sheet") spellings are accepted. ``"paper": True`` marks the
+paper itself, which a plano catalog price replaces.
+
+Items are compiled once into a CostRules table: every basis becomes a
+coefficient on a driver (orders, sheets, pcs, area × qty, or batches of a
+given size), so a total is one dot product and prices for many quantities
+are one matrix product.
+"""
+import enum
+from functools import lru_cache
+
+import numpy as np
+
+from paperbag.instrumentation import metrics
+
+
+class Basis(enum.Enum):
+    FIXED = "Fixed per Order"
+    PLANO = "Per Plano Sheet"
+    PCS = "Per Pcs Bag"
+    AREA = "Per Area (cm2)"
+    BATCH = "Per Batch (Multiple Pcs)"
+
+    @classmethod
+    def parse(cls, label):
+        """Basis for an app label (English or Indonesian), or None if unknown."""
+        if isinstance(label, cls):
+            return label
+        label = BASIS_ALIASES.get(label, label)
+        try:
+            return cls(label)
+        except ValueError:
+            return None
+
+
+BASIS_ALIASES = {
+    "Per Pesanan (Tetap)": Basis.FIXED.value,
+    "Per Lembar Plano": Basis.PLANO.value,
+    "Per Pcs Tas": Basis.PCS.value,
+    "Per Batch (Kelipatan Pcs)": Basis.BATCH.value,
+}
+
+MARGIN_PERCENT = "Percentage (%)"
+MARGIN_TOTAL = "Fixed Total"
+MARGIN_PER_PCS = "Fixed per Pcs"
+
+MARGIN_ALIASES = {
+    "Persentase (%)": MARGIN_PERCENT,
+    "Fix Total (Rp)": MARGIN_TOTAL,
+    "Fixed Total ($)": MARGIN_TOTAL,
+    "Fix per Pcs (Rp)": MARGIN_PER_PCS,
+    "Fixed per Pcs ($)": MARGIN_PER_PCS,
+}
+
+# Fixed driver columns; batch columns (one per distinct batch size) follow
+DRIVER_ORDERS, DRIVER_SHEETS, DRIVER_PCS, DRIVER_AREA_QTY = range(4)
+_DRIVER_COLUMN = {
+    Basis.FIXED: DRIVER_ORDERS,
+    Basis.PLANO: DRIVER_SHEETS,
+    Basis.PCS: DRIVER_PCS,
+    Basis.AREA: DRIVER_AREA_QTY,
+}
+
+
+def item_name(item):
+    return item['name'] if 'name' in item else item['nama']
+
+
+def item_price(item):
+    return item['price'] if 'price' in item else item['harga']
+
+
+# Items saved before the "paper" flag existed: per-sheet items named like paper
+PAPER_PREFIXES = ("kertas", "paper")
+
+
+def is_paper(item):
+    """Whether an item is the paper cost (replaced by a catalog sheet price)."""
+    if 'paper' in item:
+        return bool(item['paper'])
+    return (Basis.parse(item.get('basis')) is Basis.PLANO
+            and item_name(item).strip().lower().startswith(PAPER_PREFIXES))
+
+
+def without_paper(cost_items):
+    """Cost items minus the paper, for pricing with catalog sheet prices."""
+    return [item for item in cost_items if not is_paper(item)]
+
+
+class CostRules:
+    """Cost items compiled into a (n_items, n_drivers) coefficient matrix."""
+
+    def __init__(self, rules):
+        # rules: tuple of (basis label, price, batch)
+        self.basis = [Basis.parse(label) for label, _, _ in rules]
+        self.batch_sizes = sorted({
+            batch for basis, (_, _, batch) in zip(self.basis, rules)
+            if basis is Basis.BATCH and batch > 0
+        })
+        batch_column = {b: 4 + k for k, b in enumerate(self.batch_sizes)}
+
+        self.matrix = np.zeros((len(rules), 4 + len(self.batch_sizes)))
+        for row, (basis, (_, price, batch)) in enumerate(zip(self.basis, rules)):
+            if basis is Basis.BATCH:
+                if batch > 0:
+                    self.matrix[row, batch_column[batch]] = price
+            elif basis is not None:
+                self.matrix[row, _DRIVER_COLUMN[basis]] = price
+        self.coef = self.matrix.sum(axis=0)
+
+    def drivers(self, qty, total_plano_req, area_cm2_per_pcs):
+        """Driver vectors, shape broadcast(inputs) + (n_drivers,)."""
+        if np.ndim(qty) == 0 and np.ndim(total_plano_req) == 0 and np.ndim(area_cm2_per_pcs) == 0:
+            # Single quote (the app's rerun path): skip the broadcasting machinery
+            return np.array(
+                [1.0, total_plano_req, qty, area_cm2_per_pcs * qty]
+                + [-(-qty // b) for b in self.batch_sizes],
+                dtype=float,
+            )
+        qty, sheets, area = np.broadcast_arrays(
+            np.asarray(qty, dtype=float),
+            np.asarray(total_plano_req, dtype=float),
+            np.asarray(area_cm2_per_pcs, dtype=float),
+        )
+        columns = [np.ones_like(qty), sheets, qty, area * qty]
+        columns += [np.ceil(qty / b) for b in self.batch_sizes]
+        return np.stack(columns, axis=-1)
+
+    def total(self, qty, total_plano_req, area_cm2_per_pcs):
+        return self.drivers(qty, total_plano_req, area_cm2_per_pcs) @ self.coef
+
+    def subtotals(self, qty, total_plano_req, area_cm2_per_pcs):
+        """Per-item subtotals, shape broadcast(inputs) + (n_items,)."""
+        return self.drivers(qty, total_plano_req, area_cm2_per_pcs) @ self.matrix.T
+
+
+@lru_cache(maxsize=256)
+def _compile(rules):
+    return CostRules(rules)
+
+
+metrics.watch_cache("cost_rules", _compile)
+
+
+def compile_cost_items(cost_items):
+    """CostRules for a list of cost item dicts (memoized on their contents)."""
+    rules = tuple((item['basis'], float(item_price(item)), item.get('batch', 1)) for item in cost_items or [])
+    return _compile(rules)
+
+
+def cost_totals(cost_items, qty, total_plano_req, area_cm2_per_pcs):
+    """Total production cost, vectorized over qty/sheets/area arrays."""
+    return compile_cost_items(cost_items).total(qty, total_plano_req, area_cm2_per_pcs)
+
+
+def calculate_costs(cost_items, qty, total_plano_req, area_cm2_per_pcs, subtotal_label="Subtotal ($)"):
+    """Calculate total production cost with safety check"""
+    if not cost_items or len(cost_items) == 0:
+        return 0, []
+
+    with metrics.stage("calculate_costs"):
+        subtotals = compile_cost_items(cost_items).subtotals(qty, total_plano_req, area_cm2_per_pcs).tolist()
+        breakdown = [{
+            "Item": item_name(item),
+            "Basis": item['basis'],
+            subtotal_label: f"{subtotal:,.0f}"
+        } for item, subtotal in zip(cost_items, subtotals)]
+
+    return sum(subtotals), breakdown
+
+
+def calculate_profit(total_production_cost, qty, margin_type, margin_val):
+    """Profit for the given margin type. Works on scalars or arrays."""
+    margin_type = MARGIN_ALIASES.get(margin_type, margin_type)
+    if margin_type == MARGIN_PERCENT:
+        return total_production_cost * (margin_val / 100)
+    elif margin_type == MARGIN_TOTAL:
+        if np.ndim(total_production_cost) == 0:
+            return margin_val
+        return np.full(np.shape(total_production_cost), margin_val, dtype=float)
+    else:  # Fixed per Pcs
+        return margin_val * qty
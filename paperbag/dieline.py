@@ -0,0 +1,245 @@
+"""Vector die-line export (SVG, DXF, PDF) without matplotlib.
+
+The pattern is computed once as NumPy primitives: line segments
+(x1, y1, x2, y2) and hole circles (cx, cy, r), grouped by layer. Writers
+turn a geometry dict into file bytes; ``tile_geometry`` repeats the pattern
+over a plano layout for the imposition sheet. All units are cm.
+"""
+import numpy as np
+
+HOLE_RADIUS = 0.35
+
+# Layer name -> stroke colour (SVG/PDF) and DXF colour index
+LAYERS = {
+    "plano": ("#000000", 7),
+    "cut": ("#000000", 7),
+    "fold": ("#808080", 8),
+    "gusset": ("#008000", 3),
+    "diagonal": ("#ff0000", 1),
+    "hole": ("#0000ff", 5),
+}
+
+
+def _empty():
+    geom = {name: np.empty((0, 4)) for name in LAYERS}
+    geom["hole"] = np.empty((0, 3))
+    return geom
+
+
+def pattern_geometry(P, L, T, lem, top_lip):
+    """Die-line primitives of one bag pattern, with the bottom edge at y = 0."""
+    x = np.cumsum([0, lem, L, P, L, P])
+
+    y_actual_top = T + top_lip
+    y_top_fold = T
+    y_green = 0.5 * L
+    y_base = 0
+    y_bottom = -(0.5 * P)
+    y_hole_upper = T + (top_lip / 2)
+    y_hole_lower = T - (top_lip / 2)
+
+    v_mids = [(x[1] + x[2]) / 2, (x[3] + x[4]) / 2]
+    p_mid1 = (x[2] + x[3]) / 2
+    p_mid2 = (x[4] + x[5]) / 2
+
+    geom = _empty()
+    geom["cut"] = np.array([
+        [x[0], y_bottom, x[0], y_actual_top],
+        [x[5], y_bottom, x[5], y_actual_top],
+        [x[0], y_actual_top, x[5], y_actual_top],
+        [x[0], y_bottom, x[5], y_bottom],
+    ])
+    geom["fold"] = np.array(
+        [[val_x, y_bottom, val_x, y_actual_top] for val_x in x[1:5]]
+        + [[x[0], y_top_fold, x[5], y_top_fold], [x[0], y_base, x[5], y_base]]
+    )
+    geom["gusset"] = np.array([
+        [x[0], y_green, x[5], y_green],
+        [v_mids[0], y_green, v_mids[0], y_actual_top],
+        [v_mids[1], y_green, v_mids[1], y_actual_top],
+    ])
+    geom["diagonal"] = np.array([
+        [v_mids[0], y_green, x[0], y_green - (v_mids[0] - x[0])],
+        [v_mids[0], y_green, p_mid1, y_bottom],
+        [p_mid1, y_bottom, v_mids[1], y_green],
+        [v_mids[1], y_green, p_mid2, y_bottom],
+        [p_mid2, y_bottom, x[5], y_base],
+    ])
+    holes_x = np.array([p_start + f * P for p_start in (x[2], x[4]) for f in (0.25, 0.75)])
+    geom["hole"] = np.array(
+        [[h_x, h_y, HOLE_RADIUS] for h_y in (y_hole_upper, y_hole_lower) for h_x in holes_x]
+    )
+
+    # Shift so the pattern starts at (0, 0)
+    geom["cut"][:, [1, 3]] -= y_bottom
+    for name in ("fold", "gusset", "diagonal"):
+        geom[name][:, [1, 3]] -= y_bottom
+    geom["hole"][:, 1] -= y_bottom
+    return geom
+
+
+def geometry_bounds(geom):
+    """(width, height) of the geometry, assuming it starts at the origin."""
+    xs = [g[:, [0, 2]].ravel() for name, g in geom.items() if name != "hole" and len(g)]
+    ys = [g[:, [1, 3]].ravel() for name, g in geom.items() if name != "hole" and len(g)]
+    return float(np.concatenate(xs).max()), float(np.concatenate(ys).max())
+
+
+def tile_geometry(geom, layout, final_plano_w, final_plano_h, pola_w_net, pola_h_net,
+                  m_left, m_bottom, m_top):
+    """Repeat a pattern over every placement of a plano layout.
+
+    Rotated placements get the pattern turned 90° counter-clockwise, so its
+    top margin lies on the left and its left margin below. The plano
+    outline is added on its own layer.
+    """
+    p = layout.positions
+    rot = p['rot']
+    off_x = p['x'] + np.where(rot, m_top, m_left)
+    off_y = p['y'] + np.where(rot, m_left, m_bottom)
+
+    def place(pts):
+        # pts: (k, 2) local points -> (n_pieces, k, 2) sheet points
+        u, v = pts[:, 0], pts[:, 1]
+        px = np.where(rot[:, None], pola_h_net - v[None, :], u[None, :]) + off_x[:, None]
+        py = np.where(rot[:, None], u[None, :], v[None, :]) + off_y[:, None]
+        return np.stack([px, py], axis=-1)
+
+    out = _empty()
+    for name, seg in geom.items():
+        if name == "hole":
+            centres = place(seg[:, :2]).reshape(-1, 2)
+            radii = np.tile(seg[:, 2], len(p))
+            out[name] = np.column_stack([centres, radii])
+        elif len(seg):
+            a = place(seg[:, :2]).reshape(-1, 2)
+            b = place(seg[:, 2:]).reshape(-1, 2)
+            out[name] = np.hstack([a, b])
+    W, H = final_plano_w, final_plano_h
+    out["plano"] = np.array([[0, 0, W, 0], [W, 0, W, H], [W, H, 0, H], [0, H, 0, 0]], dtype=float)
+    return out
+
+
+# ==========================================
+# WRITERS
+# ==========================================
+
+def to_svg(geom, stroke_width=0.05):
+    """SVG document (cm units, y axis pointing up like the drawings)."""
+    width, height = geometry_bounds(geom)
+    out = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.3f}cm" height="{height:.3f}cm" '
+        f'viewBox="0 0 {width:.3f} {height:.3f}">',
+        f'<g transform="translate(0 {height:.3f}) scale(1 -1)" fill="none" stroke-width="{stroke_width}">',
+    ]
+    for name, (color, _) in LAYERS.items():
+        g = geom.get(name)
+        if g is None or not len(g):
+            continue
+        out.append(f'<g id="{name}" stroke="{color}">')
+        if name == "hole":
+            out.extend(f'<circle cx="{cx:.3f}" cy="{cy:.3f}" r="{r:.3f}"/>' for cx, cy, r in g)
+        else:
+            d = " ".join(f"M{x1:.3f} {y1:.3f}L{x2:.3f} {y2:.3f}" for x1, y1, x2, y2 in g)
+            out.append(f'<path d="{d}"/>')
+        out.append('</g>')
+    out.append('</g>')
+    out.append('</svg>')
+    return "\n".join(out).encode("utf-8")
+
+
+def to_dxf(geom):
+    """ASCII DXF R12, one layer per line type.
+
+    Drawing units are cm. R12 has no header variable for units ($INSUNITS
+    is R2000+), so set cm when importing if the program asks.
+    """
+    out = ["0", "SECTION", "2", "TABLES", "0", "TABLE", "2", "LAYER", "70", str(len(LAYERS))]
+    for name, (_, aci) in LAYERS.items():
+        out += ["0", "LAYER", "2", name.upper(), "70", "0", "62", str(aci), "6", "CONTINUOUS"]
+    out += ["0", "ENDTAB", "0", "ENDSEC", "0", "SECTION", "2", "ENTITIES"]
+    for name in LAYERS:
+        g = geom.get(name)
+        if g is None:
+            continue
+        layer = name.upper()
+        if name == "hole":
+            for cx, cy, r in g:
+                out += ["0", "CIRCLE", "8", layer, "10", f"{cx:.4f}", "20", f"{cy:.4f}", "30", "0.0", "40", f"{r:.4f}"]
+        else:
+            for x1, y1, x2, y2 in g:
+                out += ["0", "LINE", "8", layer,
+                        "10", f"{x1:.4f}", "20", f"{y1:.4f}", "30", "0.0",
+                        "11", f"{x2:.4f}", "21", f"{y2:.4f}", "31", "0.0"]
+    out += ["0", "ENDSEC", "0", "EOF"]
+    return ("\n".join(out) + "\n").encode("ascii")
+
+
+PT_PER_CM = 72 / 2.54
+# Cubic Bézier handle length for a quarter circle
+_KAPPA = 0.5522847498
+
+
+def to_pdf(geom, margin_cm=1.0):
+    """Single-page PDF at 1:1 scale."""
+    width, height = geometry_bounds(geom)
+    s = PT_PER_CM
+    m = margin_cm * s
+    ops = ["0.5 w"]
+    for name, (color, _) in LAYERS.items():
+        g = geom.get(name)
+        if g is None or not len(g):
+            continue
+        r, gr, b = (int(color[i:i + 2], 16) / 255 for i in (1, 3, 5))
+        ops.append(f"{r:.3f} {gr:.3f} {b:.3f} RG")
+        if name == "hole":
+            for cx, cy, rad in g:
+                cx, cy, rad = cx * s + m, cy * s + m, rad * s
+                k = rad * _KAPPA
+                ops.append(
+                    f"{cx + rad:.2f} {cy:.2f} m "
+                    f"{cx + rad:.2f} {cy + k:.2f} {cx + k:.2f} {cy + rad:.2f} {cx:.2f} {cy + rad:.2f} c "
+                    f"{cx - k:.2f} {cy + rad:.2f} {cx - rad:.2f} {cy + k:.2f} {cx - rad:.2f} {cy:.2f} c "
+                    f"{cx - rad:.2f} {cy - k:.2f} {cx - k:.2f} {cy - rad:.2f} {cx:.2f} {cy - rad:.2f} c "
+                    f"{cx + k:.2f} {cy - rad:.2f} {cx + rad:.2f} {cy - k:.2f} {cx + rad:.2f} {cy:.2f} c S"
+                )
+        else:
+            pts = g * s + m
+            ops.extend(f"{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l" for x1, y1, x2, y2 in pts)
+            ops.append("S")
+    content = "\n".join(ops).encode("ascii")
+
+    page_w, page_h = width * s + 2 * m, height * s + 2 * m
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_w:.2f} {page_h:.2f}] /Contents 4 0 R >>".encode("ascii"),
+        b"<< /Length " + str(len(content)).encode("ascii") + b" >>\nstream\n" + content + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode("ascii") + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode("ascii")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    return bytes(out)
+
+
+EXPORTERS = {
+    "svg": (to_svg, "image/svg+xml"),
+    "dxf": (to_dxf, "application/dxf"),
+    "pdf": (to_pdf, "application/pdf"),
+}
+
+
+def export_geometry(geom, fmt):
+    """(bytes, mime type) for fmt in 'svg', 'dxf', 'pdf'."""
+    if fmt not in EXPORTERS:
+        raise ValueError(f"Unknown die-line format: {fmt}")
+    writer, mime = EXPORTERS[fmt]
+    return writer(geom), mime
@@ -0,0 +1,252 @@
+"""Gang-run planning: several bag sizes nested together on shared planos.
+
+Each plate (printing pattern) splits the sheet into full-height strips, one
+per SKU, and nests that SKU inside its strip. For a group of SKUs the planner
+finds the smallest run length N such that one plate printed N times covers
+every quantity, then tries every grouping of the SKUs into separate plates
+and keeps the plan with the fewest total sheets.
+
+Press rules (LayoutConstraints) apply as in optimize_plano: the sheet is
+oriented by its grain (pieces then never turn), strips are cut from the
+area inside the gripper and edge margins, and with shared gutters pieces
+and strips are padded by the gutter width.
+"""
+import math
+
+import numpy as np
+
+from paperbag.cache import layout_cache, layout_key
+from paperbag.costs import calculate_costs
+from paperbag.layout import PLACEMENT_DTYPE, BlockLayout, PlanoLayout, grid_counts
+from paperbag.nesting import guillotine_blocks, normal_points
+
+GANG_PLACEMENT_DTYPE = np.dtype(PLACEMENT_DTYPE.descr + [('sku', 'i4')])
+
+# Above this many SKUs, only "all on one plate" and "one plate each" are tried
+MAX_PARTITION_SKUS = 6
+
+
+def _strip_grid(W_strip, H_strip, W_item, H_item, rotate, gap):
+    if rotate and not gap:
+        return PlanoLayout(W_strip, H_strip, W_item, H_item)
+    cols, rows, c_sisa, r_sisa = (int(v) for v in grid_counts(W_strip, H_strip, W_item + gap, H_item + gap))
+    blocks = [(0, 0, cols, rows, False)]
+    if rotate:
+        blocks.append((cols * (W_item + gap), 0, c_sisa, r_sisa, True))
+    return BlockLayout(W_strip, H_strip, W_item, H_item, blocks, gap)
+
+
+def strip_layout(W_strip, H_strip, W_item, H_item, time_budget=0.2, rotate=True, gap=0.0):
+    """Best layout of one SKU inside a W_strip × H_strip strip.
+
+    Pieces are turned 90° only when ``rotate`` is True. With a ``gap``
+    (shared gutter) the strip is in padded units: pieces take W_item + gap.
+    """
+    key = layout_key(W_strip, H_strip, W_item, H_item) + ("strip", rotate, round(gap, 4))
+
+    def compute():
+        nested = guillotine_blocks(W_strip, H_strip, W_item + gap, H_item + gap, time_budget, rotate)
+        grid = _strip_grid(W_strip, H_strip, W_item, H_item, rotate, gap)
+        if nested is not None and nested[0] > len(grid):
+            return BlockLayout(W_strip, H_strip, W_item, H_item, nested[1], gap)
+        return grid
+
+    return layout_cache.get_or_compute(key, compute)
+
+
+class GangPattern:
+    """One plate: vertical strips, each holding a single SKU."""
+
+    def __init__(self, canvas_w, canvas_h, strips, y0=0.0):
+        self.canvas_w = canvas_w
+        self.canvas_h = canvas_h
+        # (sku index, x offset, layout); strips start y0 above the bottom edge
+        self.strips = strips
+        self.y0 = y0
+
+    def per_sheet(self, n_skus):
+        counts = [0] * n_skus
+        for sku, _, layout in self.strips:
+            counts[sku] += len(layout)
+        return counts
+
+    @property
+    def positions(self):
+        """Structured array of placements with an extra 'sku' column."""
+        parts = []
+        for sku, x0, layout in self.strips:
+            part = np.empty(len(layout), dtype=GANG_PLACEMENT_DTYPE)
+            for name in PLACEMENT_DTYPE.names:
+                part[name] = layout.positions[name]
+            part['x'] += x0
+            part['y'] += self.y0
+            part['sku'] = sku
+            parts.append(part)
+        if not parts:
+            return np.empty(0, dtype=GANG_PLACEMENT_DTYPE)
+        return np.concatenate(parts)
+
+
+class _Sheet:
+    """One sheet orientation: the strip area and how pieces may sit in it."""
+
+    def __init__(self, W, H, left, bottom, right, top, rotate, gap):
+        self.W, self.H = W, H
+        self.left, self.bottom = left, bottom
+        self.rotate, self.gap = rotate, gap
+        # Padded strip area: n pieces of w with gaps g fit in A when n * (w + g) <= A + g
+        self.width = max(W - left - right + gap, 0.0)
+        self.height = max(H - bottom - top + gap, 0.0)
+
+    def strip(self, width, sku):
+        return strip_layout(width, self.height, sku['unit_w'], sku['unit_h'], rotate=self.rotate, gap=self.gap)
+
+
+def _sheets(plano_w, plano_h, constraints):
+    if constraints is None or constraints.free:
+        return [_Sheet(plano_w, plano_h, 0.0, 0.0, 0.0, 0.0, True, 0.0),
+                _Sheet(plano_h, plano_w, 0.0, 0.0, 0.0, 0.0, True, 0.0)]
+    return [_Sheet(*(float(v) for v in frame[:6]), constraints.grain is None, constraints.gap)
+            for frame in constraints.frames(plano_w, plano_h)]
+
+
+def _min_strip(sheet, sku, need):
+    """Narrowest strip (on the SKU's normal points) holding at least `need` pieces."""
+    w, h = sku['unit_w'] + sheet.gap, sku['unit_h'] + sheet.gap
+    pts = normal_points(sheet.width, w, h if sheet.rotate else w)
+    pts = pts[pts > 0]
+    if not len(pts) or len(sheet.strip(pts[-1], sku)) < need:
+        return None
+    lo, hi = 0, len(pts) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if len(sheet.strip(pts[mid], sku)) >= need:
+            hi = mid
+        else:
+            lo = mid + 1
+    return pts[lo]
+
+
+def _pattern_for_run(sheet, skus, group, sheets):
+    """Plate for `group` that covers every quantity in `sheets` sheets, or None."""
+    widths = []
+    for i in group:
+        x = _min_strip(sheet, skus[i], math.ceil(skus[i]['qty'] / sheets))
+        if x is None:
+            return None
+        widths.append(x)
+    if sum(widths) > sheet.width + 1e-9:
+        return None
+
+    strips = []
+    x0 = sheet.left
+    for i, x in zip(group, widths):
+        strips.append((i, x0, sheet.strip(x, skus[i])))
+        x0 += x
+    return GangPattern(sheet.W, sheet.H, strips, sheet.bottom)
+
+
+def _plan_group(sheet, skus, group):
+    """Shortest single-plate run for a group, as (sheets, pattern) or None."""
+    max_qty = max(skus[i]['qty'] for i in group)
+    if _pattern_for_run(sheet, skus, group, max_qty) is None:
+        return None
+    lo, hi = 1, max_qty
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _pattern_for_run(sheet, skus, group, mid) is not None:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo, _pattern_for_run(sheet, skus, group, lo)
+
+
+def _partitions(items):
+    if not items:
+        yield []
+        return
+    first, rest = items[0], items[1:]
+    for part in _partitions(rest):
+        for k in range(len(part)):
+            yield part[:k] + [[first] + part[k]] + part[k + 1:]
+        yield [[first]] + part
+
+
+def plan_gang_run(skus, plano_w, plano_h, constraints=None):
+    """Plan a gang run for several SKUs on one plano size.
+
+    ``skus`` is a list of dicts with 'unit_w', 'unit_h' (the piece size from
+    ``constraints.piece_size``, or pattern incl. margins) and 'qty'.
+    ``constraints`` (LayoutConstraints) adds grain, gripper and gutter
+    rules. Returns a dict with the chosen runs (one plate each),
+    the total sheet count, and the sheet count when every SKU runs alone.
+    Raises ValueError when a SKU does not fit the plano at all.
+    """
+    n = len(skus)
+    best = None
+    for sheet in _sheets(plano_w, plano_h, constraints):
+        groups = {}
+
+        def group_plan(group):
+            key = tuple(group)
+            if key not in groups:
+                groups[key] = _plan_group(sheet, skus, list(group))
+            return groups[key]
+
+        singles = [group_plan([i]) for i in range(n)]
+        if any(s is None for s in singles):
+            continue
+
+        if n <= MAX_PARTITION_SKUS:
+            candidates = _partitions(list(range(n)))
+        else:
+            candidates = [[list(range(n))], [[i] for i in range(n)]]
+
+        for partition in candidates:
+            plans = [group_plan(sorted(g)) for g in partition]
+            if any(p is None for p in plans):
+                continue
+            total = sum(p[0] for p in plans)
+            if best is None or (total, len(plans)) < (best['total_plano_req'], len(best['runs'])):
+                best = {
+                    'final_plano_w': sheet.W,
+                    'final_plano_h': sheet.H,
+                    'total_plano_req': total,
+                    'separate_plano_req': sum(s[0] for s in singles),
+                    'runs': [{
+                        'skus': sorted(g),
+                        'sheets': p[0],
+                        'pattern': p[1],
+                        'per_sheet': p[1].per_sheet(n),
+                    } for g, p in zip(partition, plans)],
+                }
+
+    if best is None:
+        raise ValueError("A pattern is larger than the plano")
+    return best
+
+
+def allocate_gang_costs(plan, skus, cost_items, subtotal_label="Subtotal ($)"):
+    """Per-SKU costs for a gang plan.
+
+    Each run's sheets are shared out by the plano area the SKU occupies on
+    the plate; the SKU is then costed with calculate_costs on its share.
+    Per-order and per-batch items are charged per SKU line.
+    """
+    n = len(skus)
+    sheets = [0.0] * n
+    for run in plan['runs']:
+        used = [run['per_sheet'][i] * skus[i]['unit_w'] * skus[i]['unit_h'] for i in range(n)]
+        total_used = sum(used)
+        for i in run['skus']:
+            sheets[i] += run['sheets'] * used[i] / total_used
+
+    result = []
+    for i, sku in enumerate(skus):
+        cost, breakdown = calculate_costs(cost_items, sku['qty'], sheets[i], sku['area_cm2_per_pcs'], subtotal_label)
+        result.append({
+            'sheets': sheets[i],
+            'production_cost': cost,
+            'breakdown': breakdown,
+        })
+    return result
@@ -0,0 +1,168 @@
+"""Hot-path instrumentation: per-stage timers, counters and payload sizes.
+
+Off by default. While off, ``stage`` returns one shared no-op context
+manager and ``count``/``observe_bytes`` return after a flag check, so
+instrumented code pays well under a microsecond per call. Cache hit rates
+are read from the caches themselves and are always available.
+
+Set PAPERBAG_METRICS=1 to start enabled, or to a file path to also have the
+apps write a snapshot there after every rerun (``.json`` for JSON, anything
+else for Prometheus text format).
+"""
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+_env = os.environ.get("PAPERBAG_METRICS", "")
+METRICS_PATH = _env if _env not in ("", "0", "1") else None
+
+_NOOP = nullcontext()
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Process-wide registry of stage timings, counters and byte sizes."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._timers = {}    # name -> [count, total s, max s, last s]
+        self._counters = {}  # name -> count
+        self._sizes = {}     # name -> [count, total bytes, last bytes]
+        self._caches = {}    # name -> LRUCache or functools.lru_cache function
+
+    def stage(self, name):
+        """Context manager timing one pass through a stage."""
+        if not self.enabled:
+            return _NOOP
+        return _Stage(self, name)
+
+    def observe_time(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._timers.get(name)
+            if entry is None:
+                self._timers[name] = [1, seconds, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+                entry[3] = seconds
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe_bytes(self, name, size):
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._sizes.setdefault(name, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += size
+            entry[2] = size
+
+    def watch_cache(self, name, cache):
+        """Report an LRUCache (``stats()``) or lru_cache function (``cache_info()``)."""
+        self._caches[name] = cache
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+            self._sizes.clear()
+
+    def snapshot(self):
+        """Plain dict of everything recorded so far plus current cache stats."""
+        with self._lock:
+            stages = {
+                name: {"count": c, "total_s": t, "mean_s": t / c, "max_s": m, "last_s": last}
+                for name, (c, t, m, last) in self._timers.items()
+            }
+            counters = dict(self._counters)
+            sizes = {
+                name: {"count": c, "total_bytes": t, "mean_bytes": t / c, "last_bytes": last}
+                for name, (c, t, last) in self._sizes.items()
+            }
+        return {
+            "enabled": self.enabled,
+            "stages": stages,
+            "counters": counters,
+            "bytes": sizes,
+            "caches": {name: _cache_stats(cache) for name, cache in self._caches.items()},
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """Snapshot in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        lines = []
+
+        def family(metric, kind, help_text, samples):
+            lines.append(f"# HELP paperbag_{metric} {help_text}")
+            lines.append(f"# TYPE paperbag_{metric} {kind}")
+            for suffix, label, name, value in samples:
+                lines.append(f'paperbag_{metric}{suffix}{{{label}="{name}"}} {value:.9g}')
+
+        stages = snap["stages"].items()
+        family("stage_seconds", "summary", "Time spent per stage.",
+               [s for name, v in stages for s in (("_count", "stage", name, v["count"]),
+                                                  ("_sum", "stage", name, v["total_s"]))])
+        family("stage_max_seconds", "gauge", "Slowest single pass per stage.",
+               [("", "stage", name, v["max_s"]) for name, v in stages])
+        family("events_total", "counter", "Event counters.",
+               [("", "name", name, v) for name, v in snap["counters"].items()])
+        sizes = snap["bytes"].items()
+        family("payload_bytes", "summary", "Size of generated payloads.",
+               [s for name, v in sizes for s in (("_count", "payload", name, v["count"]),
+                                                 ("_sum", "payload", name, v["total_bytes"]))])
+        caches = snap["caches"].items()
+        family("cache_hits_total", "counter", "Cache hits.",
+               [("", "cache", name, v["hits"]) for name, v in caches])
+        family("cache_misses_total", "counter", "Cache misses.",
+               [("", "cache", name, v["misses"]) for name, v in caches])
+        family("cache_entries", "gauge", "Entries held per cache.",
+               [("", "cache", name, v["size"]) for name, v in caches])
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Write a snapshot to ``path`` atomically; format chosen by extension."""
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+def _cache_stats(cache):
+    if hasattr(cache, "cache_info"):
+        info = cache.cache_info()
+        total = info.hits + info.misses
+        return {"size": info.currsize, "maxsize": info.maxsize, "hits": info.hits,
+                "misses": info.misses, "hit_rate": info.hits / total if total else 0.0}
+    return cache.stats()
+
+
+metrics = Metrics(enabled=bool(_env) and _env != "0")
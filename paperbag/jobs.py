@@ -0,0 +1,239 @@
+"""Guillotine searches on a shared process pool.
+
+The pool is a module global, so every session served by the Streamlit
+process shares one set of workers (one per core) and no search runs on a
+script thread. Until a search finishes its job answers with the grid
+layout, so the UI always has a best-so-far result to price and draw.
+
+Each background search gets a slot in a shared array of cancel flags, which
+the search polls alongside its deadline, so a search nobody waits for any
+more stops and frees its worker.
+"""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+from paperbag.cache import cached_optimize_plano, constraints_key, layout_cache, layout_key
+from paperbag.layout import search_plano
+from paperbag.instrumentation import metrics
+
+# Off the script thread the search can afford a much longer budget
+NEST_TIME_BUDGET = 5.0
+
+# cached_layouts waits for its searches, so they keep the interactive budget
+BATCH_TIME_BUDGET = 0.5
+
+# Background searches that can be stopped at once; any beyond run out their budget
+CANCEL_SLOTS = 256
+
+# Workers come from a fork server, never forked from the multi-threaded
+# server process itself, where another thread may hold a lock mid-fork
+_context = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_pool = None
+_lock = threading.Lock()
+_inflight = {}  # cache key -> [future, number of live jobs waiting on it, cancel slot]
+_cancel_flags = _context.RawArray("b", CANCEL_SLOTS)  # shared with the workers
+_free_slots = list(range(CANCEL_SLOTS))
+_started = None  # in workers: number of workers that finished starting
+
+# Stands in for __main__ while workers start (see _start_workers)
+_WORKER_MAIN = types.ModuleType("__main__")
+
+
+def _init_worker(cancel_flags, started):
+    global _cancel_flags, _started
+    _cancel_flags = cancel_flags
+    _started = started
+    with started.get_lock():
+        started.value += 1
+
+
+def _wait_for_workers(n, timeout=60.0):
+    """Hold a worker until all n have started, so that n submits start n workers."""
+    deadline = time.monotonic() + timeout
+    while _started.value < n and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def _start_workers(pool, n):
+    """Start every worker of a new pool now, with the script hidden from them.
+
+    Streamlit installs the running script as ``__main__``, and fork-server or
+    spawned workers re-run ``__main__`` from its file on start-up. Workers
+    start on demand inside submit(); each warm-up task waits for all of them,
+    so n submits start exactly n workers and later submits start none.
+    """
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = _WORKER_MAIN
+    try:
+        for _ in range(n):
+            pool.submit(_wait_for_workers, n)
+    finally:
+        sys.modules["__main__"] = main
+
+
+def nesting_pool():
+    """The shared worker pool, started (all workers at once) on first use."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            if _context.get_start_method() == "forkserver":
+                # Workers fork from a server that already has NumPy and the layout engine loaded
+                _context.set_forkserver_preload(["paperbag.jobs"])
+            workers = os.cpu_count() or 1
+            pool = ProcessPoolExecutor(workers, mp_context=_context, initializer=_init_worker,
+                                       initargs=(_cancel_flags, _context.Value("i", 0)))
+            _start_workers(pool, workers)
+            _pool = pool
+        return _pool
+
+
+def submit_search(fn, *args):
+    """Submit ``fn(*args)`` to the shared pool."""
+    return nesting_pool().submit(fn, *args)
+
+
+def _search_layout(slot, *args):
+    """search_plano that stops early once cancel flag ``slot`` is set."""
+    flags = _cancel_flags
+    return search_plano(*args, cancelled=None if slot is None else (lambda: flags[slot] != 0))
+
+
+def _claim_slot():
+    with _lock:
+        slot = _free_slots.pop() if _free_slots else None
+    if slot is not None:
+        _cancel_flags[slot] = 0
+    return slot
+
+
+def _release_slot(slot):
+    if slot is not None:
+        with _lock:
+            _free_slots.append(slot)
+
+
+def _store(key, future, slot):
+    with _lock:
+        entry = _inflight.get(key)
+        if entry is not None and entry[0] is future:
+            del _inflight[key]
+        if slot is not None:
+            _free_slots.append(slot)
+    # Searches that ran out of time or were stopped kept the grid layout: not worth keeping
+    if not future.cancelled() and future.exception() is None and future.result()[1]:
+        layout_cache.put(key, future.result()[0])
+
+
+def cached_layouts(sizes, method="guillotine", constraints=None):
+    """cached_optimize_plano for a list of (PL_W, PL_H, U_W, U_H), waiting for all.
+
+    Guillotine searches missing from the layout cache run side by side on
+    the shared pool instead of one after another.
+    """
+    keys = [layout_key(*size) + (method,) + constraints_key(constraints) for size in sizes]
+    results = [layout_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if method != "guillotine" or len(missing) < 2:
+        return [cached_optimize_plano(*size, method, constraints) if result is None else result
+                for size, result in zip(sizes, results)]
+
+    futures = [(i, submit_search(search_plano, *keys[i][:5], BATCH_TIME_BUDGET, constraints)) for i in missing]
+    metrics.count("layout_search_submitted", len(futures))
+    for i, future in futures:
+        results[i], finished = future.result()
+        if finished:
+            layout_cache.put(keys[i], results[i])
+    return results
+
+
+class LayoutJob:
+    """Best layout for one (plano, unit size), improved in the background."""
+
+    def __init__(self, PL_W, PL_H, U_W, U_H, time_budget=NEST_TIME_BUDGET, constraints=None):
+        self.key = layout_key(PL_W, PL_H, U_W, U_H) + ("guillotine",) + constraints_key(constraints)
+        self.future = None
+        self._cancelled = False
+        self._result = layout_cache.get(self.key)
+        if self._result is not None:
+            return
+
+        self._result = cached_optimize_plano(PL_W, PL_H, U_W, U_H, "grid", constraints)
+        with _lock:
+            entry = _inflight.get(self.key)
+            if entry is not None:
+                entry[1] += 1
+                self.future = entry[0]
+                metrics.count("layout_search_joined")
+                return
+
+        # Never submit while holding the lock: the pool's manager thread runs
+        # done callbacks (which take it) while holding its own locks
+        slot = _claim_slot()
+        future = submit_search(_search_layout, slot, *self.key[:5], time_budget, constraints)
+        with _lock:
+            entry = _inflight.setdefault(self.key, [future, 0, slot])
+            entry[1] += 1
+            self.future = entry[0]
+        if self.future is future:
+            metrics.count("layout_search_submitted")
+            future.add_done_callback(lambda f, key=self.key, slot=slot: _store(key, f, slot))
+        else:
+            # Another session submitted the same search first
+            if slot is not None:
+                _cancel_flags[slot] = 1
+            future.cancel()
+            future.add_done_callback(lambda f, slot=slot: _release_slot(slot))
+
+    def done(self):
+        return self.future is None or self.future.done()
+
+    def best(self):
+        """(layout, final_plano_w, final_plano_h): the search result once done, else the grid layout."""
+        if self.future is not None and self.future.done() and not self.future.cancelled():
+            if self.future.exception() is None:
+                self._result = self.future.result()[0]
+            self.future = None
+        return self._result
+
+    def cancel(self):
+        """Drop this job; the search is stopped if nobody else is waiting on it.
+
+        A queued search is cancelled outright; one already running sees its
+        cancel flag within one row of the search and stops, uncached. A later
+        job for the same layout starts a fresh search.
+        """
+        if self.future is None or self._cancelled:
+            return
+        self._cancelled = True
+        with _lock:
+            entry = _inflight.get(self.key)
+            if entry is None or entry[0] is not self.future:
+                return
+            entry[1] -= 1
+            if entry[1]:
+                return
+            del _inflight[self.key]
+            # The slot stays ours until _store runs, which needs this lock
+            if entry[2] is not None:
+                _cancel_flags[entry[2]] = 1
+        metrics.count("layout_search_cancelled")
+        # Outside the lock: cancel() runs the done callback, which takes it
+        self.future.cancel()
+
+
+def submit_layout(PL_W, PL_H, U_W, U_H, previous=None, time_budget=NEST_TIME_BUDGET, constraints=None):
+    """Job for this layout, reusing ``previous`` if it is the same one and cancelling it otherwise."""
+    key = layout_key(PL_W, PL_H, U_W, U_H) + ("guillotine",) + constraints_key(constraints)
+    if previous is not None:
+        if previous.key == key:
+            return previous
+        previous.cancel()
+    return LayoutJob(PL_W, PL_H, U_W, U_H, time_budget, constraints)
@@ -0,0 +1,294 @@
+"""Plano layout engine.
+
+Piece counts are computed in closed form. The per-piece placements are only
+built (as a structured NumPy array) when something actually draws them.
+
+Press rules (grain direction, gripper edge, shared gutters) are described
+by a LayoutConstraints. Gutters use the usual padding trick: n pieces of
+width w with gaps g fit in a width A exactly when n * (w + g) <= A + g, so
+both the grid count and the guillotine search run unchanged on pieces and
+canvas grown by g.
+"""
+import numpy as np
+
+from paperbag.nesting import guillotine_blocks
+from paperbag.pattern import unit_size
+
+# One row per piece: position, size and whether it is rotated 90°
+PLACEMENT_DTYPE = np.dtype([
+    ('x', 'f8'),
+    ('y', 'f8'),
+    ('w', 'f8'),
+    ('h', 'f8'),
+    ('rot', '?'),
+])
+
+LAYOUT_METHODS = ("grid", "guillotine")
+GRAIN_DIRECTIONS = ("long", "short")
+
+
+class LayoutConstraints:
+    """Press rules for placing pieces on a sheet.
+
+    grain: None when the pieces may turn freely, or the sheet's grain
+        ("long" or "short" side); the bag height then always runs along
+        the grain, so no piece is rotated.
+    gripper: depth (cm) of the unprintable strip along one long edge.
+    gutter: None for per-piece margins (the unit size already includes
+        them, so neighbours are spaced by both margins), or the width of
+        the single cut line shared by neighbouring pieces. With gutters
+        the unit size is the net pattern and ``margins`` (top, bottom,
+        left, right) are kept clear along the sheet edges instead.
+    """
+
+    __slots__ = ("grain", "gripper", "gutter", "margins")
+
+    def __init__(self, grain=None, gripper=0.0, gutter=None, margins=(0.0, 0.0, 0.0, 0.0)):
+        if grain not in (None,) + GRAIN_DIRECTIONS:
+            raise ValueError(f"Unknown grain direction: {grain}")
+        self.grain = grain
+        self.gripper = float(gripper)
+        self.gutter = None if gutter is None else float(gutter)
+        self.margins = tuple(float(m) for m in margins) if gutter is not None else (0.0, 0.0, 0.0, 0.0)
+
+    def key(self):
+        """Flat tuple of scalars identifying these rules (for cache keys)."""
+        return (self.grain, round(self.gripper, 4), None if self.gutter is None else round(self.gutter, 4)) \
+            + tuple(round(m, 4) for m in self.margins)
+
+    def __eq__(self, other):
+        return isinstance(other, LayoutConstraints) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return (f"LayoutConstraints(grain={self.grain!r}, gripper={self.gripper:g}, "
+                f"gutter={self.gutter!r}, margins={self.margins!r})")
+
+    @property
+    def free(self):
+        """True when these rules place pieces exactly like the plain engine."""
+        return self.grain is None and self.gripper == 0 and self.gutter is None
+
+    @property
+    def gap(self):
+        return self.gutter or 0.0
+
+    def piece_size(self, pola_w_net, pola_h_net, m_top, m_bottom, m_left, m_right):
+        """Unit size to lay out: pattern plus margins, or the bare pattern with gutters."""
+        if self.gutter is None:
+            return unit_size(pola_w_net, pola_h_net, m_top, m_bottom, m_left, m_right)
+        return pola_w_net, pola_h_net
+
+    def frames(self, PL_W, PL_H):
+        """Allowed sheet orientations as (W, H, left, bottom, right, top, swapped).
+
+        The four insets are the clear bands along each edge. The gripper
+        sits on a long edge: the bottom when the long side is horizontal,
+        else the left. Works on scalars or broadcastable arrays.
+        """
+        if self.grain is None:
+            orientations = [(PL_W, PL_H, False), (PL_H, PL_W, True)]
+        else:
+            # Turn the sheet so its grain runs up the page, along the bag height
+            long_side, short_side = np.maximum(PL_W, PL_H), np.minimum(PL_W, PL_H)
+            if self.grain == "long":
+                W, H = short_side, long_side
+            else:
+                W, H = long_side, short_side
+            orientations = [(W, H, W != PL_W)]
+
+        top, bottom, left, right = self.margins
+        frames = []
+        for W, H, swapped in orientations:
+            grip_bottom = W >= H
+            frames.append((
+                W, H,
+                np.where(grip_bottom, left, max(left, self.gripper)),
+                np.where(grip_bottom, max(bottom, self.gripper), bottom),
+                right, top, swapped,
+            ))
+        return frames
+
+
+def grid_counts(W_canvas, H_canvas, W_item, H_item):
+    """Grid + rotated remainder strip, as (cols, rows, c_sisa, r_sisa).
+
+    Works on scalars or broadcastable arrays.
+    """
+    cols = np.floor_divide(W_canvas, W_item)
+    rows = np.floor_divide(H_canvas, H_item)
+
+    # Remainder space (rotated)
+    sisa_w = W_canvas - (cols * W_item)
+    c_sisa = np.where(sisa_w >= H_item, np.floor_divide(sisa_w, H_item), 0)
+    r_sisa = np.floor_divide(H_canvas, W_item)
+    return cols, rows, c_sisa, r_sisa
+
+
+def count_pieces(PL_W, PL_H, U_W, U_H, constraints=None):
+    """Best pieces-per-plano and whether the plano is used turned (W/H swapped).
+
+    Vectorized: any argument may be an array, results broadcast.
+    """
+    if constraints is None or constraints.free:
+        cols1, rows1, cs1, rs1 = grid_counts(PL_W, PL_H, U_W, U_H)
+        cols2, rows2, cs2, rs2 = grid_counts(PL_H, PL_W, U_W, U_H)
+        n1 = (cols1 * rows1 + cs1 * rs1).astype(np.int64)
+        n2 = (cols2 * rows2 + cs2 * rs2).astype(np.int64)
+        swapped = n2 > n1
+        return np.where(swapped, n2, n1), swapped
+
+    g = constraints.gap
+    rotate = constraints.grain is None
+    best = swapped = None
+    for W, H, left, bottom, right, top, turned in constraints.frames(PL_W, PL_H):
+        cols, rows, cs, rs = grid_counts(
+            np.maximum(W - left - right + g, 0), np.maximum(H - bottom - top + g, 0), U_W + g, U_H + g
+        )
+        n = (cols * rows + (cs * rs if rotate else 0)).astype(np.int64)
+        if best is None:
+            best, swapped = n, np.broadcast_to(turned, np.shape(n)).copy()
+        else:
+            better = n > best
+            best = np.where(better, n, best)
+            swapped = np.where(better, turned, swapped)
+    return best, swapped
+
+
+class BlockLayout:
+    """Layout of identical pieces made of uniform grid blocks.
+
+    Each block is (x, y, cols, rows, rot). Pieces in a block are ``gap``
+    apart. ``len()`` is closed form; iterating yields placement records
+    built lazily.
+    """
+
+    def __init__(self, W_canvas, H_canvas, W_item, H_item, blocks, gap=0.0):
+        self.canvas_w = W_canvas
+        self.canvas_h = H_canvas
+        self.item_w = W_item
+        self.item_h = H_item
+        self.gap = gap
+        self.blocks = [b for b in blocks if b[2] > 0 and b[3] > 0]
+        self.count = sum(cols * rows for _, _, cols, rows, _ in self.blocks)
+        self._positions = None
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    @property
+    def positions(self):
+        """Structured array of placements (PLACEMENT_DTYPE), built on first use."""
+        if self._positions is None:
+            positions = self._build_positions()
+            # Layouts may be shared through the cache, so keep them immutable
+            positions.flags.writeable = False
+            self._positions = positions
+        return self._positions
+
+    def _build_positions(self):
+        out = np.empty(self.count, dtype=PLACEMENT_DTYPE)
+        start = 0
+        for x0, y0, cols, rows, rot in self.blocks:
+            w, h = (self.item_h, self.item_w) if rot else (self.item_w, self.item_h)
+            r, c = np.divmod(np.arange(cols * rows), cols)
+            block = out[start:start + cols * rows]
+            block['x'] = x0 + c * (w + self.gap)
+            block['y'] = y0 + r * (h + self.gap)
+            block['w'] = w
+            block['h'] = h
+            block['rot'] = rot
+            start += cols * rows
+        return out
+
+
+class PlanoLayout(BlockLayout):
+    """Uniform grid plus one rotated strip in the leftover width."""
+
+    def __init__(self, W_canvas, H_canvas, W_item, H_item):
+        cols, rows, c_sisa, r_sisa = grid_counts(W_canvas, H_canvas, W_item, H_item)
+        self.cols, self.rows = int(cols), int(rows)
+        self.c_sisa, self.r_sisa = int(c_sisa), int(r_sisa)
+        super().__init__(W_canvas, H_canvas, W_item, H_item, [
+            (0, 0, self.cols, self.rows, False),
+            (self.cols * W_item, 0, self.c_sisa, self.r_sisa, True),
+        ])
+
+
+def _constrained_grid(W, H, left, bottom, right, top, U_W, U_H, gap, rotate):
+    cols, rows, c_sisa, r_sisa = (int(v) for v in grid_counts(
+        max(W - left - right + gap, 0), max(H - bottom - top + gap, 0), U_W + gap, U_H + gap
+    ))
+    blocks = [(left, bottom, cols, rows, False)]
+    if rotate:
+        blocks.append((left + cols * (U_W + gap), bottom, c_sisa, r_sisa, True))
+    return BlockLayout(W, H, U_W, U_H, blocks, gap)
+
+
+def search_plano(PL_W, PL_H, U_W, U_H, method="guillotine", time_budget=0.5, constraints=None,
+                 cancelled=None):
+    """optimize_plano, plus whether the guillotine search finished.
+
+    Returns ((layout, final_plano_w, final_plano_h), finished). ``finished``
+    is False when the search ran out of time_budget (or ``cancelled()``
+    turned True) and the grid layout was kept; such a result depends on
+    machine load and should not be cached.
+    """
+    if method not in LAYOUT_METHODS:
+        raise ValueError(f"Unknown layout method: {method}")
+
+    if constraints is None or constraints.free:
+        res1 = PlanoLayout(PL_W, PL_H, U_W, U_H)
+        res2 = PlanoLayout(PL_H, PL_W, U_W, U_H)
+
+        if len(res1) >= len(res2):
+            best = res1, PL_W, PL_H
+        else:
+            best = res2, PL_H, PL_W
+
+        if method == "guillotine":
+            nested = guillotine_blocks(PL_W, PL_H, U_W, U_H, time_budget, cancelled=cancelled)
+            if nested is None:
+                return best, False
+            if nested[0] > len(best[0]):
+                return (BlockLayout(PL_W, PL_H, U_W, U_H, nested[1]), PL_W, PL_H), True
+        return best, True
+
+    g = constraints.gap
+    rotate = constraints.grain is None
+    frames = [tuple(float(v) for v in frame[:6]) for frame in constraints.frames(PL_W, PL_H)]
+    best = None
+    for W, H, left, bottom, right, top in frames:
+        layout = _constrained_grid(W, H, left, bottom, right, top, U_W, U_H, g, rotate)
+        if best is None or len(layout) > len(best[0]):
+            best = layout, W, H
+
+    if method == "guillotine":
+        # With rotation allowed the search covers both orientations from one
+        W, H, left, bottom, right, top = frames[0]
+        nested = guillotine_blocks(
+            W - left - right + g, H - bottom - top + g, U_W + g, U_H + g, time_budget, rotate, cancelled
+        )
+        if nested is None:
+            return best, False
+        if nested[0] > len(best[0]):
+            blocks = [(x + left, y + bottom, c, r, rot) for x, y, c, r, rot in nested[1]]
+            return (BlockLayout(W, H, U_W, U_H, blocks, g), W, H), True
+    return best, True
+
+
+def optimize_plano(PL_W, PL_H, U_W, U_H, method="guillotine", time_budget=0.5, constraints=None):
+    """Best layout of a U_W × U_H piece on the plano.
+
+    ``method="grid"`` tries the grid + rotated strip in both sheet
+    orientations. ``method="guillotine"`` additionally runs the guillotine
+    nesting search and uses it when it fits more pieces within time_budget
+    seconds. ``constraints`` (LayoutConstraints) adds grain, gripper and
+    gutter rules. Returns (layout, final_plano_w, final_plano_h).
+    """
+    return search_plano(PL_W, PL_H, U_W, U_H, method, time_budget, constraints)[0]
@@ -0,0 +1,325 @@
+"""3D mockup of the bag (Plotly).
+
+Every point of the bag body, handle paths and holes is a linear function of
+(P, L, T, 1), stored as (n, 3, 4) coefficient arrays, so a bag of any size
+is one matrix product. Faces, creases and tube topology are constant index
+arrays. Colours are applied to a finished figure by ``restyle_mockup``, so
+changing them never rebuilds the geometry.
+
+Coordinates go to Plotly as float32 and indices as the smallest unsigned
+integer type that fits; Plotly serialises NumPy arrays as base64 typed
+arrays rather than JSON number lists.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from paperbag.cache import KEY_DECIMALS
+from paperbag.instrumentation import metrics
+
+HOLE_DROP = 2.0      # cm below the top edge
+HANDLE_RISE = 6.0    # cm above the holes
+HOLE_OFFSET = 0.02   # cm in front of the panel so markers are not hidden
+ROPE_RADIUS = 0.3    # cm
+GUSSET_PINCH = 0.45  # fraction of L the gussets fold in above the bottom
+
+# handle_segments: points along each handle; tube_sides: 0 draws the
+# handles as lines; art_cells: artwork cells along the image's longer side
+LOD_LEVELS = {
+    "low": {"handle_segments": 8, "tube_sides": 0, "art_cells": 24},
+    "medium": {"handle_segments": 20, "tube_sides": 6, "art_cells": 64},
+    "high": {"handle_segments": 40, "tube_sides": 12, "art_cells": 128},
+}
+DEFAULT_LOD = "medium"
+
+# Printable area of the front panel as fractions of (P, P, T, T)
+ART_BOX = (0.1, 0.9, 0.1, 0.75)
+ART_COLORS = 32
+
+
+def _point(x=(0, 0, 0, 0), y=(0, 0, 0, 0), z=(0, 0, 0, 0)):
+    # Coefficients of (P, L, T, 1) for each coordinate
+    return [x, y, z]
+
+
+def _ring(z, pinch):
+    # Six vertices around the bag at height z; the gussets are pinched inwards
+    # by `pinch` × L at the middle of each side
+    return [
+        _point(z=z),
+        _point(x=(1, 0, 0, 0), z=z),
+        _point(x=(1, -pinch, 0, 0), y=(0, 0.5, 0, 0), z=z),
+        _point(x=(1, 0, 0, 0), y=(0, 1, 0, 0), z=z),
+        _point(y=(0, 1, 0, 0), z=z),
+        _point(x=(0, pinch, 0, 0), y=(0, 0.5, 0, 0), z=z),
+    ]
+
+
+# Flat bottom (0-5), gusset fold at z = L/2 (6-11), top edge (12-17)
+BODY_TEMPLATE = np.array(
+    _ring((0, 0, 0, 0), 0) + _ring((0, 0.5, 0, 0), GUSSET_PINCH) + _ring((0, 0, 1, 0), GUSSET_PINCH),
+    dtype=float
+)
+BODY_TEMPLATE.flags.writeable = False
+
+HOLES_TEMPLATE = np.array([
+    _point(x=(fx, 0, 0, 0), y=y, z=(0, 0, 1, -HOLE_DROP))
+    for y in ((0, 0, 0, -HOLE_OFFSET), (0, 1, 0, HOLE_OFFSET))
+    for fx in (0.25, 0.75)
+], dtype=float)
+HOLES_TEMPLATE.flags.writeable = False
+
+# Below the fold the gusset quads are split through the fold vertex so the
+# triangle edges follow the creases; above it they are plain quads; the
+# bottom is a fan
+_LOWER = [(0, 1, 7), (0, 7, 6), (1, 2, 8), (1, 8, 7), (2, 3, 8), (3, 9, 8),
+          (3, 4, 10), (3, 10, 9), (4, 5, 11), (4, 11, 10), (5, 0, 11), (0, 6, 11)]
+_UPPER = [(6 + s, 6 + (s + 1) % 6, 12 + (s + 1) % 6) for s in range(6)] + \
+         [(6 + s, 12 + (s + 1) % 6, 12 + s) for s in range(6)]
+_BOTTOM = [(0, 1, 2), (0, 2, 3), (0, 3, 4), (0, 4, 5)]
+BODY_FACES = np.array(_LOWER + _UPPER + _BOTTOM, dtype=np.uint8)
+
+# Outline and fold lines as vertex pairs
+CREASE_EDGES = np.array(
+    [(12 + s, 12 + (s + 1) % 6) for s in range(6)]   # top edge
+    + [(0, 1), (1, 3), (3, 4), (4, 0)]               # bottom outline
+    + [(0, 12), (1, 13), (3, 15), (4, 16)]           # corners
+    + [(1, 8), (3, 8), (2, 8), (8, 14)]              # right gusset
+    + [(0, 11), (4, 11), (5, 11), (11, 17)],         # left gusset
+    dtype=np.uint8
+)
+
+
+def _index_dtype(n):
+    return np.uint16 if n <= np.iinfo(np.uint16).max else np.uint32
+
+
+@lru_cache(maxsize=None)
+def _handle_template(segments):
+    t = np.linspace(0, 1, segments + 1)
+    template = np.array([
+        _point(x=(0.25 + 0.5 * s, 0, 0, 0), y=y, z=(0, 0, 1, HANDLE_RISE * np.sin(np.pi * s) - HOLE_DROP))
+        for y in ((0, 0, 0, 0), (0, 1, 0, 0))
+        for s in t
+    ], dtype=float)
+    template.flags.writeable = False
+    return template
+
+
+@lru_cache(maxsize=None)
+def _tube_faces(segments, sides):
+    """Triangles joining consecutive rings of ``sides`` vertices along a tube."""
+    a = np.arange(segments)[:, None] * sides + np.arange(sides)[None, :]
+    b = np.arange(segments)[:, None] * sides + (np.arange(sides)[None, :] + 1) % sides
+    faces = np.stack([
+        np.stack([a, b, b + sides], axis=-1),
+        np.stack([a, b + sides, a + sides], axis=-1),
+    ], axis=2).reshape(-1, 3).astype(_index_dtype((segments + 1) * sides))
+    faces.flags.writeable = False
+    return faces
+
+
+def _tube(path, radius, sides):
+    # Rings around a path lying in a y = const plane: the ring frame is the
+    # in-plane normal and the y axis
+    tangent = np.gradient(path, axis=0)
+    tangent /= np.linalg.norm(tangent, axis=1, keepdims=True)
+    normal = np.stack([-tangent[:, 2], np.zeros(len(path)), tangent[:, 0]], axis=1)
+    theta = np.linspace(0, 2 * np.pi, sides, endpoint=False)
+    offsets = np.cos(theta)[None, :, None] * normal[:, None, :] \
+        + np.sin(theta)[None, :, None] * np.array([0.0, 1.0, 0.0])
+    return (path[:, None, :] + radius * offsets).reshape(-1, 3)
+
+
+@lru_cache(maxsize=256)
+def _geometry(P, L, T, lod):
+    level = LOD_LEVELS[lod]
+    dims = np.array([P, L, T, 1.0])
+
+    body = BODY_TEMPLATE @ dims
+    # Bags lower than their gusset fold keep the fold at the top edge
+    np.minimum(body[:, 2], T, out=body[:, 2])
+
+    wire = np.full((len(CREASE_EDGES), 3, 3), np.nan)
+    wire[:, :2] = body[CREASE_EDGES]
+
+    n = level["handle_segments"] + 1
+    paths = _handle_template(level["handle_segments"]) @ dims
+    geom = {
+        'body': body,
+        'wire': wire.reshape(-1, 3),
+        'holes': HOLES_TEMPLATE @ dims,
+        'front_handle': paths[:n],
+        'back_handle': paths[n:],
+    }
+    if level["tube_sides"]:
+        for key in ('front_handle', 'back_handle'):
+            geom[key] = _tube(geom[key], ROPE_RADIUS, level["tube_sides"])
+
+    for key, arr in geom.items():
+        geom[key] = arr = arr.astype(np.float32)
+        arr.flags.writeable = False
+    return geom
+
+
+metrics.watch_cache("mockup_geometry", _geometry)
+
+
+def mockup_geometry(P, L, T, lod=DEFAULT_LOD):
+    """float32 point arrays (n, 3) for body, wire (NaN-separated), holes and both handles.
+
+    Handles are tube vertices (rings of the LOD's ``tube_sides`` points) or,
+    when ``tube_sides`` is 0, the handle path itself.
+    """
+    if lod not in LOD_LEVELS:
+        raise ValueError(f"Unknown level of detail: {lod!r}")
+    return _geometry(*(round(float(v), KEY_DECIMALS) for v in (P, L, T)), lod)
+
+
+def mockup_faces(lod=DEFAULT_LOD):
+    """Triangle indices into mockup_geometry's arrays: 'body', and 'handle' for tube handles (else None)."""
+    level = LOD_LEVELS[lod]
+    handle = _tube_faces(level["handle_segments"], level["tube_sides"]) if level["tube_sides"] else None
+    return {'body': BODY_FACES, 'handle': handle}
+
+
+@lru_cache(maxsize=8)
+def prepare_artwork(data, lod=DEFAULT_LOD, colors=ART_COLORS):
+    """Decode image bytes into a palette-indexed grid sized for the LOD.
+
+    Returns (cells, palette): cells is a (rows, cols) uint8 array with row 0
+    at the top, palette a list of '#rrggbb' strings indexed by cell value.
+    """
+    from io import BytesIO
+
+    from PIL import Image
+
+    img = Image.open(BytesIO(data)).convert("RGB")
+    scale = LOD_LEVELS[lod]["art_cells"] / max(img.size)
+    size = (max(1, round(img.size[0] * scale)), max(1, round(img.size[1] * scale)))
+    img = img.resize(size, Image.LANCZOS).quantize(colors=colors)
+
+    cells = np.asarray(img, dtype=np.uint8)
+    rgb = np.array(img.getpalette()[:3 * (int(cells.max()) + 1)], dtype=np.uint8).reshape(-1, 3)
+    palette = ["#%02x%02x%02x" % tuple(c) for c in rgb]
+    cells.flags.writeable = False
+    return cells, palette
+
+
+def _artwork_trace(go, P, T, cells, palette):
+    rows, cols = cells.shape
+    x0, x1 = ART_BOX[0] * P, ART_BOX[1] * P
+    z0, z1 = ART_BOX[2] * T, min(ART_BOX[3] * T, T - HOLE_DROP - 1.0)
+    if z1 <= z0:
+        return None
+
+    # Fit the image into the printable box without stretching it
+    cell = min((x1 - x0) / cols, (z1 - z0) / rows)
+    xs = (x0 + x1) / 2 + (np.arange(cols + 1) - cols / 2) * cell
+    zs = (z0 + z1) / 2 + (rows / 2 - np.arange(rows + 1)) * cell
+    X, Z = np.meshgrid(xs, zs)
+
+    idx = np.arange(X.size).reshape(X.shape)
+    a, b = idx[:-1, :-1].ravel(), idx[:-1, 1:].ravel()
+    c, d = idx[1:, 1:].ravel(), idx[1:, :-1].ravel()
+    faces = np.stack([np.stack([a, b, c], 1), np.stack([a, c, d], 1)], axis=1)
+    faces = faces.reshape(-1, 3).astype(_index_dtype(X.size))
+
+    # Mesh3d has no texture coordinates: each cell's two triangles carry its
+    # palette index and a stepped colorscale turns that into the colour
+    top = max(len(palette) - 1, 1)
+    colorscale = [[i / top, color] for i, color in enumerate(palette)] if len(palette) > 1 \
+        else [[0, palette[0]], [1, palette[0]]]
+    return go.Mesh3d(
+        x=X.ravel().astype(np.float32),
+        y=np.full(X.size, -2 * HOLE_OFFSET, dtype=np.float32),
+        z=Z.ravel().astype(np.float32),
+        i=faces[:, 0], j=faces[:, 1], k=faces[:, 2],
+        intensity=np.repeat(cells.ravel(), 2), intensitymode='cell',
+        colorscale=colorscale, cmin=0, cmax=top, showscale=False,
+        flatshading=True,
+        lighting=dict(ambient=1.0, diffuse=0.0, specular=0.0),
+        hoverinfo='skip',
+        name='Artwork'
+    )
+
+
+def build_mockup(P, L, T, conv, unit, lod=DEFAULT_LOD, artwork=None):
+    """Plotly figure of the bag in neutral colours; style it with restyle_mockup.
+
+    ``artwork`` is a prepare_artwork result, printed on the front panel.
+    """
+    import plotly.graph_objects as go
+
+    geom = mockup_geometry(P, L, T, lod)
+    body, holes, wire = geom['body'], geom['holes'], geom['wire']
+    level = LOD_LEVELS[lod]
+
+    fig = go.Figure()
+    fig.add_trace(go.Mesh3d(
+        x=body[:, 0], y=body[:, 1], z=body[:, 2],
+        i=BODY_FACES[:, 0], j=BODY_FACES[:, 1], k=BODY_FACES[:, 2],
+        opacity=1.0,
+        flatshading=True,
+        name='Bag'
+    ))
+    for key, name in (('front_handle', 'Front Handle'), ('back_handle', 'Back Handle')):
+        pts = geom[key]
+        if level["tube_sides"]:
+            faces = mockup_faces(lod)['handle']
+            fig.add_trace(go.Mesh3d(
+                x=pts[:, 0], y=pts[:, 1], z=pts[:, 2],
+                i=faces[:, 0], j=faces[:, 1], k=faces[:, 2],
+                name=name
+            ))
+        else:
+            fig.add_trace(go.Scatter3d(
+                x=pts[:, 0], y=pts[:, 1], z=pts[:, 2],
+                mode='lines',
+                line=dict(width=7),
+                name=name
+            ))
+    fig.add_trace(go.Scatter3d(
+        x=holes[:, 0], y=holes[:, 1], z=holes[:, 2],
+        mode='markers',
+        marker=dict(size=8, color='black'),
+        name='Holes'
+    ))
+    fig.add_trace(go.Scatter3d(
+        x=wire[:, 0], y=wire[:, 1], z=wire[:, 2],
+        mode='lines',
+        line=dict(color='black', width=1),
+        hoverinfo='skip',
+        showlegend=False
+    ))
+    if artwork is not None:
+        trace = _artwork_trace(go, P, T, *artwork)
+        if trace is not None:
+            fig.add_trace(trace)
+
+    fig.update_layout(
+        scene=dict(
+            aspectmode='data',
+            camera=dict(eye=dict(x=1.5, y=1.5, z=1.2)),
+            xaxis_title=f"Length ({unit})",
+            yaxis_title=f"Width ({unit})",
+            zaxis_title=f"Height ({unit})"
+        ),
+        title=f"3D Mockup: {P/conv:.2f}×{L/conv:.2f}×{T/conv:.2f} {unit}",
+        height=500
+    )
+    return fig
+
+
+def restyle_mockup(fig, bag_color, handle_color):
+    """Recolour a build_mockup figure in place (no geometry is touched)."""
+    fig.update_traces(color=bag_color, selector=dict(name='Bag'))
+    for name in ('Front Handle', 'Back Handle'):
+        fig.update_traces(color=handle_color, selector=dict(name=name, type='mesh3d'))
+        fig.update_traces(line_color=handle_color, selector=dict(name=name, type='scatter3d'))
+    return fig
+
+
+def generate_3d_mockup(P, L, T, bag_color, handle_color, conv, unit, lod=DEFAULT_LOD, artwork=None):
+    """Generate 3D mockup figure"""
+    return restyle_mockup(build_mockup(P, L, T, conv, unit, lod, artwork), bag_color, handle_color)
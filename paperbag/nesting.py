@@ -0,0 +1,133 @@
+"""Guillotine nesting of identical rectangles.
+
+Recursive two-way cuts in the style of Gilmore–Gomory: every sub-rectangle
+is either filled with a uniform grid (normal or rotated) or split by one
+vertical or horizontal cut into two smaller sub-rectangles. Cut positions
+are restricted to raster points (sums of piece sides), which keeps the
+dynamic programme small while still finding the optimal guillotine pattern.
+"""
+import time
+
+import numpy as np
+
+EPS = 1e-9
+
+# How each DP cell was filled
+_GRID, _GRID_ROT, _CUT_V, _CUT_H = 0, 1, 2, 3
+
+
+def normal_points(length, a, b):
+    """Sorted distinct values i*a + j*b <= length (i, j >= 0)."""
+    i = np.arange(int((length + EPS) // a) + 1) * a
+    j = np.arange(int((length + EPS) // b) + 1) * b
+    pts = (i[:, None] + j[None, :]).ravel()
+    pts = pts[pts <= length + EPS]
+    return np.unique(np.round(pts, 9))
+
+
+def raster_points(length, normal):
+    """Reduced raster points: largest normal point below length - p, for p in normal."""
+    idx = np.searchsorted(normal, length - normal + EPS, side='right') - 1
+    return np.unique(normal[idx[idx >= 0]])
+
+
+def _cuts(points):
+    """For each size index i: cut indices k (0 < p_k <= p_i/2) and remainder indices."""
+    cuts = []
+    for i, size in enumerate(points):
+        ks = np.nonzero((points > EPS) & (points <= size / 2 + EPS))[0]
+        rem = np.searchsorted(points, size - points[ks] + EPS, side='right') - 1
+        cuts.append((ks, rem))
+    return cuts
+
+
+def guillotine_blocks(W, H, w, h, time_budget=0.5, rotate=True, cancelled=None):
+    """Best guillotine packing of w × h pieces on W × H.
+
+    Pieces may be turned 90° unless ``rotate`` is False. Returns (count,
+    blocks) where blocks are (x, y, cols, rows, rot) uniform grids, or None
+    when the search does not finish within time_budget seconds or the
+    ``cancelled()`` callable returns True (checked as often as the clock).
+    """
+    deadline = time.perf_counter() + time_budget
+    small = min(w, h) if rotate else w
+    if small <= 0 or W < small or H < (small if rotate else h):
+        return 0, []
+
+    # Without rotation only the matching side ever lies along each axis
+    xs = raster_points(W, normal_points(W, w, h if rotate else w))
+    ys = raster_points(H, normal_points(H, w if rotate else h, h))
+    m, n = len(xs), len(ys)
+
+    # Uniform grids for every (x, y) raster pair
+    g0 = np.floor((xs[:, None] + EPS) / w) * np.floor((ys[None, :] + EPS) / h)
+    g1 = np.floor((xs[:, None] + EPS) / h) * np.floor((ys[None, :] + EPS) / w)
+    if not rotate:
+        g1[:] = 0
+    best = np.maximum(g0, g1).astype(np.int64)
+    kind = np.where(g1 > g0, _GRID_ROT, _GRID)
+    cut = np.zeros((m, n), dtype=np.int64)
+    bound = np.floor((xs[:, None] * ys[None, :] + EPS) / (w * h)).astype(np.int64)
+
+    cuts_x = _cuts(xs)
+    cuts_y = _cuts(ys)
+
+    for i in range(m):
+        if time.perf_counter() > deadline or (cancelled is not None and cancelled()):
+            return None
+
+        # Vertical cuts only depend on narrower columns, so do a whole row at once
+        ks, rem = cuts_x[i]
+        if len(ks):
+            vals = best[ks, :] + best[rem, :]
+            arg = vals.argmax(axis=0)
+            top = vals[arg, np.arange(n)]
+            better = top > best[i]
+            best[i, better] = top[better]
+            kind[i, better] = _CUT_V
+            cut[i, better] = ks[arg[better]]
+
+        # Horizontal cuts depend on shorter cells of this same row
+        row = best[i]
+        for j in range(n):
+            if row[j] >= bound[i, j]:
+                continue
+            ks, rem = cuts_y[j]
+            if not len(ks):
+                continue
+            vals = row[ks] + row[rem]
+            a = vals.argmax()
+            if vals[a] > row[j]:
+                row[j] = vals[a]
+                kind[i, j] = _CUT_H
+                cut[i, j] = ks[a]
+
+    return int(best[m - 1, n - 1]), _reconstruct(xs, ys, w, h, kind, cut, m - 1, n - 1)
+
+
+def _reconstruct(xs, ys, w, h, kind, cut, i0, j0):
+    blocks = []
+    stack = [(i0, j0, 0.0, 0.0)]
+    while stack:
+        i, j, x0, y0 = stack.pop()
+        X, Y = xs[i], ys[j]
+        k = kind[i, j]
+        if k == _GRID:
+            cols, rows = int((X + EPS) // w), int((Y + EPS) // h)
+            if cols and rows:
+                blocks.append((x0, y0, cols, rows, False))
+        elif k == _GRID_ROT:
+            cols, rows = int((X + EPS) // h), int((Y + EPS) // w)
+            if cols and rows:
+                blocks.append((x0, y0, cols, rows, True))
+        elif k == _CUT_V:
+            c = cut[i, j]
+            rem = np.searchsorted(xs, X - xs[c] + EPS, side='right') - 1
+            stack.append((rem, j, x0 + xs[c], y0))
+            stack.append((c, j, x0, y0))
+        else:
+            c = cut[i, j]
+            rem = np.searchsorted(ys, Y - ys[c] + EPS, side='right') - 1
+            stack.append((i, rem, x0, y0 + ys[c]))
+            stack.append((i, c, x0, y0))
+    return blocks
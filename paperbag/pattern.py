@@ -0,0 +1,18 @@
+"""Paper bag pattern (die-cut) dimensions.
+
+All functions are plain arithmetic, so they accept scalars or NumPy arrays.
+"""
+
+
+def pattern_size(P, L, T, lem, top_lip):
+    """Net pattern size (pola_w_net, pola_h_net) in cm."""
+    pola_w_net = lem + (2 * L) + (2 * P)
+    pola_h_net = T + top_lip + (0.5 * P)
+    return pola_w_net, pola_h_net
+
+
+def unit_size(pola_w_net, pola_h_net, m_top, m_bottom, m_left, m_right):
+    """Pattern size including print margins (unit_w, unit_h)."""
+    unit_w = pola_w_net + m_left + m_right
+    unit_h = pola_h_net + m_top + m_bottom
+    return unit_w, unit_h
@@ -0,0 +1,285 @@
+"""Incremental recomputation: the calculator as a small dependency graph.
+
+A Graph declares nodes, each a function of named inputs or other nodes.
+A Pipeline evaluates a graph for one session, lazily and memoized per
+node: a node is recomputed only when one of its dependencies changed since
+it last ran, and a recomputed value equal to the old one leaves its
+dependents alone. A rerun that only changed ``margin_val`` re-evaluates
+profit and price; one that changed nothing the math reads (a colour
+picker) evaluates nothing.
+
+CALCULATOR is the apps' pipeline:
+
+    dims -> pattern -> unit -> [plano_ranking -> sheet] -> layout_job -> layout
+         -> pcs_per_plano -> plan -> total_plano_req -> costs -> profit -> price
+"""
+import numpy as np
+
+from paperbag.catalog import rank_planos
+from paperbag.costs import calculate_costs, calculate_profit, without_paper
+from paperbag.instrumentation import metrics
+from paperbag.jobs import submit_layout
+from paperbag.pattern import pattern_size
+from paperbag.pricebreak import cost_steps, fill_up_qty, price_curve
+from paperbag.production import plan_production
+from paperbag.solver import min_qty_for_price
+
+_MISSING = object()
+
+# Sheet steps closer together than the curve's resolution are not worth drawing
+MAX_CURVE_SHEET_STEPS = 10000
+
+
+def _same(a, b):
+    """Whether a new value can stand in for the old one (conservative)."""
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, np.ndarray):
+        return a.shape == b.shape and bool((a == b).all())
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        # e.g. containers of arrays: treat as changed
+        return False
+
+
+class Node:
+    __slots__ = ("name", "func", "deps", "volatile", "stateful")
+
+    def __init__(self, name, func, deps, volatile=False, stateful=False):
+        self.name = name
+        self.func = func
+        self.deps = deps
+        self.volatile = volatile
+        self.stateful = stateful
+
+
+class Graph:
+    """Node definitions, shared by every Pipeline built from them.
+
+    ``volatile`` nodes read state outside the graph and run again after
+    every ``update()``; ``stateful`` nodes also get their own previous value
+    as ``previous=``.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+
+    def node(self, *deps, volatile=False, stateful=False):
+        """Decorator registering a function as the node of the same name."""
+        def register(func):
+            self.nodes[func.__name__] = Node(func.__name__, func, deps, volatile, stateful)
+            return func
+        return register
+
+    @property
+    def inputs(self):
+        """Names read by some node that no node computes."""
+        return sorted({dep for node in self.nodes.values() for dep in node.deps} - set(self.nodes))
+
+
+class Pipeline:
+    """Memoized, lazy evaluation of a Graph for one session.
+
+    ``update()`` sets inputs, ``get()`` returns a node or input, computing
+    only what is out of date. ``evaluations`` counts node runs.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.evaluations = dict.fromkeys(graph.nodes, 0)
+        self._values = {}
+        self._versions = {}  # name -> bumped whenever its value changes
+        self._stamps = {}    # node -> versions of its dependencies when it last ran
+        self._generation = 0
+
+    def update(self, **inputs):
+        """Set inputs; unchanged values do not invalidate anything."""
+        self._generation += 1
+        for name, value in inputs.items():
+            if name in self.graph.nodes:
+                raise ValueError(f"'{name}' is computed by the pipeline, not an input")
+            self._set(name, value)
+
+    def get(self, name):
+        node = self.graph.nodes.get(name)
+        if node is not None:
+            self._refresh(node)
+        elif name not in self._values:
+            raise KeyError(f"Pipeline input '{name}' was not set")
+        return self._values[name]
+
+    def values(self, *names):
+        return tuple(self.get(name) for name in names)
+
+    def last(self, name, default=None):
+        """Most recent value of a node or input, without evaluating anything."""
+        return self._values.get(name, default)
+
+    def _set(self, name, value):
+        old = self._values.get(name, _MISSING)
+        if old is _MISSING or not _same(old, value):
+            self._versions[name] = self._versions.get(name, 0) + 1
+        self._values[name] = value
+
+    def _refresh(self, node):
+        for dep in node.deps:
+            if dep in self.graph.nodes:
+                self._refresh(self.graph.nodes[dep])
+            elif dep not in self._values:
+                raise KeyError(f"Pipeline input '{dep}' was not set")
+        stamp = tuple(self._versions[dep] for dep in node.deps)
+        if node.volatile:
+            stamp += (self._generation,)
+        if self._stamps.get(node.name) == stamp:
+            return
+
+        kwargs = {"previous": self._values.get(node.name)} if node.stateful else {}
+        with metrics.stage(f"node_{node.name}"):
+            value = node.func(*(self._values[dep] for dep in node.deps), **kwargs)
+        self.evaluations[node.name] += 1
+        self._stamps[node.name] = stamp
+        self._set(node.name, value)
+
+
+# ==========================================
+# CALCULATOR GRAPH
+# ==========================================
+CALCULATOR = Graph()
+
+
+@CALCULATOR.node("P", "L", "T", "lem", "top_lip")
+def pattern(P, L, T, lem, top_lip):
+    return pattern_size(P, L, T, lem, top_lip)
+
+
+@CALCULATOR.node("pattern")
+def area(pattern):
+    return pattern[0] * pattern[1]
+
+
+@CALCULATOR.node("pattern", "layout_rules", "m_top", "m_bottom", "m_left", "m_right")
+def unit(pattern, layout_rules, m_top, m_bottom, m_left, m_right):
+    return layout_rules.piece_size(*pattern, m_top, m_bottom, m_left, m_right)
+
+
+@CALCULATOR.node("plano_catalog", "unit", "qty", "base_cost_items", "area", "layout_rules", "production")
+def plano_ranking(plano_catalog, unit, qty, base_cost_items, area, layout_rules, production):
+    """Catalog sheets cheapest first, or None when a fixed plano is used."""
+    if plano_catalog is None:
+        return None
+    return rank_planos(plano_catalog, *unit, qty, base_cost_items, area,
+                       constraints=layout_rules, production=production)
+
+
+@CALCULATOR.node("plano_ranking", "plano_w", "plano_h")
+def sheet(plano_ranking, plano_w, plano_h):
+    if plano_ranking is None:
+        return plano_w, plano_h
+    if not plano_ranking:
+        return None
+    return plano_ranking[0]['plano_w'], plano_ranking[0]['plano_h']
+
+
+@CALCULATOR.node("base_cost_items", "plano_ranking", "paper_item")
+def cost_items(base_cost_items, plano_ranking, paper_item):
+    """Cost items; in catalog mode the winning sheet's price replaces the paper items.
+
+    ``paper_item`` is (name key, price key, name prefix, basis label) in the
+    app's language, e.g. ("name", "price", "Paper Plano", "Per Plano Sheet").
+    """
+    if not plano_ranking:
+        return list(base_cost_items)
+    best = plano_ranking[0]
+    name_key, price_key, prefix, basis = paper_item
+    return without_paper(base_cost_items) + [
+        {name_key: f"{prefix} {best['name']}", "basis": basis, price_key: best['price'], "batch": 1, "paper": True}
+    ]
+
+
+@CALCULATOR.node("sheet", "unit", "layout_rules", stateful=True)
+def layout_job(sheet, unit, layout_rules, previous=None):
+    return submit_layout(*sheet, *unit, previous, constraints=layout_rules)
+
+
+@CALCULATOR.node("layout_job", volatile=True)
+def layout(layout_job):
+    """(layout, final_plano_w, final_plano_h); the same object until the search lands."""
+    return layout_job.best()
+
+
+@CALCULATOR.node("layout")
+def pcs_per_plano(layout):
+    return len(layout[0])
+
+
+@CALCULATOR.node("layout", "unit")
+def efficiency(layout, unit):
+    positions, final_w, final_h = layout
+    return (len(positions) * unit[0] * unit[1]) / (final_w * final_h) * 100
+
+
+@CALCULATOR.node("qty", "pcs_per_plano", "production")
+def plan(qty, pcs_per_plano, production):
+    if pcs_per_plano == 0:
+        return None
+    return plan_production(qty, pcs_per_plano, production)
+
+
+@CALCULATOR.node("plan")
+def total_plano_req(plan):
+    return 0 if plan is None else int(plan['total_plano_req'])
+
+
+@CALCULATOR.node("cost_items", "qty", "total_plano_req", "area", "subtotal_label")
+def costs(cost_items, qty, total_plano_req, area, subtotal_label):
+    """(total production cost, breakdown rows)."""
+    return calculate_costs(cost_items, qty, total_plano_req, area, subtotal_label=subtotal_label)
+
+
+@CALCULATOR.node("costs", "qty", "margin_type", "margin_val")
+def profit(costs, qty, margin_type, margin_val):
+    return calculate_profit(costs[0], qty, margin_type, margin_val)
+
+
+@CALCULATOR.node("costs", "profit", "qty")
+def price(costs, profit, qty):
+    """(total selling price, unit price)."""
+    selling = costs[0] + profit
+    return selling, selling / qty if qty > 0 else 0
+
+
+@CALCULATOR.node("pb_qtys", "pcs_per_plano", "area", "cost_items", "margin_type", "margin_val", "production")
+def price_breaks(pb_qtys, pcs_per_plano, area, cost_items, margin_type, margin_val, production):
+    """Price break table, fill-up quantities, batch steps and the unit price curve.
+
+    The curve has both sides of every batch and sheet step, so its teeth are
+    drawn exactly; only batch steps are listed in ``step_qty``. Sheet steps
+    are left off the curve when there are more than MAX_CURVE_SHEET_STEPS.
+    """
+    if not pb_qtys:
+        return None
+    pb = price_curve(pb_qtys, pcs_per_plano, area, cost_items, margin_type, margin_val, production)
+    q_lo, q_hi = pb_qtys[0], max(pb_qtys[-1], pb_qtys[0] + 1)
+    all_qty, all_kind = cost_steps(q_lo, q_hi, pcs_per_plano, cost_items, production=production)
+    sheet = all_kind == "sheet"
+    step_qty, step_kind = all_qty[~sheet], all_kind[~sheet]
+    curve_steps = all_qty if sheet.sum() <= MAX_CURVE_SHEET_STEPS else step_qty
+    curve_q = np.unique(np.concatenate([
+        np.linspace(q_lo, q_hi, 400).astype(int), curve_steps, curve_steps - 1, pb_qtys
+    ]))
+    return {
+        'table': pb,
+        'fill': fill_up_qty(pb['qty'], pcs_per_plano, production),
+        'step_qty': step_qty,
+        'step_kind': step_kind,
+        'curve': price_curve(curve_q, pcs_per_plano, area, cost_items, margin_type, margin_val, production),
+    }
+
+
+@CALCULATOR.node("target_price", "pcs_per_plano", "area", "cost_items", "margin_type", "margin_val", "production")
+def min_qty(target_price, pcs_per_plano, area, cost_items, margin_type, margin_val, production):
+    return min_qty_for_price(target_price, pcs_per_plano, area, cost_items, margin_type, margin_val,
+                             production=production)
@@ -0,0 +1,86 @@
+"""Quantity price breaks: the whole price curve in one vectorized pass."""
+import numpy as np
+
+from paperbag.costs import DRIVER_SHEETS, calculate_profit, compile_cost_items
+from paperbag.production import plano_sheets
+
+
+def parse_quantities(text):
+    """'1.000, 2000, 5k' style list -> sorted unique positive ints (bad entries skipped)."""
+    qtys = set()
+    for part in text.split(","):
+        part = part.strip().lower().replace(".", "").replace(" ", "")
+        mult = 1
+        if part.endswith("k"):
+            part, mult = part[:-1], 1000
+        if part.isdigit() and int(part) > 0:
+            qtys.add(int(part) * mult)
+    return sorted(qtys)
+
+
+def price_curve(qtys, pcs_per_plano, area_cm2_per_pcs, cost_items, margin_type, margin_val,
+                production=None):
+    """Sheets, costs and prices for every quantity in qtys (array-like).
+
+    ``production`` (ProductionRules) adds overs, make-ready and spoilage sheets.
+    """
+    qty = np.asarray(qtys, dtype=float)
+    total_plano_req = plano_sheets(qty, pcs_per_plano, production)
+    production_cost = compile_cost_items(cost_items).total(qty, total_plano_req, area_cm2_per_pcs)
+    profit = calculate_profit(production_cost, qty, margin_type, margin_val)
+    selling_price = production_cost + profit
+    return {
+        'qty': qty.astype(np.int64),
+        'total_plano_req': total_plano_req.astype(np.int64),
+        'production_cost': production_cost,
+        'profit': profit,
+        'selling_price': selling_price,
+        'unit_price': selling_price / qty,
+    }
+
+
+def cost_steps(q_min, q_max, pcs_per_plano, cost_items, include_sheets=True, production=None):
+    """Quantities in [q_min, q_max] where a new plano sheet or print batch starts.
+
+    Returns (qty, kind) arrays: ``qty`` is the first quantity that pays for
+    the extra sheet/batch, so ``qty - 1`` has the lowest unit price before the
+    step. ``kind`` is "sheet" or the batch size as "batch N". Sheet steps
+    follow the good sheets, after ``production`` overs.
+    """
+    rules = compile_cost_items(cost_items)
+    qty_parts, kind_parts = [], []
+
+    def add(first, label):
+        qty_parts.append(first)
+        kind_parts.append(np.full(len(first), label, dtype=object))
+
+    def multiples(step):
+        # Steps sit at k * step + 1; the first one at or above q_min
+        return np.arange(np.ceil((q_min - 1) / step) * step, q_max, step).astype(np.int64) + 1
+
+    if include_sheets and rules.coef[DRIVER_SHEETS] != 0:
+        overs = 1 + (production.overs / 100 if production is not None else 0.0)
+        if overs == 1:
+            add(multiples(pcs_per_plano), "sheet")
+        else:
+            # Sheet k + 1 starts at the first qty whose good pcs exceed k sheets
+            k = np.arange(np.ceil(q_min * overs / pcs_per_plano) - 1, np.ceil(q_max * overs / pcs_per_plano))
+            first = (np.floor(k * pcs_per_plano / overs + 1e-9) + 1).astype(np.int64)
+            add(first[(first >= q_min) & (first <= q_max)], "sheet")
+    for k, batch in enumerate(rules.batch_sizes):
+        if rules.coef[4 + k] != 0:
+            add(multiples(batch), f"batch {batch}")
+
+    if not qty_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
+    qty = np.concatenate(qty_parts)
+    kind = np.concatenate(kind_parts)
+    order = np.argsort(qty, kind="stable")
+    return qty[order], kind[order]
+
+
+def fill_up_qty(qty, pcs_per_plano, production=None):
+    """Largest quantity printable on the same number of sheets as qty."""
+    if production is not None and not production.free:
+        return production.fill_up(qty, pcs_per_plano)
+    return np.ceil(np.asarray(qty) / pcs_per_plano).astype(np.int64) * pcs_per_plano
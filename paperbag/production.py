@@ -0,0 +1,146 @@
+"""Production plan: plano sheets actually run, between layout and costing.
+
+``ceil(qty / pcs_per_plano)`` is the number of good sheets a job needs.
+The press room runs more:
+
+- **overs**: extra bags (% of the order) printed on top of the quantity;
+- **press runs**: orders are split into runs of ``run_size`` bags, the
+  same batches the "Per Batch" cost items charge for;
+- per **process** (printing, lamination, die-cutting, ...): make-ready
+  sheets for every run plus a spoilage allowance (% of the sheets going
+  into the next process).
+
+Processes are listed in production order and worked backwards from the
+good sheets, so spoilage on the press also covers what the die-cutter will
+spoil. Everything is vectorized over qty and pieces per plano.
+"""
+import numpy as np
+
+from paperbag.costs import compile_cost_items
+
+# Starting point for the process table in the apps (off until enabled)
+DEFAULT_PROCESSES = [
+    {"name": "Offset Printing", "make_ready": 100, "spoilage": 2.0},
+    {"name": "Lamination", "make_ready": 20, "spoilage": 1.0},
+    {"name": "Die-Cutting", "make_ready": 30, "spoilage": 1.5},
+    {"name": "Gluing & Finishing", "make_ready": 0, "spoilage": 1.0},
+]
+
+
+def _process_name(process):
+    return process['name'] if 'name' in process else process['nama']
+
+
+class ProductionRules:
+    """Overs, press run size and per-process make-ready/spoilage.
+
+    processes: list of dicts with ``name`` (or ``nama``), ``make_ready``
+        (sheets per run) and ``spoilage`` (%), in production order.
+    overs: extra bags printed, % of the order quantity.
+    run_size: bags per press run, or None for one run per order.
+    """
+
+    __slots__ = ("names", "make_ready", "spoilage", "overs", "run_size")
+
+    def __init__(self, processes=(), overs=0.0, run_size=None):
+        processes = list(processes)
+        self.names = tuple(_process_name(p) for p in processes)
+        self.make_ready = np.array([float(p.get('make_ready') or 0) for p in processes])
+        self.spoilage = np.array([float(p.get('spoilage') or 0) for p in processes])
+        if (self.make_ready < 0).any() or (self.spoilage < 0).any():
+            raise ValueError("Make-ready and spoilage must not be negative")
+        self.overs = float(overs)
+        self.run_size = int(run_size) if run_size else None
+
+    def key(self):
+        """Flat tuple of scalars identifying these rules (for cache keys)."""
+        return (round(self.overs, 4), self.run_size) + tuple(
+            v for mr, sp in zip(self.make_ready, self.spoilage) for v in (round(mr, 4), round(sp, 4))
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, ProductionRules) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return (f"ProductionRules({len(self.names)} processes, overs={self.overs:g}, "
+                f"run_size={self.run_size!r})")
+
+    @property
+    def free(self):
+        """True when the plan is just ceil(qty / pcs_per_plano)."""
+        return self.overs == 0 and not self.make_ready.any() and not self.spoilage.any()
+
+    def runs(self, qty):
+        """Press runs per order (at least one)."""
+        qty = np.asarray(qty, dtype=float)
+        if self.run_size is None:
+            return np.ones(np.shape(qty), dtype=np.int64)
+        return np.maximum(np.ceil(qty / self.run_size), 1).astype(np.int64)
+
+    def plan(self, qty, pcs_per_plano):
+        """Sheet plan for every qty / pcs_per_plano (broadcast), as a dict of arrays.
+
+        ``total_plano_req`` is the gross sheet count to cost; ``make_ready``
+        and ``spoilage`` have one trailing column per process.
+        """
+        qty = np.asarray(qty, dtype=float)
+        pcs = np.asarray(pcs_per_plano, dtype=float)
+        good_pcs = np.ceil(qty * (1 + self.overs / 100) - 1e-9)
+        net_sheets = np.ceil(good_pcs / pcs)
+        runs = self.runs(qty)
+
+        shape = np.broadcast(net_sheets, runs).shape
+        make_ready = np.zeros(shape + (len(self.names),))
+        spoilage = np.zeros(shape + (len(self.names),))
+        sheets = np.broadcast_to(net_sheets, shape)
+        for k in range(len(self.names) - 1, -1, -1):
+            spoilage[..., k] = np.ceil(sheets * self.spoilage[k] / 100 - 1e-9)
+            make_ready[..., k] = self.make_ready[k] * runs
+            sheets = sheets + spoilage[..., k] + make_ready[..., k]
+
+        total = sheets.astype(np.int64)
+        return {
+            'good_pcs': good_pcs.astype(np.int64),
+            'net_sheets': net_sheets.astype(np.int64),
+            'runs': runs,
+            'sheets_per_run': np.ceil(total / runs).astype(np.int64),
+            'make_ready': make_ready.astype(np.int64),
+            'spoilage': spoilage.astype(np.int64),
+            'total_plano_req': total,
+        }
+
+    def sheets(self, qty, pcs_per_plano):
+        """Gross plano sheets to cost (int64 array)."""
+        if self.free:
+            return np.ceil(np.asarray(qty, dtype=float) / pcs_per_plano).astype(np.int64)
+        return self.plan(qty, pcs_per_plano)['total_plano_req']
+
+    def fill_up(self, qty, pcs_per_plano):
+        """Largest quantity run on the same sheets (same good sheets and press runs) as qty."""
+        qty = np.asarray(qty)
+        net_sheets = np.ceil(np.ceil(qty * (1 + self.overs / 100) - 1e-9) / pcs_per_plano)
+        most = np.floor(net_sheets * pcs_per_plano / (1 + self.overs / 100) + 1e-9)
+        if self.run_size is not None:
+            most = np.minimum(most, self.runs(qty) * self.run_size)
+        return np.maximum(most, qty).astype(np.int64)
+
+
+def plan_production(qty, pcs_per_plano, production=None):
+    """Production plan for qty / pcs_per_plano; ``production`` defaults to no waste."""
+    return (production or ProductionRules()).plan(qty, pcs_per_plano)
+
+
+def plano_sheets(qty, pcs_per_plano, production=None):
+    """Gross plano sheets: ceil(qty / pcs_per_plano) plus overs, make-ready and spoilage."""
+    if production is None:
+        return np.ceil(np.asarray(qty, dtype=float) / pcs_per_plano).astype(np.int64)
+    return production.sheets(qty, pcs_per_plano)
+
+
+def batch_run_size(cost_items):
+    """Largest "Per Batch" size among the cost items (a natural press run), or None."""
+    sizes = compile_cost_items(cost_items).batch_sizes
+    return int(max(sizes)) if sizes else None
@@ -0,0 +1,125 @@
+"""Batch quotation: price many bag specs in one vectorized pass."""
+import numpy as np
+
+from paperbag.cache import cached_optimize_plano
+from paperbag.costs import MARGIN_PERCENT, calculate_profit, cost_totals
+from paperbag.layout import count_pieces
+from paperbag.pattern import pattern_size, unit_size
+from paperbag.production import plano_sheets
+
+# Columns a spec table may provide, with the sidebar defaults used when missing
+SPEC_DEFAULTS = {
+    'P': None,
+    'L': None,
+    'T': None,
+    'qty': None,
+    'plano_w': 109.0,
+    'plano_h': 79.0,
+    'lem': 2.0,
+    'top_lip': 2.0,
+    'm_top': 1.0,
+    'm_bottom': 1.0,
+    'm_left': 1.5,
+    'm_right': 1.5,
+}
+
+
+def _has_column(specs, name):
+    names = getattr(getattr(specs, 'dtype', None), 'names', None)
+    if names is not None:
+        return name in names
+    return name in specs
+
+
+def spec_columns(specs):
+    """Read a spec table into a dict of float arrays, filling defaults.
+
+    ``specs`` may be a NumPy structured array or any mapping of columns
+    (dict of lists/arrays, pandas DataFrame).
+    """
+    cols = {}
+    n = None
+    for name, default in SPEC_DEFAULTS.items():
+        if _has_column(specs, name):
+            cols[name] = np.asarray(specs[name], dtype=float)
+            n = len(cols[name])
+        elif default is None:
+            raise KeyError(f"Spec column '{name}' is required")
+    for name, default in SPEC_DEFAULTS.items():
+        if name not in cols:
+            cols[name] = np.full(n, default)
+    return cols
+
+
+def nested_counts(plano_w, plano_h, unit_w, unit_h, constraints=None):
+    """Pieces-per-plano from the guillotine search, once per distinct size.
+
+    Returns (counts, swapped): whether the chosen layout uses the plano turned.
+    """
+    keys = np.stack([plano_w, plano_h, unit_w, unit_h], axis=1)
+    uniq, inverse = np.unique(keys, axis=0, return_inverse=True)
+    counts = np.empty(len(uniq), dtype=np.int64)
+    swapped = np.empty(len(uniq), dtype=bool)
+    for i, row in enumerate(uniq):
+        layout, final_w, _ = cached_optimize_plano(*row, "guillotine", constraints)
+        counts[i] = len(layout)
+        swapped[i] = final_w != row[0]
+    inverse = inverse.ravel()
+    return counts[inverse], swapped[inverse]
+
+
+def quote_batch(specs, cost_items, margin_type=MARGIN_PERCENT, margin_val=30.0, method="grid",
+                constraints=None, production=None):
+    """Quote every spec row at once.
+
+    ``method="grid"`` counts pieces in closed form for every row.
+    ``method="guillotine"`` runs the nesting search once per distinct
+    (plano, unit size) and is only fast when sizes repeat. With shared
+    gutters in ``constraints`` the sheet margins come from the constraints
+    and the margin columns are not used. ``production`` (ProductionRules)
+    adds overs, make-ready and spoilage sheets.
+
+    Returns a dict of NumPy columns. Rows whose pattern does not fit the plano
+    have ``valid == False`` and NaN prices.
+    """
+    c = spec_columns(specs)
+    qty = c['qty']
+
+    pola_w_net, pola_h_net = pattern_size(c['P'], c['L'], c['T'], c['lem'], c['top_lip'])
+    area_cm2_per_pcs = pola_w_net * pola_h_net
+    margins = (c['m_top'], c['m_bottom'], c['m_left'], c['m_right'])
+    if constraints is None:
+        unit_w, unit_h = unit_size(pola_w_net, pola_h_net, *margins)
+    else:
+        unit_w, unit_h = constraints.piece_size(pola_w_net, pola_h_net, *margins)
+
+    if method == "guillotine":
+        pcs_per_plano, plano_swapped = nested_counts(c['plano_w'], c['plano_h'], unit_w, unit_h, constraints)
+    else:
+        pcs_per_plano, plano_swapped = count_pieces(c['plano_w'], c['plano_h'], unit_w, unit_h, constraints)
+    valid = pcs_per_plano > 0
+    safe_pcs = np.where(valid, pcs_per_plano, 1)
+    total_plano_req = np.where(valid, plano_sheets(qty, safe_pcs, production), 0).astype(np.int64)
+    efficiency = (pcs_per_plano * unit_w * unit_h) / (c['plano_w'] * c['plano_h']) * 100
+
+    production_cost = cost_totals(cost_items, qty, total_plano_req, area_cm2_per_pcs)
+    profit = calculate_profit(production_cost, qty, margin_type, margin_val)
+    selling_price = production_cost + profit
+
+    nan = np.nan
+    return {
+        'pola_w_net': pola_w_net,
+        'pola_h_net': pola_h_net,
+        'area_cm2_per_pcs': area_cm2_per_pcs,
+        'unit_w': unit_w,
+        'unit_h': unit_h,
+        'valid': valid,
+        'pcs_per_plano': pcs_per_plano,
+        'plano_swapped': plano_swapped,
+        'total_plano_req': total_plano_req,
+        'efficiency': efficiency,
+        'production_cost': np.where(valid, production_cost, nan),
+        'profit': np.where(valid, profit, nan),
+        'selling_price': np.where(valid, selling_price, nan),
+        'unit_price': np.where(valid, selling_price / qty, nan),
+    }
@@ -0,0 +1,181 @@
+"""Pattern and plano layout figures; layout images are served from a cache.
+
+Uses the object-oriented Figure API (no pyplot), so figures are never
+registered globally and are freed as soon as the bytes are written.
+"""
+from io import BytesIO
+
+import numpy as np
+
+from paperbag.cache import KEY_DECIMALS, LRUCache
+from paperbag.instrumentation import metrics
+
+image_cache = LRUCache(maxsize=256)
+metrics.watch_cache("layout_image", image_cache)
+
+NORMAL_COLOR = 'skyblue'
+ROTATED_COLOR = 'orange'
+
+
+def _rect_verts(x, y, w, h):
+    """(n, 4, 2) polygon vertices for n axis-aligned rectangles."""
+    return np.stack([
+        np.stack([x, y], axis=-1),
+        np.stack([x + w, y], axis=-1),
+        np.stack([x + w, y + h], axis=-1),
+        np.stack([x, y + h], axis=-1),
+    ], axis=1)
+
+
+def draw_plano_layout(layout, final_plano_w, final_plano_h, pola_w_net, pola_h_net,
+                      m_left, m_bottom, m_top, title, conv=1.0, unit="cm", gripper=0.0):
+    """Build the layout figure with one collection per layer.
+
+    ``gripper`` shades the unprintable strip along the sheet's long edge.
+    """
+    from matplotlib.collections import PolyCollection
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Rectangle
+
+    fig = Figure(figsize=(14, 10))
+    ax = fig.subplots()
+    ax.set_aspect('equal')
+
+    # Plano outline
+    ax.add_patch(Rectangle(
+        (0, 0), final_plano_w/conv, final_plano_h/conv,
+        lw=3, edgecolor='black', facecolor='white'
+    ))
+
+    # Gripper strip: bottom when the long side is horizontal, else left
+    if gripper > 0:
+        if final_plano_w >= final_plano_h:
+            strip = (0, 0, final_plano_w, gripper)
+        else:
+            strip = (0, 0, gripper, final_plano_h)
+        ax.add_patch(Rectangle(
+            (strip[0]/conv, strip[1]/conv), strip[2]/conv, strip[3]/conv,
+            lw=0, facecolor='lightcoral', alpha=0.4, hatch='//'
+        ))
+
+    p = layout.positions
+    rot = p['rot']
+
+    # Material area (with margin)
+    ax.add_collection(PolyCollection(
+        _rect_verts(p['x'], p['y'], p['w'], p['h']) / conv,
+        linewidths=1, edgecolors='gray', linestyles='--',
+        facecolors='#f0f0f0', alpha=0.5
+    ))
+
+    # Print area (net); rotated pieces have their top margin on the left
+    inner_x = p['x'] + np.where(rot, m_top, m_left)
+    inner_y = p['y'] + np.where(rot, m_left, m_bottom)
+    inner_w = np.where(rot, pola_h_net, pola_w_net)
+    inner_h = np.where(rot, pola_w_net, pola_h_net)
+    ax.add_collection(PolyCollection(
+        _rect_verts(inner_x, inner_y, inner_w, inner_h) / conv,
+        linewidths=1, edgecolors='blue',
+        facecolors=np.where(rot, ROTATED_COLOR, NORMAL_COLOR), alpha=0.7
+    ))
+
+    ax.set_xlim(-5/conv, (final_plano_w + 5)/conv)
+    ax.set_ylim(-5/conv, (final_plano_h + 5)/conv)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_xlabel(f"Width ({unit})")
+    ax.set_ylabel(f"Height ({unit})")
+    return fig
+
+
+def render_plano_layout(layout, final_plano_w, final_plano_h, pola_w_net, pola_h_net,
+                        m_left, m_bottom, m_top, title, conv=1.0, unit="cm", fmt="png", gripper=0.0):
+    """Layout image as PNG/SVG bytes, cached by layout and drawing parameters."""
+    dims = (final_plano_w, final_plano_h, layout.item_w, layout.item_h,
+            pola_w_net, pola_h_net, m_left, m_bottom, m_top, conv, layout.gap, gripper)
+    key = (
+        tuple(round(float(v), KEY_DECIMALS) for v in dims),
+        tuple((round(float(x), KEY_DECIMALS), round(float(y), KEY_DECIMALS), c, r, bool(rot))
+              for x, y, c, r, rot in layout.blocks),
+        title, unit, fmt,
+    )
+
+    def compute():
+        with metrics.stage("render_layout"):
+            fig = draw_plano_layout(layout, final_plano_w, final_plano_h, pola_w_net, pola_h_net,
+                                    m_left, m_bottom, m_top, title, conv, unit, gripper)
+            buf = BytesIO()
+            fig.savefig(buf, format=fmt, bbox_inches='tight')
+        metrics.observe_bytes(f"layout_{fmt}", buf.tell())
+        return buf.getvalue()
+
+    return image_cache.get_or_compute(key, compute)
+
+
+def draw_pattern(P, L, T, lem, top_lip, title, conv=1.0, unit="cm"):
+    """2D technical pattern figure (dimensions in cm, drawn in `unit`)."""
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Circle
+
+    # Coordinates
+    x = [0]
+    for width in [lem, L, P, L, P]:
+        x.append(x[-1] + width)
+    x = [val_x / conv for val_x in x]
+    P, L, T, top_lip = P / conv, L / conv, T / conv, top_lip / conv
+
+    y_actual_top = T + top_lip
+    y_top_fold = T
+    y_green = 0.5 * L
+    y_base = 0
+    y_bottom = -(0.5 * P)
+
+    y_hole_upper = T + (top_lip / 2)
+    y_hole_lower = T - (top_lip / 2)
+
+    v_mids = [(x[1] + x[2]) / 2, (x[3] + x[4]) / 2]
+    p_panels = [(x[2], x[3]), (x[4], x[5])]
+
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
+
+    # Vertical lines
+    for val_x in x:
+        ax.plot([val_x, val_x], [y_bottom, y_actual_top], color='black', lw=1)
+
+    # Horizontal lines
+    ax.plot([x[0], x[-1]], [y_actual_top, y_actual_top], color='black', lw=1.5)
+    ax.plot([x[0], x[-1]], [y_top_fold, y_top_fold], color='black', ls='--', lw=1.2, label='Fold line (T)')
+    ax.plot([x[0], x[-1]], [y_bottom, y_bottom], color='black', lw=1.5)
+    ax.plot([x[0], x[-1]], [y_base, y_base], color='gray', ls=':', alpha=0.5)
+    ax.plot([x[0], x[-1]], [y_green, y_green], color='green', ls='--', lw=1, label='Gusset')
+
+    # Gusset verticals
+    ax.plot([v_mids[0], v_mids[0]], [y_green, y_actual_top], color='blue', lw=1.5)
+    ax.plot([v_mids[1], v_mids[1]], [y_green, y_actual_top], color='blue', lw=1.5)
+
+    # Holes
+    hole_size = 0.35
+    for p_start, p_end in p_panels:
+        h1_x = p_start + (0.25 * P)
+        h2_x = p_start + (0.75 * P)
+        for h_x in [h1_x, h2_x]:
+            ax.add_patch(Circle((h_x, y_hole_upper), hole_size, color='blue', fill=False, lw=1.5))
+            ax.add_patch(Circle((h_x, y_hole_lower), hole_size, color='blue', fill=False, lw=1.5))
+
+    # Diagonals
+    p_mid1 = (x[2] + x[3]) / 2
+    p_mid2 = (x[4] + x[5]) / 2
+
+    ax.plot([v_mids[0], x[0]], [y_green, y_green - (v_mids[0] - x[0])], color='red', lw=2)
+    ax.plot([v_mids[0], p_mid1], [y_green, y_bottom], color='red', lw=2)
+    ax.plot([p_mid1, v_mids[1]], [y_bottom, y_green], color='red', lw=2)
+    ax.plot([v_mids[1], p_mid2], [y_green, y_bottom], color='red', lw=2)
+    ax.plot([p_mid2, x[5]], [y_bottom, y_base], color='red', lw=2)
+
+    ax.set_aspect('equal')
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_xlabel(f"Width ({unit})")
+    ax.set_ylabel(f"Height ({unit})")
+    ax.grid(True, which='both', linestyle=':', alpha=0.3)
+    ax.legend()
+    return fig
@@ -0,0 +1,58 @@
+"""What-if sweeps: two spec inputs over a dense grid, one quote_batch pass."""
+import numpy as np
+
+from paperbag.costs import MARGIN_PERCENT
+from paperbag.quote import quote_batch
+
+SWEEP_METRICS = {
+    'pcs_per_plano': "Pcs/Plano",
+    'efficiency': "Efficiency (%)",
+    'unit_price': "Unit Price",
+}
+
+
+def sensitivity_grid(base_spec, x_name, x_values, y_name, y_values, cost_items,
+                     margin_type=MARGIN_PERCENT, margin_val=30.0, constraints=None, production=None):
+    """Evaluate every (x, y) pair with the other inputs held at ``base_spec``.
+
+    ``x_name``/``y_name`` are quote_batch spec columns (P, L, T, qty, plano_w,
+    ...). Uses the closed-form grid layout, which keeps 10^5 points well under
+    a second. Returns x, y and one (len(y), len(x)) array per SWEEP_METRICS key.
+    """
+    x = np.asarray(x_values, dtype=float)
+    y = np.asarray(y_values, dtype=float)
+    X, Y = np.meshgrid(x, y)
+
+    specs = {k: np.full(X.size, float(v)) for k, v in base_spec.items()}
+    specs[x_name] = X.ravel()
+    specs[y_name] = Y.ravel()
+    result = quote_batch(specs, cost_items, margin_type, margin_val, method="grid",
+                         constraints=constraints, production=production)
+
+    grid = {'x': x, 'y': y}
+    for key in SWEEP_METRICS:
+        values = result[key].astype(float)
+        values[~result['valid']] = np.nan
+        grid[key] = values.reshape(X.shape)
+    return grid
+
+
+def sensitivity_heatmap(grid, metric, x_label, y_label, marker=None, conv=1.0):
+    """Plotly heatmap of one metric; ``marker`` is the current (x, y) point."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Heatmap(
+        x=grid['x'] * conv, y=grid['y'] * conv, z=grid[metric],
+        colorscale='Viridis', reversescale=metric == 'unit_price',
+        colorbar=dict(title=SWEEP_METRICS[metric]),
+        hovertemplate=f"{x_label}: %{{x:.2f}}<br>{y_label}: %{{y:.2f}}<br>"
+                      f"{SWEEP_METRICS[metric]}: %{{z:,.1f}}<extra></extra>"
+    ))
+    if marker is not None:
+        fig.add_trace(go.Scatter(
+            x=[marker[0] * conv], y=[marker[1] * conv], mode='markers',
+            marker=dict(symbol='x', size=12, color='red'), name="Current", hoverinfo='skip'
+        ))
+    fig.update_layout(xaxis_title=x_label, yaxis_title=y_label, height=550,
+                      margin=dict(l=0, r=0, b=0, t=30), showlegend=False)
+    return fig
@@ -0,0 +1,372 @@
+"""Asyncio HTTP/JSON quoting service for embedding the calculator in a web shop.
+
+    python -m paperbag serve --costs costs.json --port 8765
+
+Endpoints take a JSON object body (POST) or a query string (GET); sizes
+are in cm:
+
+    /quote    P, L, T, qty [+ plano_w, plano_h, lem, top_lip, m_*]  -> price
+    /layout   the same spec without qty                              -> plano layout
+    /mockup   P, L, T [, lod]                                        -> 3D mockup geometry
+    /health   liveness
+    /metrics  Prometheus text (see paperbag.instrumentation)
+
+Specs may also carry the press rules ``grain``, ``gripper`` and ``gutter``.
+Cost items, margin and production plan are fixed when the server starts;
+visitors only send bag specs. Identical requests in flight share one computation, finished
+responses and layouts are kept in LRU caches, and at most ``workers``
+computations run at once on a thread pool. Requests beyond ``max_pending``
+waiting ones get a 503 instead of piling up.
+"""
+import asyncio
+import json
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from paperbag.cache import KEY_DECIMALS, LRUCache, cached_optimize_plano
+from paperbag.instrumentation import metrics
+from paperbag.layout import GRAIN_DIRECTIONS, LAYOUT_METHODS, LayoutConstraints
+from paperbag.mockup import DEFAULT_LOD, LOD_LEVELS, mockup_faces, mockup_geometry
+from paperbag.pattern import pattern_size
+from paperbag.quote import SPEC_DEFAULTS, quote_batch
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 64 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+
+QUOTE_FIELDS = [
+    "valid", "pcs_per_plano", "total_plano_req", "efficiency",
+    "production_cost", "profit", "selling_price", "unit_price",
+]
+
+
+class RequestError(ValueError):
+    """Invalid request; answered with 400 and the message."""
+
+
+# ==========================================
+# SPEC PARSING
+# ==========================================
+def _number(params, name, default=None):
+    value = params.get(name, default)
+    if value is None or value == "":
+        if default is None:
+            raise RequestError(f"'{name}' is required")
+        value = default
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise RequestError(f"'{name}' must be a number") from None
+    if not math.isfinite(value) or value < 0:
+        raise RequestError(f"'{name}' must be a non-negative number")
+    return round(value, KEY_DECIMALS)
+
+
+def parse_spec(params, with_qty=True):
+    """Bag spec (dict of floats, defaults filled) from request parameters."""
+    spec = {}
+    for name, default in SPEC_DEFAULTS.items():
+        if name == "qty" and not with_qty:
+            continue
+        spec[name] = _number(params, name, default)
+    for name in ("P", "L", "T", "plano_w", "plano_h"):
+        if spec[name] <= 0:
+            raise RequestError(f"'{name}' must be positive")
+    if with_qty and spec["qty"] < 1:
+        raise RequestError("'qty' must be at least 1")
+    return spec
+
+
+def parse_constraints(params, spec):
+    """LayoutConstraints from the optional grain/gripper/gutter parameters."""
+    grain = params.get("grain") or None
+    if grain not in (None,) + GRAIN_DIRECTIONS:
+        raise RequestError(f"'grain' must be one of {', '.join(GRAIN_DIRECTIONS)}")
+    gutter = params.get("gutter")
+    gutter = None if gutter in (None, "") else _number(params, "gutter")
+    margins = (spec["m_top"], spec["m_bottom"], spec["m_left"], spec["m_right"])
+    return LayoutConstraints(grain, _number(params, "gripper", 0.0), gutter, margins)
+
+
+def _scalar(value):
+    value = value.item()
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _points(arr):
+    return arr.astype(float).round(KEY_DECIMALS).tolist()
+
+
+# ==========================================
+# COMPUTATIONS (run on the worker threads)
+# ==========================================
+def quote_spec(spec, constraints, cost_items, margin_type, margin_val, method, production=None):
+    """Quote of one bag spec as a dict of plain values."""
+    result = quote_batch({name: [value] for name, value in spec.items()},
+                         cost_items, margin_type, margin_val, method, constraints, production)
+    quote = {name: _scalar(result[name][0]) for name in QUOTE_FIELDS}
+    quote["pattern"] = [_scalar(result["pola_w_net"][0]), _scalar(result["pola_h_net"][0])]
+    return quote
+
+
+def layout_spec(spec, constraints, method):
+    """Best plano layout for a bag spec, as grid blocks of pieces."""
+    pola_w_net, pola_h_net = pattern_size(spec["P"], spec["L"], spec["T"], spec["lem"], spec["top_lip"])
+    unit_w, unit_h = constraints.piece_size(
+        pola_w_net, pola_h_net, spec["m_top"], spec["m_bottom"], spec["m_left"], spec["m_right"]
+    )
+    layout, sheet_w, sheet_h = cached_optimize_plano(
+        spec["plano_w"], spec["plano_h"], unit_w, unit_h, method, constraints
+    )
+    return {
+        "pcs_per_plano": len(layout),
+        "sheet": [float(sheet_w), float(sheet_h)],
+        "unit": [float(unit_w), float(unit_h)],
+        "gap": float(layout.gap),
+        "efficiency": len(layout) * unit_w * unit_h / (sheet_w * sheet_h) * 100,
+        # Each block is cols × rows pieces from (x, y), turned 90° when rot
+        "blocks": [
+            {"x": float(x), "y": float(y), "cols": int(cols), "rows": int(rows), "rot": bool(rot)}
+            for x, y, cols, rows, rot in layout.blocks
+        ],
+    }
+
+
+def mockup_spec(P, L, T, lod):
+    """3D mockup point arrays and triangle indices for a bag."""
+    geom = mockup_geometry(P, L, T, lod)
+    faces = mockup_faces(lod)
+    return {
+        "body": _points(geom["body"]),
+        "body_faces": faces["body"].tolist(),
+        # Crease lines as [start, end] segments (the arrays are NaN-separated)
+        "creases": _points(geom["wire"].reshape(-1, 3, 3)[:, :2]),
+        "holes": _points(geom["holes"]),
+        "front_handle": _points(geom["front_handle"]),
+        "back_handle": _points(geom["back_handle"]),
+        "handle_faces": None if faces["handle"] is None else faces["handle"].tolist(),
+    }
+
+
+# ==========================================
+# SERVICE
+# ==========================================
+class QuoteService:
+    """HTTP front end over quote_spec, layout_spec and mockup_spec."""
+
+    def __init__(self, cost_items, margin_type="Percentage (%)", margin_val=30.0, method="guillotine",
+                 workers=4, max_pending=1024, cors_origin="*", cache_size=4096, production=None):
+        if method not in LAYOUT_METHODS:
+            raise ValueError(f"Unknown layout method: {method}")
+        self.cost_items = [dict(item) for item in cost_items]
+        self.margin_type = margin_type
+        self.margin_val = margin_val
+        self.method = method
+        self.production = production
+        self.workers = workers
+        self.max_pending = max_pending
+        self.cors_origin = cors_origin
+        # Encoded response bodies by request key
+        self.responses = LRUCache(maxsize=cache_size)
+        metrics.watch_cache("http_responses", self.responses)
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="paperbag-serve")
+        self._slots = None  # created on the serving loop
+        self._inflight = {}  # request key -> task computing it
+        self._pending = 0
+        self._routes = {
+            "/quote": self._quote,
+            "/layout": self._layout,
+            "/mockup": self._mockup,
+        }
+
+    # Routes: parse parameters into (cache key, function, args)
+
+    def _quote(self, params):
+        spec = parse_spec(params)
+        constraints = parse_constraints(params, spec)
+        key = ("quote",) + tuple(spec.values()) + constraints.key()
+        return key, quote_spec, (spec, constraints, self.cost_items, self.margin_type, self.margin_val,
+                                 self.method, self.production)
+
+    def _layout(self, params):
+        spec = parse_spec(params, with_qty=False)
+        constraints = parse_constraints(params, spec)
+        key = ("layout",) + tuple(spec.values()) + constraints.key()
+        return key, layout_spec, (spec, constraints, self.method)
+
+    def _mockup(self, params):
+        dims = tuple(_number(params, name) for name in ("P", "L", "T"))
+        if min(dims) <= 0:
+            raise RequestError("'P', 'L' and 'T' must be positive")
+        lod = params.get("lod") or DEFAULT_LOD
+        if lod not in LOD_LEVELS:
+            raise RequestError(f"'lod' must be one of {', '.join(LOD_LEVELS)}")
+        return ("mockup",) + dims + (lod,), mockup_spec, dims + (lod,)
+
+    def _encode(self, name, func, args):
+        with metrics.stage(f"serve_{name}"):
+            body = json.dumps(func(*args), separators=(",", ":")).encode()
+        if metrics.enabled:
+            metrics.observe_bytes(f"serve_{name}", len(body))
+        return body
+
+    async def _run(self, key, func, args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        self._pending += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                body = await loop.run_in_executor(self._executor, self._encode, key[0], func, args)
+        finally:
+            self._pending -= 1
+        self.responses.put(key, body)
+        return body
+
+    async def compute(self, key, func, args):
+        """Encoded JSON result for a request, shared by identical requests in flight."""
+        body = self.responses.get(key)
+        if body is not None:
+            return body
+        task = self._inflight.get(key)
+        if task is None:
+            if self._pending >= self.max_pending:
+                return None
+            task = asyncio.ensure_future(self._run(key, func, args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            metrics.count("serve_coalesced")
+        # A client hanging up must not cancel the work others are waiting on
+        return await asyncio.shield(task)
+
+    async def dispatch(self, method, target, body):
+        """(status, body bytes, content type) for one request."""
+        url = urlsplit(target)
+        if method == "OPTIONS":
+            return HTTPStatus.NO_CONTENT, b"", None
+        if method not in ("GET", "POST"):
+            return _error(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported")
+        if url.path == "/health":
+            return HTTPStatus.OK, b'{"status":"ok"}', "application/json"
+        if url.path == "/metrics":
+            return HTTPStatus.OK, metrics.to_prometheus().encode(), "text/plain; version=0.0.4"
+        route = self._routes.get(url.path)
+        if route is None:
+            return _error(HTTPStatus.NOT_FOUND, f"No such endpoint: {url.path}")
+
+        params = dict(parse_qsl(url.query))
+        try:
+            if body:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise RequestError("Body is not valid JSON") from None
+                if not isinstance(data, dict):
+                    raise RequestError("Body must be a JSON object")
+                params.update(data)
+            key, func, args = route(params)
+            payload = await self.compute(key, func, args)
+        except RequestError as e:
+            return _error(HTTPStatus.BAD_REQUEST, str(e))
+        except Exception:
+            log.exception("Failed to serve %s", target)
+            return _error(HTTPStatus.INTERNAL_SERVER_ERROR, "Internal error")
+        if payload is None:
+            return _error(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, try again")
+        return HTTPStatus.OK, payload, "application/json"
+
+    def _response(self, status, body, content_type, keep_alive):
+        headers = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if content_type:
+            headers.append(f"Content-Type: {content_type}")
+        if self.cors_origin:
+            headers += [
+                f"Access-Control-Allow-Origin: {self.cors_origin}",
+                "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+                "Access-Control-Allow-Headers: Content-Type",
+            ]
+        return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes."""
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError("negative Content-Length")
+                except ValueError:
+                    writer.write(self._response(*_error(HTTPStatus.BAD_REQUEST, "Malformed request"), False))
+                    break
+                if length > MAX_BODY:
+                    writer.write(self._response(*_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large"), False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                metrics.count("serve_requests")
+                status, payload, content_type = await self.dispatch(method.upper(), target, body)
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                writer.write(self._response(status, payload, content_type, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Listening asyncio.Server (port 0 picks a free one)."""
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def _error(status, message):
+    return status, json.dumps({"error": message}).encode(), "application/json"
+
+
+async def _serve(service, host, port):
+    server = await service.start(host, port)
+    for sock in server.sockets:
+        log.warning("Quoting service on http://%s:%d", *sock.getsockname()[:2])
+    async with server:
+        await server.serve_forever()
+
+
+def serve(cost_items, host=DEFAULT_HOST, port=DEFAULT_PORT, **options):
+    """Run the quoting service until interrupted."""
+    service = QuoteService(cost_items, **options)
+    try:
+        asyncio.run(_serve(service, host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
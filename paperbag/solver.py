@@ -0,0 +1,84 @@
+"""Inverse pricing: which bags fit a target unit price.
+
+Every (P, L, T, qty) on a grid is priced in one quote_batch pass and the
+Pareto frontier of bag volume against unit price is extracted. Pieces per
+plano is a step function of T, so when no cost item depends on pattern area
+only the largest T of each plateau can be on the frontier (same sheets and
+cost, more volume); everything else is pruned before sorting.
+"""
+import numpy as np
+
+from paperbag.costs import DRIVER_AREA_QTY, MARGIN_PERCENT, compile_cost_items
+from paperbag.layout import count_pieces
+from paperbag.pattern import pattern_size, unit_size
+from paperbag.pricebreak import price_curve
+from paperbag.quote import quote_batch, spec_columns
+
+
+def _grid(lo, hi, step):
+    return np.round(np.arange(lo, hi + step / 2, step), 6)
+
+
+def pareto_front(volume, unit_price):
+    """Indices of points not beaten on both volume (max) and unit price (min)."""
+    order = np.lexsort((-volume, unit_price))
+    best = np.maximum.accumulate(volume[order])
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = volume[order][1:] > best[:-1]
+    return order[keep]
+
+
+def bag_frontier(cost_items, P_range, L_range, T_range, qtys, step=0.5,
+                 margin_type=MARGIN_PERCENT, margin_val=30.0, constraints=None, production=None, **spec):
+    """Pareto frontier of bag volume vs unit price over a (P, L, T, qty) grid.
+
+    Ranges are (min, max) in cm; ``spec`` passes plano size, lem, top_lip and
+    margins through to quote_batch, ``constraints`` the layout rules and
+    ``production`` the production plan. Pieces per plano use the closed-form
+    grid layout, so prices are an upper bound on what the guillotine
+    optimizer achieves. Returns a dict of columns sorted by unit price.
+    """
+    P, L, T, Q = np.meshgrid(
+        _grid(*P_range, step), _grid(*L_range, step), _grid(*T_range, step),
+        np.asarray(qtys, dtype=float), indexing='ij'
+    )
+    specs = {'P': P.ravel(), 'L': L.ravel(), 'T': T.ravel(), 'qty': Q.ravel()}
+    specs.update({k: np.full(P.size, float(v)) for k, v in spec.items()})
+    specs = spec_columns(specs)
+
+    # Prune: without area-priced items, only the last T of each pcs plateau can win
+    if compile_cost_items(cost_items).coef[DRIVER_AREA_QTY] == 0:
+        pw, ph = pattern_size(specs['P'], specs['L'], specs['T'], specs['lem'], specs['top_lip'])
+        margins = (specs['m_top'], specs['m_bottom'], specs['m_left'], specs['m_right'])
+        uw, uh = constraints.piece_size(pw, ph, *margins) if constraints else unit_size(pw, ph, *margins)
+        pcs, _ = count_pieces(specs['plano_w'], specs['plano_h'], uw, uh, constraints)
+        pcs = pcs.reshape(P.shape)
+        last = np.ones(P.shape, dtype=bool)
+        last[:, :, :-1, :] = pcs[:, :, :-1, :] != pcs[:, :, 1:, :]
+        last &= pcs > 0
+        specs = {k: v[last.ravel()] for k, v in specs.items()}
+
+    result = quote_batch(specs, cost_items, margin_type, margin_val, constraints=constraints, production=production)
+    valid = result['valid']
+    volume = specs['P'] * specs['L'] * specs['T']
+    idx = np.nonzero(valid)[0]
+    front = idx[pareto_front(volume[idx], result['unit_price'][idx])]
+
+    return {
+        'P': specs['P'][front],
+        'L': specs['L'][front],
+        'T': specs['T'][front],
+        'qty': specs['qty'][front].astype(np.int64),
+        'volume_cm3': volume[front],
+        'pcs_per_plano': result['pcs_per_plano'][front],
+        'unit_price': result['unit_price'][front],
+    }
+
+
+def min_qty_for_price(target_unit_price, pcs_per_plano, area_cm2_per_pcs, cost_items,
+                      margin_type=MARGIN_PERCENT, margin_val=30.0, q_max=200000, production=None):
+    """Smallest quantity (<= q_max) whose unit price is at or below the target, or None."""
+    curve = price_curve(np.arange(1, q_max + 1), pcs_per_plano, area_cm2_per_pcs,
+                        cost_items, margin_type, margin_val, production)
+    hits = np.nonzero(curve['unit_price'] <= target_unit_price)[0]
+    return int(curve['qty'][hits[0]]) if len(hits) else None
@@ -0,0 +1,229 @@
+"""Persistent result store (SQLite) shared by sessions and restarts.
+
+Holds computed layouts (as the backing tier of ``layout_cache``), named
+cost catalogs and past quotes indexed by spec hash. The layouts table is
+capped at ``max_layouts`` rows, least recently used out first. One
+connection per process, guarded by a lock; WAL mode lets several server
+processes share the same file.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from paperbag.cache import layout_cache
+from paperbag.layout import BlockLayout, PlanoLayout
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "PAPERBAG_STORE", os.path.join(os.path.expanduser("~"), ".paperbag", "store.sqlite3")
+)
+DEFAULT_MAX_LAYOUTS = int(os.environ.get("PAPERBAG_STORE_MAX_LAYOUTS", 20000))
+
+# Layouts written between two prunes of the table
+PRUNE_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS layouts (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS layouts_used ON layouts (used);
+CREATE TABLE IF NOT EXISTS catalogs (
+    name TEXT PRIMARY KEY,
+    items TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    spec_hash TEXT NOT NULL,
+    created REAL NOT NULL,
+    spec TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quotes_spec_hash ON quotes (spec_hash);
+CREATE INDEX IF NOT EXISTS quotes_created ON quotes (created);
+"""
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=float)
+
+
+def spec_hash(spec, cost_items=(), margin_type=None, margin_val=None):
+    """Stable hex digest of everything that determines a quote."""
+    payload = {"spec": spec, "costs": list(cost_items), "margin": [margin_type, margin_val]}
+    return hashlib.sha1(_canonical(payload).encode()).hexdigest()
+
+
+def encode_layout(layout):
+    """JSON-able form of a layout; grid layouts are rebuilt from their size alone."""
+    data = {
+        "canvas": [layout.canvas_w, layout.canvas_h],
+        "item": [layout.item_w, layout.item_h],
+    }
+    if isinstance(layout, PlanoLayout):
+        data["kind"] = "grid"
+    else:
+        data["kind"] = "blocks"
+        data["blocks"] = [[float(x), float(y), int(c), int(r), bool(rot)] for x, y, c, r, rot in layout.blocks]
+        if layout.gap:
+            data["gap"] = layout.gap
+    return data
+
+
+def decode_layout(data):
+    W, H = data["canvas"]
+    w, h = data["item"]
+    if data["kind"] == "grid":
+        return PlanoLayout(W, H, w, h)
+    return BlockLayout(W, H, w, h, [tuple(b) for b in data["blocks"]], data.get("gap", 0.0))
+
+
+def _encode_value(value):
+    # layout_cache holds either (layout, final_w, final_h) or a bare layout
+    if isinstance(value, tuple):
+        layout, final_w, final_h = value
+        return {"layout": encode_layout(layout), "final": [final_w, final_h]}
+    return {"layout": encode_layout(value)}
+
+
+def _decode_value(data):
+    layout = decode_layout(data["layout"])
+    if "final" in data:
+        return (layout,) + tuple(data["final"])
+    return layout
+
+
+class ResultStore:
+    """SQLite file holding layouts, cost catalogs and quotes.
+
+    ``max_layouts`` caps the layouts table (None for no cap); the least
+    recently used rows go first.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, max_layouts=DEFAULT_MAX_LAYOUTS):
+        self.path = path
+        self.max_layouts = max_layouts
+        self._puts = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        self.prune_layouts()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Layouts: the backing tier of an LRUCache (get/put by cache key)
+
+    def get(self, key, default=None):
+        key = _canonical(key)
+        with self._lock:
+            rows = self._conn.execute("SELECT value FROM layouts WHERE key = ?", (key,)).fetchall()
+            if rows:
+                self._conn.execute("UPDATE layouts SET used = ? WHERE key = ?", (time.time(), key))
+        return _decode_value(json.loads(rows[0][0])) if rows else default
+
+    def put(self, key, value):
+        self._query(
+            "INSERT OR REPLACE INTO layouts (key, value, used) VALUES (?, ?, ?)",
+            (_canonical(key), _canonical(_encode_value(value)), time.time())
+        )
+        self._puts += 1
+        if self._puts % PRUNE_EVERY == 0:
+            self.prune_layouts()
+
+    def prune_layouts(self, max_rows=None):
+        """Drop the least recently used layouts beyond ``max_rows`` (default max_layouts).
+
+        Returns the number of rows removed.
+        """
+        limit = self.max_layouts if max_rows is None else max_rows
+        if limit is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM layouts WHERE key IN "
+                "(SELECT key FROM layouts ORDER BY used DESC LIMIT -1 OFFSET ?)", (limit,)
+            )
+            return cursor.rowcount
+
+    def recent_layouts(self, limit):
+        """(key, value) pairs for the most recently used layouts."""
+        rows = self._query("SELECT key, value FROM layouts ORDER BY used DESC LIMIT ?", (limit,))
+        return [(tuple(json.loads(k)), _decode_value(json.loads(v))) for k, v in rows]
+
+    # Cost catalogs
+
+    def load_catalog(self, name, default=None):
+        rows = self._query("SELECT items FROM catalogs WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def save_catalog(self, name, items):
+        self._query(
+            "INSERT OR REPLACE INTO catalogs (name, items, updated) VALUES (?, ?, ?)",
+            (name, _canonical(list(items)), time.time())
+        )
+
+    # Quotes
+
+    def save_quote(self, spec, result, cost_items=(), margin_type=None, margin_val=None):
+        """Record a quote; returns its spec hash."""
+        digest = spec_hash(spec, cost_items, margin_type, margin_val)
+        payload = {"spec": spec, "costs": list(cost_items), "margin": [margin_type, margin_val]}
+        self._query(
+            "INSERT INTO quotes (spec_hash, created, spec, result) VALUES (?, ?, ?, ?)",
+            (digest, time.time(), _canonical(payload), _canonical(result))
+        )
+        return digest
+
+    def find_quote(self, digest):
+        """Latest quote with this spec hash as a dict, or None."""
+        rows = self._query(
+            "SELECT created, spec, result FROM quotes WHERE spec_hash = ? ORDER BY created DESC LIMIT 1",
+            (digest,)
+        )
+        return self._quote(digest, *rows[0]) if rows else None
+
+    def recent_quotes(self, limit=50):
+        rows = self._query(
+            "SELECT spec_hash, created, spec, result FROM quotes ORDER BY created DESC LIMIT ?", (limit,)
+        )
+        return [self._quote(*row) for row in rows]
+
+    @staticmethod
+    def _quote(digest, created, spec, result):
+        return {"spec_hash": digest, "created": created, **json.loads(spec), "result": json.loads(result)}
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store(path=None, warm=512):
+    """Process-wide store, opened once and attached behind ``layout_cache``.
+
+    The most recently stored ``warm`` layouts are loaded into memory so a
+    restarted server starts with a hot cache; older ones are read on demand.
+    """
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            store = ResultStore(path or DEFAULT_STORE_PATH)
+            for key, value in reversed(store.recent_layouts(warm)):
+                layout_cache.put(key, value)
+            layout_cache.backing = store
+            _default_store = store
+        return _default_store
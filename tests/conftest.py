@@ -0,0 +1,30 @@
+import os
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def inline_search(monkeypatch):
+    """Run pool searches in the test process; their futures come back finished."""
+    from paperbag import jobs
+
+    def submit(fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    monkeypatch.setattr(jobs, "submit_search", submit)
+
+
+@pytest.fixture
+def empty_layout_cache():
+    from paperbag.cache import layout_cache
+
+    layout_cache.clear()
+    yield layout_cache
+    layout_cache.clear()
@@ -0,0 +1,104 @@
+import io
+import os
+
+import pytest
+
+from paperbag.bulk import BulkQuote, detect_upload_format, read_upload
+
+COST_ITEMS = [
+    {"name": "Ivory Paper 250gsm", "basis": "Per Plano Sheet", "price": 5000, "batch": 1},
+    {"name": "Rope & Assembly", "basis": "Per Pcs Bag", "price": 700, "batch": 1},
+]
+
+
+def upload(text, name="rfq.csv"):
+    return read_upload(io.BytesIO(text.encode("utf-8")), name)
+
+
+def spec_csv(n, bad=()):
+    lines = ["sku,P,L,T,qty"]
+    for i in range(n):
+        lines.append(f"S{i},{15 + i % 5},8,20,{'abc' if i in bad else 1000}")
+    return "\n".join(lines) + "\n"
+
+
+def test_detect_upload_format():
+    assert detect_upload_format("RFQ.XLSX") == "xlsx"
+    assert detect_upload_format("specs.ndjson") == "jsonl"
+    assert detect_upload_format("specs.txt") == "csv"
+    with pytest.raises(ValueError):
+        detect_upload_format("specs.pdf")
+
+
+def test_read_upload_csv_with_bom_and_jsonl():
+    rows = list(upload("\ufeffP,L,T,qty\n15,8,20,1000\n"))
+    assert rows == [{"P": "15", "L": "8", "T": "20", "qty": "1000"}]
+    rows = list(upload('{"P": 15, "L": 8, "T": 20, "qty": 1000}\n\n', "rfq.jsonl"))
+    assert rows == [{"P": 15, "L": 8, "T": 20, "qty": 1000}]
+
+
+def test_read_upload_leaves_file_open():
+    fileobj = io.BytesIO(b"P,L,T,qty\n15,8,20,1000\n")
+    list(read_upload(fileobj, "rfq.csv"))
+    assert not fileobj.closed
+
+
+def test_run_counts_rows_per_chunk_and_rejects_bad_rows():
+    bulk = BulkQuote(page_size=10)
+    progress = list(bulk.run(upload(spec_csv(25, bad={3, 17})), COST_ITEMS, "Percentage (%)", 30, chunk_size=10))
+    assert progress == [10, 20, 25]
+    assert bulk.done
+    assert (bulk.count, bulk.valid, bulk.rejected) == (25, 23, 2)
+    assert bulk.pages == 3
+    bulk.close()
+
+
+def test_pages_read_back_typed_rows():
+    bulk = BulkQuote(page_size=10)
+    list(bulk.run(upload(spec_csv(25, bad={3})), COST_ITEMS, "Percentage (%)", 30))
+    first, last = bulk.page(0), bulk.page(2)
+    assert [r["sku"] for r in first] == [f"S{i}" for i in range(10)]
+    assert [r["sku"] for r in last] == ["S20", "S21", "S22", "S23", "S24"]
+    assert bulk.page(3) == [] and bulk.page(-1) == []
+
+    good, bad = first[0], first[3]
+    assert good["valid"] is True and good["error"] is None
+    assert isinstance(good["pcs_per_plano"], int) and isinstance(good["unit_price"], float)
+    assert bad["valid"] is False and "qty" in bad["error"]
+    assert bad["pcs_per_plano"] is None and bad["total_plano_req"] is None and bad["unit_price"] is None
+    bulk.close()
+
+
+def test_defaults_fill_blank_cells():
+    text = "P,L,T,qty,plano_w\n15,8,20,1000,\n15,8,20,1000,72\n"
+    bulk = BulkQuote()
+    list(bulk.run(upload(text), COST_ITEMS, "Percentage (%)", 30, defaults={"plano_w": 109.0}))
+    wide, narrow = bulk.page(0)
+    assert wide["pcs_per_plano"] > narrow["pcs_per_plano"]
+    bulk.close()
+
+
+def test_open_and_close_spool_file():
+    bulk = BulkQuote()
+    list(bulk.run(upload(spec_csv(3)), COST_ITEMS, "Percentage (%)", 30))
+    with bulk.open() as f:
+        lines = f.read().decode("utf-8").splitlines()
+    assert lines[0].startswith("sku,P,L,T,qty,") and lines[0].endswith(",error")
+    assert len(lines) == 4
+    path = bulk.path
+    bulk.close()
+    assert not os.path.exists(path)
+
+
+def test_excel_upload():
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["P", "L", "T", "qty", None])
+    sheet.append([15, 8, 20, 1000, "ignored"])
+    sheet.append([None, None, None, None, None])
+    sheet.append([20, 10, None, 500, None])
+    data = io.BytesIO()
+    workbook.save(data)
+    rows = list(read_upload(data, "rfq.xlsx"))
+    assert rows == [{"P": 15, "L": 8, "T": 20, "qty": 1000}, {"P": 20, "L": 10, "T": "", "qty": 500}]
@@ -0,0 +1,35 @@
+import pytest
+
+from paperbag import cache, layout
+from paperbag.cache import LRUCache, cached_optimize_plano, layout_cache
+
+
+pytestmark = pytest.mark.usefixtures("empty_layout_cache")
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+
+
+def test_timed_out_search_is_not_cached(monkeypatch):
+    monkeypatch.setattr(layout, "guillotine_blocks", lambda *args, **kwargs: None)
+    grid, _, _ = cached_optimize_plano(109, 79, 23.0, 17.0)
+    assert len(layout_cache) == 0
+
+    monkeypatch.undo()
+    nested, _, _ = cached_optimize_plano(109, 79, 23.0, 17.0)
+    assert len(layout_cache) == 1
+    assert len(nested) >= len(grid)
+    assert cached_optimize_plano(109, 79, 23.0, 17.0)[0] is nested
+
+
+def test_cache_key_ignores_float_noise():
+    first = cached_optimize_plano(109, 79, 43 / 2.54 * 2.54, 17.0, "grid")
+    assert cached_optimize_plano(109, 79, 43.0, 17.0, "grid") is first
+    assert cache.layout_key(109, 79, 43 / 2.54 * 2.54, 17.0) == (109.0, 79.0, 43.0, 17.0)
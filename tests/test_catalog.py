@@ -0,0 +1,45 @@
+import math
+
+import pytest
+
+from paperbag.catalog import DEFAULT_PLANO_CATALOG, rank_planos
+from paperbag.layout import optimize_plano
+
+pytestmark = pytest.mark.usefixtures("inline_search", "empty_layout_cache")
+
+PAPER = {"name": "Paper Ivory 250gsm", "basis": "Per Plano Sheet", "price": 99999, "batch": 1}
+OTHER_ITEMS = [
+    {"name": "Offset Printing", "basis": "Per Batch (Multiple Pcs)", "price": 450000, "batch": 2000},
+    {"name": "Rope & Assembly", "basis": "Per Pcs Bag", "price": 700, "batch": 1},
+]
+UNIT = (50.0, 28.0)
+AREA = 1081.25
+
+
+def test_ranked_cheapest_first_with_catalog_paper_price():
+    qty = 3000
+    ranked = rank_planos(DEFAULT_PLANO_CATALOG, *UNIT, qty, [PAPER] + OTHER_ITEMS, AREA)
+    assert [r["production_cost"] for r in ranked] == sorted(r["production_cost"] for r in ranked)
+    for r in ranked:
+        layout, _, _ = optimize_plano(r["plano_w"], r["plano_h"], *UNIT, time_budget=5.0)
+        sheets = math.ceil(qty / len(layout))
+        expected = r["price"] * sheets + 450000 * math.ceil(qty / 2000) + 700 * qty
+        assert r["pcs_per_plano"] == len(layout)
+        assert r["total_plano_req"] == sheets
+        assert r["production_cost"] == pytest.approx(expected)
+
+
+def test_paper_item_is_replaced_not_added():
+    with_paper = rank_planos(DEFAULT_PLANO_CATALOG, *UNIT, 1000, [PAPER] + OTHER_ITEMS, AREA)
+    without = rank_planos(DEFAULT_PLANO_CATALOG, *UNIT, 1000, OTHER_ITEMS, AREA)
+    assert with_paper == without
+
+
+def test_sheets_too_small_are_left_out():
+    catalog = [
+        {"name": "small", "w": 40.0, "h": 30.0, "price": 1000.0},
+        {"name": "big", "w": 109.0, "h": 79.0, "price": 5000.0},
+    ]
+    ranked = rank_planos(catalog, *UNIT, 1000, OTHER_ITEMS, AREA)
+    assert [r["name"] for r in ranked] == ["big"]
+    assert rank_planos(catalog[:1], *UNIT, 1000, OTHER_ITEMS, AREA) == []
@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+
+from paperbag.cli import _columns, _parse_row, main, quote_chunks
+from paperbag.quote import SPEC_DEFAULTS, quote_batch
+
+COST_ITEMS = [
+    {"name": "Ivory Paper 250gsm", "basis": "Per Plano Sheet", "price": 5000, "batch": 1},
+    {"name": "Rope & Assembly", "basis": "Per Pcs Bag", "price": 700, "batch": 1},
+]
+
+
+def row(**cells):
+    base = {"P": "15", "L": "8", "T": "20", "qty": "1000"}
+    base.update(cells)
+    return base
+
+
+def test_blank_cells_take_the_column_default():
+    spec, error = _parse_row(row(plano_w="", lem="  ", m_top=None), SPEC_DEFAULTS)
+    assert error is None
+    assert spec["plano_w"] == SPEC_DEFAULTS["plano_w"]
+    assert spec["lem"] == SPEC_DEFAULTS["lem"]
+    assert spec["m_top"] == SPEC_DEFAULTS["m_top"]
+    assert spec["P"] == 15.0
+
+
+def test_blank_required_cell_is_an_error():
+    assert _parse_row(row(L=""), SPEC_DEFAULTS) == (None, "L is required")
+    assert _parse_row({"P": "15", "L": "8", "T": "20"}, SPEC_DEFAULTS) == (None, "qty is required")
+
+
+def test_bad_cells_are_errors():
+    assert _parse_row(row(T="abc"), SPEC_DEFAULTS) == (None, "T is not a number: 'abc'")
+    assert _parse_row(row(qty="0"), SPEC_DEFAULTS) == (None, "qty is out of range: '0'")
+    assert _parse_row(row(m_left="-1"), SPEC_DEFAULTS) == (None, "m_left is out of range: '-1'")
+    assert _parse_row(row(plano_h="nan"), SPEC_DEFAULTS) == (None, "plano_h is out of range: 'nan'")
+
+
+def test_columns_skip_bad_rows_per_row():
+    chunk = [row(), row(P=""), row(plano_w=""), row(qty="x")]
+    specs, good, errors = _columns(chunk, SPEC_DEFAULTS)
+    assert good == [0, 2]
+    assert errors == [None, "P is required", None, "qty is not a number: 'x'"]
+    assert specs["plano_w"] == [float(SPEC_DEFAULTS["plano_w"])] * 2
+    assert all(len(column) == 2 for column in specs.values())
+
+
+def test_columns_use_caller_defaults():
+    defaults = dict(SPEC_DEFAULTS, plano_w=100.0, qty=500)
+    specs, good, errors = _columns([row(plano_w="", qty="")], defaults)
+    assert good == [0] and errors == [None]
+    assert specs["plano_w"] == [100.0]
+    assert specs["qty"] == [500.0]
+
+
+def test_quote_chunks_reject_bad_rows_only():
+    rows = [row(), row(P=""), row(P="500", L="500")]
+    (quoted,) = quote_chunks(rows, COST_ITEMS, "Percentage (%)", 30, "grid", 100)
+    quotes = [quote for _, quote in quoted]
+    assert quotes[0]["valid"] and quotes[0]["error"] is None
+    assert quotes[0]["pcs_per_plano"] > 0
+    assert quotes[1]["valid"] is False
+    assert quotes[1]["error"] == "P is required"
+    assert quotes[1]["pcs_per_plano"] is None
+    assert quotes[2]["valid"] is False
+    assert quotes[2]["error"] == "pattern does not fit the plano"
+
+
+def test_quote_command_end_to_end(tmp_path):
+    specs = tmp_path / "specs.csv"
+    specs.write_text("sku,P,L,T,qty\nA,15,8,20,1000\nB,,8,20,1000\nC,20,10,25,5000\n", encoding="utf-8")
+    costs = tmp_path / "costs.json"
+    costs.write_text(json.dumps(COST_ITEMS), encoding="utf-8")
+    out = tmp_path / "quotes.jsonl"
+
+    assert main(["quote", str(specs), "--costs", str(costs), "-o", str(out)]) == 0
+    quotes = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [q["sku"] for q in quotes] == ["A", "B", "C"]
+    assert [q["valid"] for q in quotes] == [True, False, True]
+    assert quotes[1]["error"] == "P is required"
+
+    expected = quote_batch({"P": [15, 20], "L": [8, 10], "T": [20, 25], "qty": [1000, 5000]},
+                           COST_ITEMS, "Percentage (%)", 30.0, "grid")
+    assert [quotes[0]["unit_price"], quotes[2]["unit_price"]] == expected["unit_price"].tolist()
+
+
+def test_cli_does_not_import_streamlit():
+    code = "import sys; from paperbag import cli; cli.build_parser(); print('streamlit' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,110 @@
+import math
+
+import numpy as np
+import pytest
+
+from paperbag.costs import Basis, calculate_costs, calculate_profit, compile_cost_items, is_paper, without_paper
+
+ID_ITEMS = [
+    {"nama": "Kertas Ivory 250gr", "basis": "Per Lembar Plano", "harga": 5000, "batch": 1},
+    {"nama": "Ongkos Cetak Offset", "basis": "Per Batch (Kelipatan Pcs)", "harga": 450000, "batch": 2000},
+    {"nama": "Tali Kur & Pasang", "basis": "Per Pcs Tas", "harga": 700, "batch": 1},
+    {"nama": "Pisau Pond", "basis": "Per Pesanan (Tetap)", "harga": 350000, "batch": 1},
+    {"nama": "Laminasi", "basis": "Per Area (cm2)", "harga": 0.35, "batch": 1},
+]
+
+EN_ITEMS = [
+    {"name": "Paper Ivory 250gsm", "basis": "Per Plano Sheet", "price": 5000, "batch": 1},
+    {"name": "Offset Printing", "basis": "Per Batch (Multiple Pcs)", "price": 450000, "batch": 2000},
+    {"name": "Rope & Assembly", "basis": "Per Pcs Bag", "price": 700, "batch": 1},
+    {"name": "Die Cut Knife", "basis": "Fixed per Order", "price": 350000, "batch": 1},
+    {"name": "Lamination", "basis": "Per Area (cm2)", "price": 0.35, "batch": 1},
+]
+
+
+def baseline_costs(cost_items, qty, total_plano_req, area_cm2_per_pcs, subtotal_label):
+    """The original app's cost loop, for either language."""
+    fixed = ("Per Pesanan (Tetap)", "Fixed per Order")
+    plano = ("Per Lembar Plano", "Per Plano Sheet")
+    pcs = ("Per Pcs Tas", "Per Pcs Bag")
+    batch = ("Per Batch (Kelipatan Pcs)", "Per Batch (Multiple Pcs)")
+
+    total_production_cost = 0
+    breakdown = []
+    for item in cost_items:
+        price = item['harga'] if 'harga' in item else item['price']
+        subtotal = 0
+        if item['basis'] in fixed:
+            subtotal = price
+        elif item['basis'] in plano:
+            subtotal = price * total_plano_req
+        elif item['basis'] in pcs:
+            subtotal = price * qty
+        elif item['basis'] == "Per Area (cm2)":
+            subtotal = price * area_cm2_per_pcs * qty
+        elif item['basis'] in batch:
+            subtotal = price * math.ceil(qty / item['batch'])
+
+        total_production_cost += subtotal
+        breakdown.append({
+            "Item": item['nama'] if 'nama' in item else item['name'],
+            "Basis": item['basis'],
+            subtotal_label: f"{subtotal:,.0f}"
+        })
+    return total_production_cost, breakdown
+
+
+@pytest.mark.parametrize("items, label", [(ID_ITEMS, "Subtotal (Rp)"), (EN_ITEMS, "Subtotal ($)")])
+@pytest.mark.parametrize("qty", [1, 999, 1000, 2000, 2001, 12345])
+@pytest.mark.parametrize("pcs_per_plano", [1, 4, 7])
+def test_calculate_costs_matches_baseline(items, label, qty, pcs_per_plano):
+    sheets = math.ceil(qty / pcs_per_plano)
+    area = 1081.25
+    total, breakdown = calculate_costs(items, qty, sheets, area, subtotal_label=label)
+    expected_total, expected_breakdown = baseline_costs(items, qty, sheets, area, label)
+    assert total == pytest.approx(expected_total, rel=1e-12)
+    assert breakdown == expected_breakdown
+
+
+def test_calculate_costs_without_items():
+    assert calculate_costs([], 1000, 250, 1081.25) == (0, [])
+
+
+def test_vectorized_totals_match_scalar_calls():
+    qty = np.array([1, 999, 2000, 2001, 12345])
+    sheets = np.ceil(qty / 4)
+    totals = compile_cost_items(ID_ITEMS).total(qty, sheets, 1081.25)
+    scalar = [calculate_costs(ID_ITEMS, int(q), int(s), 1081.25)[0] for q, s in zip(qty, sheets)]
+    assert totals == pytest.approx(scalar, rel=1e-12)
+    subtotals = compile_cost_items(ID_ITEMS).subtotals(qty, sheets, 1081.25)
+    assert subtotals.shape == (len(qty), len(ID_ITEMS))
+    assert subtotals.sum(axis=1) == pytest.approx(totals)
+
+
+def test_unknown_basis_and_zero_batch_cost_nothing():
+    items = [
+        {"name": "Mystery", "basis": "Per Something", "price": 100, "batch": 1},
+        {"name": "Broken batch", "basis": "Per Batch (Multiple Pcs)", "price": 100, "batch": 0},
+    ]
+    assert calculate_costs(items, 1000, 250, 1081.25)[0] == 0
+    assert Basis.parse("Per Something") is None
+    assert Basis.parse("Per Lembar Plano") is Basis.PLANO
+
+
+@pytest.mark.parametrize("margin_type, expected", [
+    ("Percentage (%)", 300.0), ("Persentase (%)", 300.0),
+    ("Fixed Total", 30.0), ("Fix Total (Rp)", 30.0),
+    ("Fixed per Pcs", 300.0), ("Fix per Pcs (Rp)", 300.0),
+])
+def test_calculate_profit(margin_type, expected):
+    assert calculate_profit(1000.0, 10, margin_type, 30) == pytest.approx(expected)
+    profits = calculate_profit(np.array([1000.0, 1000.0]), np.array([10, 10]), margin_type, 30)
+    assert profits.tolist() == pytest.approx([expected, expected])
+
+
+def test_paper_items():
+    assert is_paper(ID_ITEMS[0]) and is_paper(EN_ITEMS[0])
+    assert not is_paper({"name": "Paper handles", "basis": "Per Pcs Bag", "price": 1, "batch": 1})
+    assert not is_paper(dict(EN_ITEMS[0], paper=False))
+    assert is_paper({"name": "Board", "basis": "Per Plano Sheet", "price": 1, "batch": 1, "paper": True})
+    assert without_paper(EN_ITEMS) == EN_ITEMS[1:]
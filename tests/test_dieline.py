@@ -0,0 +1,89 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from paperbag.dieline import (
+    LAYERS, export_geometry, geometry_bounds, pattern_geometry, tile_geometry, to_dxf, to_pdf, to_svg,
+)
+from paperbag.layout import BlockLayout
+from paperbag.pattern import pattern_size
+
+BAG = (15.0, 8.0, 20.0, 2.0, 2.0)
+M_TOP, M_BOTTOM, M_LEFT, M_RIGHT = 3.0, 1.0, 1.5, 0.5
+
+
+def bbox(segments):
+    xs, ys = segments[:, [0, 2]], segments[:, [1, 3]]
+    return xs.min(), ys.min(), xs.max(), ys.max()
+
+
+def test_pattern_geometry_spans_the_pattern():
+    pola_w, pola_h = pattern_size(*BAG)
+    geom = pattern_geometry(*BAG)
+    assert geometry_bounds(geom) == pytest.approx((pola_w, pola_h))
+    assert bbox(geom["cut"]) == pytest.approx((0, 0, pola_w, pola_h))
+    assert len(geom["hole"]) == 8
+
+
+def test_tiled_pattern_sits_inside_its_margins():
+    pola_w, pola_h = pattern_size(*BAG)
+    unit_w, unit_h = pola_w + M_LEFT + M_RIGHT, pola_h + M_TOP + M_BOTTOM
+    layout = BlockLayout(200, 150, unit_w, unit_h, [(0, 0, 1, 1, False), (unit_w, 0, 1, 1, True)])
+    geom = tile_geometry(pattern_geometry(*BAG), layout, 200, 150, pola_w, pola_h, M_LEFT, M_BOTTOM, M_TOP)
+
+    n_cut = len(pattern_geometry(*BAG)["cut"])
+    upright, turned = geom["cut"][:n_cut], geom["cut"][n_cut:]
+    assert bbox(upright) == pytest.approx((M_LEFT, M_BOTTOM, M_LEFT + pola_w, M_BOTTOM + pola_h))
+    # Turned counter-clockwise: the top margin is on the left, the left margin below
+    x0 = unit_w + M_TOP
+    assert bbox(turned) == pytest.approx((x0, M_LEFT, x0 + pola_h, M_LEFT + pola_w))
+    assert bbox(geom["plano"]) == (0, 0, 200, 150)
+    assert len(geom["hole"]) == 16
+
+
+def test_svg_is_well_formed():
+    geom = pattern_geometry(*BAG)
+    root = ET.fromstring(to_svg(geom))
+    groups = {g.get("id") for g in root.iter("{http://www.w3.org/2000/svg}g") if g.get("id")}
+    assert groups == {name for name in LAYERS if len(geom[name])}
+    assert len(list(root.iter("{http://www.w3.org/2000/svg}circle"))) == 8
+
+
+def test_dxf_is_plain_r12():
+    geom = pattern_geometry(*BAG)
+    lines = to_dxf(geom).decode("ascii").splitlines()
+    pairs = list(zip(lines[::2], lines[1::2]))
+    assert pairs[0] == ("0", "SECTION") and pairs[-1] == ("0", "EOF")
+    assert "$INSUNITS" not in lines and ("2", "HEADER") not in pairs
+    n_lines = sum(len(geom[name]) for name in LAYERS if name != "hole")
+    assert pairs.count(("0", "LINE")) == n_lines
+    assert pairs.count(("0", "CIRCLE")) == len(geom["hole"])
+    layers = [value for code, value in pairs if code == "2"]
+    assert set(name.upper() for name in LAYERS) <= set(layers)
+
+
+def test_pdf_page_is_the_pattern_at_full_scale():
+    geom = pattern_geometry(*BAG)
+    pdf = to_pdf(geom)
+    assert pdf.startswith(b"%PDF-") and pdf.rstrip().endswith(b"%%EOF")
+    width, height = geometry_bounds(geom)
+    pt = 72 / 2.54
+    box = f"/MediaBox [0 0 {(width + 2) * pt:.2f} {(height + 2) * pt:.2f}]".encode()
+    assert box in pdf
+
+
+def test_export_geometry():
+    geom = pattern_geometry(*BAG)
+    for fmt in ("svg", "dxf", "pdf"):
+        data, mime = export_geometry(geom, fmt)
+        assert data and "/" in mime
+    with pytest.raises(ValueError):
+        export_geometry(geom, "eps")
+
+
+def test_tile_geometry_of_an_empty_layout():
+    geom = tile_geometry(pattern_geometry(*BAG), BlockLayout(50, 50, 60.0, 60.0, []), 50, 50,
+                         *pattern_size(*BAG), M_LEFT, M_BOTTOM, M_TOP)
+    assert all(len(geom[name]) == 0 for name in LAYERS if name != "plano")
+    assert np.array_equal(geom["plano"][:, 2:], [[50, 0], [50, 50], [0, 50], [0, 0]])
@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+import pytest
+
+from paperbag.gang import allocate_gang_costs, plan_gang_run
+from paperbag.layout import LayoutConstraints, optimize_plano
+
+pytestmark = pytest.mark.usefixtures("empty_layout_cache")
+
+EPS = 1e-6
+
+SKUS = [
+    {"unit_w": 50.0, "unit_h": 28.0, "qty": 3000, "area_cm2_per_pcs": 1200.0},
+    {"unit_w": 30.0, "unit_h": 22.0, "qty": 1000, "area_cm2_per_pcs": 600.0},
+    {"unit_w": 24.0, "unit_h": 18.0, "qty": 500, "area_cm2_per_pcs": 400.0},
+]
+
+
+def assert_placed(plan, left=0.0, bottom=0.0, right=0.0, top=0.0, gap=0.0):
+    W, H = plan['final_plano_w'], plan['final_plano_h']
+    for run in plan['runs']:
+        pos = run['pattern'].positions
+        x0, y0 = pos['x'], pos['y']
+        x1, y1 = x0 + pos['w'], y0 + pos['h']
+        assert (x0 >= left - EPS).all() and (y0 >= bottom - EPS).all()
+        assert (x1 <= W - right + EPS).all() and (y1 <= H - top + EPS).all()
+        apart_x = (x1[:, None] + gap <= x0[None, :] + EPS) | (x1[None, :] + gap <= x0[:, None] + EPS)
+        apart_y = (y1[:, None] + gap <= y0[None, :] + EPS) | (y1[None, :] + gap <= y0[:, None] + EPS)
+        overlap = ~(apart_x | apart_y)
+        np.fill_diagonal(overlap, False)
+        assert not overlap.any()
+
+
+def assert_covers(plan, skus):
+    for run in plan['runs']:
+        for i in run['skus']:
+            assert run['per_sheet'][i] * run['sheets'] >= skus[i]['qty']
+    assert plan['total_plano_req'] == sum(run['sheets'] for run in plan['runs'])
+    assert sorted(i for run in plan['runs'] for i in run['skus']) == list(range(len(skus)))
+
+
+def test_gang_run_covers_every_quantity():
+    plan = plan_gang_run(SKUS, 109, 79)
+    assert_covers(plan, SKUS)
+    assert_placed(plan)
+    assert plan['total_plano_req'] <= plan['separate_plano_req']
+
+
+def test_separate_runs_match_single_layouts():
+    plan = plan_gang_run(SKUS, 109, 79)
+    separate = 0
+    for sku in SKUS:
+        layout, _, _ = optimize_plano(109, 79, sku['unit_w'], sku['unit_h'], time_budget=5.0)
+        separate += math.ceil(sku['qty'] / len(layout))
+    assert plan['separate_plano_req'] == separate
+
+
+def test_gang_run_with_grain_and_gripper():
+    rules = LayoutConstraints(grain="long", gripper=1.5)
+    plan = plan_gang_run(SKUS, 109, 79, rules)
+    assert_covers(plan, SKUS)
+    # Long grain runs up the page, so the long side is vertical and the gripper on the left
+    assert (plan['final_plano_w'], plan['final_plano_h']) == (79, 109)
+    assert_placed(plan, left=1.5)
+    for run in plan['runs']:
+        assert not run['pattern'].positions['rot'].any()
+
+
+def test_gang_run_with_shared_gutters():
+    rules = LayoutConstraints(gutter=0.3, margins=(1.0, 1.0, 1.5, 1.5))
+    skus = [dict(sku, unit_w=sku['unit_w'] - 3, unit_h=sku['unit_h'] - 2) for sku in SKUS]
+    plan = plan_gang_run(skus, 109, 79, rules)
+    assert_covers(plan, skus)
+    assert_placed(plan, left=1.5, bottom=1.0, right=1.5, top=1.0, gap=0.3)
+
+
+def test_sku_larger_than_plano():
+    with pytest.raises(ValueError):
+        plan_gang_run([{"unit_w": 120.0, "unit_h": 90.0, "qty": 10}], 109, 79)
+
+
+def test_gang_costs_share_out_every_sheet():
+    plan = plan_gang_run(SKUS, 109, 79)
+    items = [{"name": "Paper", "basis": "Per Plano Sheet", "price": 5000, "batch": 1}]
+    costs = allocate_gang_costs(plan, SKUS, items)
+    assert sum(c['sheets'] for c in costs) == pytest.approx(plan['total_plano_req'])
+    assert sum(c['production_cost'] for c in costs) == pytest.approx(5000 * plan['total_plano_req'])
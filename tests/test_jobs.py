@@ -0,0 +1,125 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from paperbag import jobs
+from paperbag.cache import layout_key
+from paperbag.layout import optimize_plano
+
+pytestmark = pytest.mark.usefixtures("empty_layout_cache")
+
+# Takes far longer than any test waits, unless stopped
+SLOW = (300, 200, 1.3, 1.7)
+
+
+@pytest.fixture
+def threaded_search(monkeypatch):
+    """Run pool searches on threads of this process, so they share its cancel flags."""
+    executor = ThreadPoolExecutor(4)
+    monkeypatch.setattr(jobs, "submit_search", executor.submit)
+    yield
+    executor.shutdown(wait=True)
+
+
+def wait_running(future):
+    deadline = time.monotonic() + 10
+    while not future.running() and not future.done() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.mark.usefixtures("inline_search")
+def test_finished_search_lands_in_the_cache(empty_layout_cache):
+    job = jobs.submit_layout(109, 79, 23.0, 17.0)
+    layout, W, H = job.best()
+    expected, _, _ = optimize_plano(109, 79, 23.0, 17.0, time_budget=5.0)
+    assert len(layout) == len(expected)
+    assert empty_layout_cache.get(job.key)[0] is layout
+    assert not jobs._inflight and len(jobs._free_slots) == jobs.CANCEL_SLOTS
+
+
+@pytest.mark.usefixtures("threaded_search")
+def test_cancel_stops_a_running_search(empty_layout_cache):
+    job = jobs.submit_layout(*SLOW)
+    wait_running(job.future)
+    assert job.future.running()
+    started = time.monotonic()
+    job.cancel()
+    (layout, _, _), finished = job.future.result(timeout=10)
+    assert time.monotonic() - started < 5
+    assert not finished
+    assert empty_layout_cache.get(job.key) is None
+    assert not jobs._inflight and len(jobs._free_slots) == jobs.CANCEL_SLOTS
+
+
+@pytest.mark.usefixtures("threaded_search")
+def test_shared_search_runs_until_its_last_job_cancels():
+    first = jobs.submit_layout(*SLOW)
+    second = jobs.submit_layout(*SLOW)
+    assert second.future is first.future
+    wait_running(first.future)
+    first.cancel()
+    time.sleep(0.2)
+    assert first.future.running()
+    second.cancel()
+    assert not first.future.result(timeout=10)[1]
+
+
+@pytest.mark.usefixtures("threaded_search")
+def test_new_job_after_cancel_starts_a_fresh_search():
+    old = jobs.submit_layout(*SLOW)
+    wait_running(old.future)
+    old.cancel()
+    new = jobs.submit_layout(*SLOW)
+    assert new.future is not old.future
+    new.cancel()
+    new.future.result(timeout=10)
+
+
+@pytest.mark.usefixtures("threaded_search")
+def test_submit_layout_reuses_or_replaces_previous():
+    job = jobs.submit_layout(*SLOW)
+    assert jobs.submit_layout(*SLOW, previous=job) is job
+    wait_running(job.future)
+    other = jobs.submit_layout(109, 79, 23.0, 17.0, previous=job)
+    assert other.key == layout_key(109, 79, 23.0, 17.0) + ("guillotine",)
+    assert not job.future.result(timeout=10)[1]
+    other.future.result(timeout=10)
+
+
+@pytest.mark.usefixtures("inline_search")
+def test_cached_layouts_match_single_searches(empty_layout_cache):
+    sizes = [(109, 79, 23.0, 17.0), (100, 70, 31.0, 19.0), (86, 61, 40.0, 29.0)]
+    layouts = jobs.cached_layouts(sizes)
+    for size, (layout, _, _) in zip(sizes, layouts):
+        assert len(layout) == len(optimize_plano(*size)[0])
+    assert len(empty_layout_cache) == len(sizes)
+    assert jobs.cached_layouts(sizes)[0][0] is layouts[0][0]
+
+
+def test_workers_start_once_without_the_script(tmp_path):
+    """Fork-server workers must not re-run a Streamlit-style __main__ script."""
+    marker = tmp_path / "ran"
+    script = tmp_path / "app.py"
+    script.write_text(f"open({str(marker)!r}, 'a').write('x')\n")
+    code = textwrap.dedent(f"""
+        import sys, types
+        main = types.ModuleType("__main__")
+        main.__file__ = {str(script)!r}
+        sys.modules["__main__"] = main
+        from paperbag import jobs
+        jobs.os.cpu_count = lambda: 3
+        pool = jobs.nesting_pool()
+        job = jobs.LayoutJob(109, 79, 23.0, 17.0)
+        assert job.future.result(timeout=60)[1]
+        print(len(pool._processes))
+    """)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == "3"
+    assert not marker.exists()
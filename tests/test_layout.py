@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from paperbag.layout import LayoutConstraints, PlanoLayout, count_pieces, optimize_plano
+from paperbag.pattern import pattern_size, unit_size
+
+
+def baseline_count(PL_W, PL_H, U_W, U_H):
+    """Pieces and swapped flag as the original app's optimize_plano found them."""
+    def check_layout(W_canvas, H_canvas, W_item, H_item):
+        cols = W_canvas // W_item
+        rows = H_canvas // H_item
+        n = int(rows) * int(cols)
+        sisa_w = W_canvas - (cols * W_item)
+        if sisa_w >= H_item:
+            n += int(H_canvas // W_item) * int(sisa_w // H_item)
+        return n
+
+    n1 = check_layout(PL_W, PL_H, U_W, U_H)
+    n2 = check_layout(PL_H, PL_W, U_W, U_H)
+    return (n1, False) if n1 >= n2 else (n2, True)
+
+
+def random_sizes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    planos = rng.uniform(40, 130, size=(n, 2)).round(1)
+    units = rng.uniform(5, 60, size=(n, 2)).round(1)
+    return np.hstack([planos, units])
+
+
+@pytest.mark.parametrize("sizes", random_sizes(200))
+def test_count_pieces_matches_baseline(sizes):
+    n, swapped = count_pieces(*sizes)
+    assert (int(n), bool(swapped)) == baseline_count(*sizes)
+
+
+def test_count_pieces_vectorized():
+    sizes = random_sizes(500, seed=1)
+    n, swapped = count_pieces(*sizes.T)
+    expected = [baseline_count(*row) for row in sizes]
+    assert n.tolist() == [e[0] for e in expected]
+    assert swapped.tolist() == [e[1] for e in expected]
+
+
+@pytest.mark.parametrize("sizes", random_sizes(50, seed=4))
+def test_grid_layout_places_counted_pieces(sizes):
+    PL_W, PL_H, U_W, U_H = sizes
+    layout, W, H = optimize_plano(PL_W, PL_H, U_W, U_H, "grid")
+    n, swapped = count_pieces(PL_W, PL_H, U_W, U_H)
+    assert len(layout) == len(layout.positions) == int(n)
+    assert (W, H) == ((PL_H, PL_W) if swapped else (PL_W, PL_H))
+
+
+def test_plano_layout_positions_are_read_only():
+    layout = PlanoLayout(109, 79, 50.0, 28.0)
+    with pytest.raises(ValueError):
+        layout.positions['x'][0] = 1.0
+
+
+def test_layout_constraints_validate_and_key():
+    with pytest.raises(ValueError):
+        LayoutConstraints(grain="diagonal")
+    assert LayoutConstraints().free and not LayoutConstraints(gripper=1.0).free
+    # Edge margins only apply with shared gutters
+    assert LayoutConstraints(margins=(1, 1, 1, 1)) == LayoutConstraints()
+    assert LayoutConstraints(gutter=0.3, margins=(1, 1, 1, 1)) != LayoutConstraints(gutter=0.3)
+    assert len({LayoutConstraints(gripper=1.0), LayoutConstraints(gripper=1.00001)}) == 1
+
+
+@pytest.mark.parametrize("constraints", [
+    LayoutConstraints(gripper=1.5),
+    LayoutConstraints(grain="long"),
+    LayoutConstraints(grain="short", gripper=1.0),
+])
+def test_constraints_never_fit_more_than_free_layout(constraints):
+    sizes = random_sizes(300, seed=5)
+    free, _ = count_pieces(*sizes.T)
+    n, _ = count_pieces(*sizes.T, constraints)
+    assert (n <= free).all()
+
+
+@pytest.mark.parametrize("sizes", random_sizes(30, seed=6))
+def test_grain_keeps_height_along_grain(sizes):
+    PL_W, PL_H, U_W, U_H = sizes
+    rules = LayoutConstraints(grain="long", gripper=1.0)
+    layout, W, H = optimize_plano(PL_W, PL_H, U_W, U_H, "grid", constraints=rules)
+    n, _ = count_pieces(PL_W, PL_H, U_W, U_H, rules)
+    assert len(layout) == int(n)
+    assert H == max(PL_W, PL_H)
+    assert not layout.positions['rot'].any()
+
+
+def test_shared_gutters_fit_more_pieces():
+    rules = LayoutConstraints(gutter=0.3, margins=(1.0, 1.0, 1.5, 1.5))
+    pola_w, pola_h = pattern_size(10, 6, 15, 2, 2)
+    with_margins, _ = count_pieces(109, 79, *unit_size(pola_w, pola_h, 1.0, 1.0, 1.5, 1.5))
+    with_gutters, _ = count_pieces(109, 79, *rules.piece_size(pola_w, pola_h, 1.0, 1.0, 1.5, 1.5), rules)
+    assert (int(with_margins), int(with_gutters)) == (8, 9)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from paperbag.layout import LayoutConstraints, count_pieces, optimize_plano, search_plano
+from paperbag.nesting import guillotine_blocks
+
+EPS = 1e-6
+
+
+def random_sizes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    planos = rng.uniform(40, 130, size=(n, 2)).round(1)
+    units = rng.uniform(5, 60, size=(n, 2)).round(1)
+    return np.hstack([planos, units])
+
+
+def assert_valid_placement(layout, W, H, left=0.0, bottom=0.0, right=0.0, top=0.0, gap=0.0):
+    """Every piece inside the sheet's clear area and at least ``gap`` from its neighbours."""
+    pos = layout.positions
+    assert len(pos) == len(layout)
+    x0, y0 = pos['x'], pos['y']
+    x1, y1 = x0 + pos['w'], y0 + pos['h']
+    assert (x0 >= left - EPS).all() and (y0 >= bottom - EPS).all()
+    assert (x1 <= W - right + EPS).all() and (y1 <= H - top + EPS).all()
+
+    apart_x = (x1[:, None] + gap <= x0[None, :] + EPS) | (x1[None, :] + gap <= x0[:, None] + EPS)
+    apart_y = (y1[:, None] + gap <= y0[None, :] + EPS) | (y1[None, :] + gap <= y0[:, None] + EPS)
+    overlap = ~(apart_x | apart_y)
+    np.fill_diagonal(overlap, False)
+    assert not overlap.any()
+
+
+@pytest.mark.parametrize("sizes", random_sizes(40, seed=2))
+def test_guillotine_layout_in_bounds_without_overlaps(sizes):
+    PL_W, PL_H, U_W, U_H = sizes
+    layout, W, H = optimize_plano(PL_W, PL_H, U_W, U_H, "guillotine", time_budget=5.0)
+    grid, _, _ = optimize_plano(PL_W, PL_H, U_W, U_H, "grid")
+    assert len(layout) >= len(grid)
+    assert_valid_placement(layout, W, H)
+
+
+def test_guillotine_beats_grid_somewhere():
+    better = 0
+    for PL_W, PL_H, U_W, U_H in random_sizes(40, seed=2):
+        layout, _, _ = optimize_plano(PL_W, PL_H, U_W, U_H, "guillotine", time_budget=5.0)
+        grid, _, _ = optimize_plano(PL_W, PL_H, U_W, U_H, "grid")
+        better += len(layout) > len(grid)
+    assert better > 0
+
+
+def test_guillotine_blocks_count_matches_blocks():
+    count, blocks = guillotine_blocks(109, 79, 23.0, 17.0, time_budget=5.0)
+    assert count == sum(c * r for _, _, c, r, _ in blocks)
+
+
+def test_guillotine_without_rotation_keeps_pieces_upright():
+    count, blocks = guillotine_blocks(109, 79, 23.0, 17.0, time_budget=5.0, rotate=False)
+    assert count == (109 // 23) * (79 // 17)
+    assert not any(rot for *_, rot in blocks)
+
+
+def test_piece_larger_than_sheet():
+    assert guillotine_blocks(50, 40, 60.0, 45.0) == (0, [])
+
+
+def test_search_reports_timeout():
+    (layout, W, H), finished = search_plano(109, 79, 3.1, 2.3, "guillotine", time_budget=0.0)
+    assert not finished
+    grid = optimize_plano(109, 79, 3.1, 2.3, "grid")
+    assert len(layout) == len(grid[0]) and (W, H) == grid[1:]
+    assert search_plano(109, 79, 23.0, 17.0, "grid")[1]
+
+
+@pytest.mark.parametrize("constraints", [
+    LayoutConstraints(gripper=1.5),
+    LayoutConstraints(grain="long", gripper=1.0),
+    LayoutConstraints(gutter=0.3, margins=(1.0, 1.0, 1.5, 1.5)),
+])
+@pytest.mark.parametrize("sizes", random_sizes(15, seed=3))
+def test_constrained_guillotine_layout_in_bounds_without_overlaps(sizes, constraints):
+    PL_W, PL_H, U_W, U_H = sizes
+    layout, W, H = optimize_plano(PL_W, PL_H, U_W, U_H, "guillotine", time_budget=5.0,
+                                  constraints=constraints)
+    frame = next(f for f in constraints.frames(PL_W, PL_H) if (float(f[0]), float(f[1])) == (W, H))
+    left, bottom, right, top = (float(v) for v in frame[2:6])
+    assert_valid_placement(layout, W, H, left, bottom, right, top, constraints.gap)
+    if constraints.grain is not None:
+        assert not layout.positions['rot'].any()
+    n, _ = count_pieces(PL_W, PL_H, U_W, U_H, constraints)
+    assert len(layout) >= int(n)
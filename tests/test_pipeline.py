@@ -0,0 +1,138 @@
+import pytest
+
+from paperbag.layout import LayoutConstraints
+from paperbag.pipeline import CALCULATOR, Graph, Pipeline
+
+COST_ITEMS = [
+    {"name": "Paper Ivory 250gsm", "basis": "Per Plano Sheet", "price": 5000, "batch": 1},
+    {"name": "Offset Printing", "basis": "Per Batch (Multiple Pcs)", "price": 450000, "batch": 2000},
+    {"name": "Rope & Assembly", "basis": "Per Pcs Bag", "price": 700, "batch": 1},
+]
+
+INPUTS = dict(
+    P=15.0, L=8.0, T=20.0, lem=2.0, top_lip=2.0, qty=1000,
+    m_top=1.0, m_bottom=1.0, m_left=1.5, m_right=1.5,
+    layout_rules=LayoutConstraints(), production=None,
+    plano_catalog=None, plano_w=109.0, plano_h=79.0,
+    base_cost_items=COST_ITEMS,
+    paper_item=("name", "price", "Paper Plano", "Per Plano Sheet"),
+    subtotal_label="Subtotal ($)",
+    margin_type="Percentage (%)", margin_val=30.0,
+)
+
+VOLATILE = {name for name, node in CALCULATOR.nodes.items() if node.volatile}
+
+
+@pytest.fixture
+def pipe(inline_search):
+    pipe = Pipeline(CALCULATOR)
+    pipe.update(**INPUTS)
+    pipe.get("price")
+    return pipe
+
+
+def rerun(pipe, **changes):
+    """Names of the non-volatile nodes evaluated by a rerun with these inputs."""
+    before = dict(pipe.evaluations)
+    pipe.update(**dict(INPUTS, **changes))
+    pipe.get("price")
+    return {name for name, n in pipe.evaluations.items() if n != before[name]} - VOLATILE
+
+
+def test_margin_change_reruns_only_profit_and_price(pipe):
+    costs = pipe.get("costs")
+    assert rerun(pipe, margin_val=40.0) == {"profit", "price"}
+    assert pipe.get("costs") is costs
+    assert pipe.get("profit") == pytest.approx(costs[0] * 0.4)
+
+
+def test_unchanged_inputs_rerun_nothing(pipe):
+    assert rerun(pipe) == set()
+
+
+def test_qty_change_reruns_costs(pipe):
+    assert {"plan", "costs", "profit", "price"} <= rerun(pipe, qty=5000)
+    assert pipe.get("total_plano_req") == -(-5000 // pipe.get("pcs_per_plano"))
+
+
+def test_price_breaks_hang_off_the_calculator(pipe):
+    pipe.update(pb_qtys=[1000, 2000, 5000])
+    breaks = pipe.get("price_breaks")
+    assert breaks['table']['unit_price'][0] == pytest.approx(pipe.get("price")[1])
+    # The printing batch of 2000 starts a new step
+    assert breaks['step_qty'].tolist() == [2001, 4001]
+    pipe.get("price_breaks")
+    assert pipe.evaluations["price_breaks"] == 1
+    pipe.update(margin_val=40.0)
+    pipe.get("price_breaks")
+    assert pipe.evaluations["price_breaks"] == 2
+    assert pipe.evaluations["costs"] == 1
+
+
+def test_min_qty_meets_the_target(pipe):
+    unit_price = pipe.get("price")[1]
+    pipe.update(target_price=unit_price)
+    assert 0 < pipe.get("min_qty") <= 1000
+    pipe.update(target_price=1.0)
+    assert pipe.get("min_qty") is None
+
+
+def test_catalog_picks_a_sheet(inline_search):
+    pipe = Pipeline(CALCULATOR)
+    catalog = [{"name": "65 × 90", "w": 65.0, "h": 90.0, "price": 3000},
+               {"name": "79 × 109", "w": 79.0, "h": 109.0, "price": 5000}]
+    pipe.update(**dict(INPUTS, plano_catalog=catalog, plano_w=None, plano_h=None))
+    best = pipe.get("plano_ranking")[0]
+    assert pipe.get("sheet") == (best['plano_w'], best['plano_h'])
+    paper = [item for item in pipe.get("cost_items") if item["name"].startswith("Paper Plano")]
+    assert [item["price"] for item in paper] == [best['price']]
+    assert not any(item["name"].startswith("Paper Ivory") for item in pipe.get("cost_items"))
+
+
+def test_equal_result_stops_the_change():
+    graph = Graph()
+
+    @graph.node("x")
+    def parity(x):
+        return x % 2
+
+    @graph.node("parity")
+    def label(parity):
+        return "odd" if parity else "even"
+
+    pipe = Pipeline(graph)
+    pipe.update(x=1)
+    assert pipe.get("label") == "odd"
+    pipe.update(x=3)
+    assert pipe.get("label") == "odd"
+    assert pipe.evaluations == {"parity": 2, "label": 1}
+    assert graph.inputs == ["x"]
+
+
+def test_volatile_and_stateful_nodes():
+    graph = Graph()
+    outside = []
+
+    @graph.node("x", volatile=True, stateful=True)
+    def seen(x, previous=None):
+        return (previous or ()) + (len(outside),)
+
+    pipe = Pipeline(graph)
+    pipe.update(x=1)
+    assert pipe.get("seen") == (0,)
+    assert pipe.get("seen") == (0,)
+    outside.append(1)
+    pipe.update(x=1)
+    assert pipe.get("seen") == (0, 1)
+
+
+def test_inputs_are_checked():
+    pipe = Pipeline(CALCULATOR)
+    with pytest.raises(ValueError):
+        pipe.update(price=1.0)
+    pipe.update(P=15.0)
+    with pytest.raises(KeyError):
+        pipe.get("pattern")
+    with pytest.raises(KeyError):
+        pipe.get("nonexistent")
+    assert pipe.last("price", "none yet") == "none yet"
@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+from paperbag.costs import calculate_costs, calculate_profit
+from paperbag.pricebreak import cost_steps, fill_up_qty, parse_quantities, price_curve
+from paperbag.production import ProductionRules
+
+COST_ITEMS = [
+    {"name": "Paper Ivory 250gsm", "basis": "Per Plano Sheet", "price": 5000, "batch": 1},
+    {"name": "Offset Printing", "basis": "Per Batch (Multiple Pcs)", "price": 450000, "batch": 2000},
+    {"name": "Varnish", "basis": "Per Batch (Multiple Pcs)", "price": 90000, "batch": 500},
+    {"name": "Rope & Assembly", "basis": "Per Pcs Bag", "price": 700, "batch": 1},
+]
+AREA = 1081.25
+
+
+def brute_steps(q_min, q_max, pcs, overs=0.0, batches=(2000, 500)):
+    """(qty, kind) of every step in [q_min, q_max], one quantity at a time."""
+    def net_sheets(q):
+        return math.ceil(math.ceil(q * (1 + overs / 100) - 1e-9) / pcs)
+
+    steps = []
+    for q in range(q_min, q_max + 1):
+        if net_sheets(q) > net_sheets(q - 1):
+            steps.append((q, "sheet"))
+        for b in sorted(batches):
+            if (q - 1) % b == 0:
+                steps.append((q, f"batch {b}"))
+    return steps
+
+
+def test_parse_quantities():
+    assert parse_quantities("1.000, 2000, 5k, 5000, abc, -3, 0") == [1000, 2000, 5000]
+    assert parse_quantities("") == []
+
+
+def test_price_curve_matches_single_quotes():
+    qtys = [100, 999, 1000, 2001, 10000]
+    curve = price_curve(qtys, 4, AREA, COST_ITEMS, "Percentage (%)", 30)
+    for i, qty in enumerate(qtys):
+        sheets = math.ceil(qty / 4)
+        cost, _ = calculate_costs(COST_ITEMS, qty, sheets, AREA)
+        assert curve['total_plano_req'][i] == sheets
+        assert curve['production_cost'][i] == pytest.approx(cost)
+        selling = cost + calculate_profit(cost, qty, "Percentage (%)", 30)
+        assert curve['unit_price'][i] == pytest.approx(selling / qty)
+
+
+@pytest.mark.parametrize("q_min, q_max", [(1, 5000), (501, 4001), (502, 4000), (2000, 2001), (9, 9)])
+@pytest.mark.parametrize("pcs, overs", [(4, 0.0), (7, 0.0), (4, 3.0), (6, 12.5)])
+def test_cost_steps_match_brute_force(q_min, q_max, pcs, overs):
+    production = ProductionRules(overs=overs) if overs else None
+    qty, kind = cost_steps(q_min, q_max, pcs, COST_ITEMS, production=production)
+    found = sorted(zip(qty.tolist(), kind.tolist()))
+    assert found == sorted(brute_steps(q_min, q_max, pcs, overs))
+
+
+def test_cost_steps_without_sheet_costs():
+    items = [item for item in COST_ITEMS if item["basis"] != "Per Plano Sheet"]
+    qty, kind = cost_steps(1, 5000, 4, items)
+    assert set(kind) == {"batch 500", "batch 2000"}
+    qty, kind = cost_steps(1, 5000, 4, COST_ITEMS, include_sheets=False)
+    assert "sheet" not in set(kind)
+    qty, kind = cost_steps(1, 5000, 4, [])
+    assert len(qty) == 0 and len(kind) == 0
+
+
+def test_cost_jumps_only_at_steps():
+    qty = np.arange(100, 5001)
+    cost = price_curve(qty, 4, AREA, COST_ITEMS, "Percentage (%)", 30)['production_cost']
+    # Between steps one more bag only adds its per-pcs cost
+    jumps = qty[1:][np.diff(cost) > 700 + 1e-6]
+    steps, _ = cost_steps(101, 5000, 4, COST_ITEMS)
+    assert jumps.tolist() == np.unique(steps).tolist()
+
+
+def test_fill_up_qty():
+    assert fill_up_qty(np.array([1, 4, 5, 1001]), 4).tolist() == [4, 4, 8, 1004]
+    rules = ProductionRules(overs=5.0)
+    filled = fill_up_qty(np.array([1000, 1234]), 4, rules)
+    assert (rules.sheets(filled, 4) == rules.sheets(np.array([1000, 1234]), 4)).all()
+    assert (rules.sheets(filled + 1, 4) > rules.sheets(filled, 4)).all()
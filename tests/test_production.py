@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from paperbag.production import ProductionRules, batch_run_size, plan_production, plano_sheets
+
+PROCESSES = [
+    {"name": "Offset Printing", "make_ready": 100, "spoilage": 2.0},
+    {"nama": "Die-Cutting", "make_ready": 30, "spoilage": 1.5},
+]
+
+
+def test_plan_works_spoilage_backwards():
+    rules = ProductionRules(PROCESSES, overs=2, run_size=500)
+    plan = rules.plan(1000, 4)
+    assert rules.names == ("Offset Printing", "Die-Cutting")
+    assert int(plan['good_pcs']) == 1020
+    assert int(plan['net_sheets']) == 255
+    assert int(plan['runs']) == 2
+    # Die-cutting spoils 1.5% of 255 good sheets, then the press 2% of what it feeds the die-cutter
+    assert plan['spoilage'].tolist() == [7, 4]
+    assert plan['make_ready'].tolist() == [200, 60]
+    assert int(plan['total_plano_req']) == 255 + 4 + 60 + 7 + 200
+    assert int(plan['sheets_per_run']) == 263
+
+
+def test_plan_is_vectorized():
+    rules = ProductionRules(PROCESSES, overs=3, run_size=2000)
+    qty = np.array([500, 1000, 5000, 20000])
+    pcs = np.array([[4], [6]])
+    plan = rules.plan(qty, pcs)
+    assert plan['total_plano_req'].shape == (2, 4)
+    assert plan['make_ready'].shape == (2, 4, 2)
+    for i, p in enumerate(pcs[:, 0]):
+        for j, q in enumerate(qty):
+            assert plan['total_plano_req'][i, j] == rules.plan(q, p)['total_plano_req']
+
+
+def test_free_rules_are_plain_ceil():
+    rules = ProductionRules()
+    assert rules.free
+    assert rules.sheets(1001, 4) == 251
+    assert plano_sheets(1001, 4) == 251
+    assert int(plan_production(1001, 4)['total_plano_req']) == 251
+    assert not ProductionRules(overs=1).free
+    assert not ProductionRules([{"name": "Print", "make_ready": 50}]).free
+
+
+def test_sheets_and_plano_sheets_agree():
+    rules = ProductionRules(PROCESSES, overs=2, run_size=500)
+    qty = np.arange(100, 20000, 337)
+    assert (plano_sheets(qty, 6, rules) == rules.plan(qty, 6)['total_plano_req']).all()
+    assert (plano_sheets(qty, 6, rules) >= plano_sheets(qty, 6)).all()
+
+
+def test_runs():
+    assert ProductionRules().runs([1, 50000]).tolist() == [1, 1]
+    assert ProductionRules(run_size=2000).runs([1, 2000, 2001]).tolist() == [1, 1, 2]
+
+
+def test_fill_up_keeps_the_same_sheets_and_runs():
+    rules = ProductionRules(PROCESSES, overs=2, run_size=500)
+    for qty in (1, 333, 999, 1000, 1234):
+        most = int(rules.fill_up(qty, 4))
+        assert most >= qty
+        assert rules.sheets(most, 4) == rules.sheets(qty, 4)
+        assert rules.sheets(most + 1, 4) > rules.sheets(qty, 4)
+
+
+def test_negative_rules_are_rejected():
+    with pytest.raises(ValueError):
+        ProductionRules([{"name": "Print", "make_ready": -1, "spoilage": 0}])
+    with pytest.raises(ValueError):
+        ProductionRules([{"name": "Print", "make_ready": 0, "spoilage": -2}])
+
+
+def test_key_equality():
+    assert ProductionRules(PROCESSES, 2, 500) == ProductionRules(PROCESSES, 2.0, 500.0)
+    assert ProductionRules(PROCESSES, 2, 500) != ProductionRules(PROCESSES, 2, 1000)
+    assert len({ProductionRules(PROCESSES), ProductionRules(list(PROCESSES))}) == 1
+    assert ProductionRules(run_size=0).run_size is None
+
+
+def test_batch_run_size():
+    items = [
+        {"name": "Paper", "basis": "Per Plano Sheet", "price": 5000, "batch": 1},
+        {"name": "Screen", "basis": "Per Batch (Multiple Pcs)", "price": 90000, "batch": 1000},
+        {"nama": "Film", "basis": "Per Batch (Kelipatan Pcs)", "harga": 50000, "batch": 3000},
+    ]
+    assert batch_run_size(items) == 3000
+    assert batch_run_size(items[:1]) is None
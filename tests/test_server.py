@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from paperbag.quote import quote_batch
+from paperbag.server import QuoteService, RequestError, parse_constraints, parse_spec
+
+COST_ITEMS = [
+    {"name": "Ivory Paper 250gsm", "basis": "Per Plano Sheet", "price": 5000, "batch": 1},
+    {"name": "Rope & Assembly", "basis": "Per Pcs Bag", "price": 700, "batch": 1},
+]
+
+
+@pytest.fixture
+def service(empty_layout_cache):
+    service = QuoteService(COST_ITEMS, method="grid", workers=2)
+    yield service
+    service.close()
+
+
+async def request(port, raw):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), body
+
+
+def serve(service, *raws):
+    """Status and body for each raw request, sent over fresh connections to a live server."""
+    async def main():
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return [await request(port, raw) for raw in raws]
+    return asyncio.run(main())
+
+
+def get(path):
+    return f"GET {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n".encode()
+
+
+def post(path, body, length=None):
+    body = body.encode()
+    length = len(body) if length is None else length
+    return f"POST {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {length}\r\nConnection: close\r\n\r\n".encode() + body
+
+
+def test_parse_spec_fills_defaults_and_rejects_bad_values():
+    spec = parse_spec({"P": "15", "L": "8", "T": "20", "qty": "1000"})
+    assert spec["P"] == 15.0 and spec["plano_w"] == 109.0
+    assert "qty" not in parse_spec({"P": 15, "L": 8, "T": 20}, with_qty=False)
+    for params in ({"L": 8, "T": 20, "qty": 1}, {"P": "x", "L": 8, "T": 20, "qty": 1},
+                   {"P": -1, "L": 8, "T": 20, "qty": 1}, {"P": 15, "L": 8, "T": 20, "qty": 0},
+                   {"P": "inf", "L": 8, "T": 20, "qty": 1}):
+        with pytest.raises(RequestError):
+            parse_spec(params)
+
+
+def test_parse_constraints():
+    spec = parse_spec({"P": 15, "L": 8, "T": 20, "qty": 1000})
+    assert parse_constraints({}, spec).free
+    rules = parse_constraints({"grain": "long", "gripper": "1.2", "gutter": "0.3"}, spec)
+    assert (rules.grain, rules.gripper, rules.gutter) == ("long", 1.2, 0.3)
+    assert rules.margins == (spec["m_top"], spec["m_bottom"], spec["m_left"], spec["m_right"])
+    with pytest.raises(RequestError):
+        parse_constraints({"grain": "diagonal"}, spec)
+
+
+def test_quote_matches_quote_batch(service):
+    (status, body), = serve(service, get("/quote?P=15&L=8&T=20&qty=1000"))
+    assert status == 200
+    quote = json.loads(body)
+    expected = quote_batch({"P": [15], "L": [8], "T": [20], "qty": [1000]}, COST_ITEMS,
+                           "Percentage (%)", 30.0, "grid")
+    assert quote["pcs_per_plano"] == int(expected["pcs_per_plano"][0])
+    assert quote["unit_price"] == pytest.approx(float(expected["unit_price"][0]))
+    assert quote["valid"] is True
+
+
+def test_layout_post_and_health(service):
+    (status, body), (health, ok) = serve(
+        service, post("/layout", '{"P": 15, "L": 8, "T": 20, "grain": "long"}'), get("/health")
+    )
+    assert status == 200
+    layout = json.loads(body)
+    assert sum(b["cols"] * b["rows"] for b in layout["blocks"]) == layout["pcs_per_plano"] > 0
+    assert not any(b["rot"] for b in layout["blocks"])
+    assert (health, json.loads(ok)) == (200, {"status": "ok"})
+
+
+@pytest.mark.parametrize("raw", [
+    get("/quote?P=15&L=8&T=20"),
+    get("/quote?P=abc&L=8&T=20&qty=1000"),
+    post("/quote", "[1, 2]"),
+    post("/quote", "{not json"),
+    get("/mockup?P=15&L=8&T=20&lod=ultra"),
+])
+def test_bad_spec_is_400(service, raw):
+    (status, body), = serve(service, raw)
+    assert status == 400
+    assert json.loads(body)["error"]
+
+
+def test_malformed_requests(service):
+    responses = serve(
+        service,
+        post("/quote", "", length=-5),
+        b"GARBAGE\r\n\r\n",
+        post("/quote", "{}", length=10 ** 9),
+        get("/nowhere"),
+        b"DELETE /quote HTTP/1.1\r\nConnection: close\r\n\r\n",
+    )
+    assert [status for status, _ in responses] == [400, 400, 413, 404, 405]
+
+
+def test_identical_requests_share_one_computation(service):
+    calls = []
+    release = threading.Event()
+
+    def slow(value):
+        calls.append(value)
+        release.wait(5)
+        return {"value": value}
+
+    async def main():
+        first = asyncio.ensure_future(service.compute(("slow", 1), slow, (1,)))
+        second = asyncio.ensure_future(service.compute(("slow", 1), slow, (1,)))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await first, await second, await service.compute(("slow", 1), slow, (1,))
+
+    bodies = asyncio.run(main())
+    assert calls == [1]
+    assert bodies == (b'{"value":1}',) * 3
+
+
+def test_busy_server_answers_503(empty_layout_cache):
+    service = QuoteService(COST_ITEMS, method="grid", workers=1, max_pending=0)
+    (status, body), = serve(service, get("/quote?P=15&L=8&T=20&qty=1000"))
+    service.close()
+    assert status == 503
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from paperbag.pricebreak import price_curve
+from paperbag.production import ProductionRules
+from paperbag.quote import quote_batch
+from paperbag.solver import _grid, bag_frontier, min_qty_for_price, pareto_front
+
+COST_ITEMS = [
+    {"name": "Paper Ivory 250gsm", "basis": "Per Plano Sheet", "price": 5000, "batch": 1},
+    {"name": "Offset Printing", "basis": "Per Batch (Multiple Pcs)", "price": 450000, "batch": 2000},
+    {"name": "Rope & Assembly", "basis": "Per Pcs Bag", "price": 700, "batch": 1},
+]
+AREA_ITEM = {"name": "Lamination", "basis": "Per Area (cm2)", "price": 0.35, "batch": 1}
+RANGES = dict(P_range=(10, 20), L_range=(6, 10), T_range=(15, 25), qtys=[1000, 5000], step=1.0)
+
+
+def test_pareto_front_keeps_only_unbeaten_points():
+    rng = np.random.default_rng(0)
+    volume = rng.integers(1, 50, 300).astype(float)
+    price = rng.integers(1, 50, 300).astype(float)
+    front = set(pareto_front(volume, price).tolist())
+    for i in range(len(volume)):
+        beaten = ((volume >= volume[i]) & (price <= price[i]) & ((volume > volume[i]) | (price < price[i]))).any()
+        if i in front:
+            assert not beaten
+        elif not beaten:
+            # An exact duplicate of a frontier point
+            assert any(volume[j] == volume[i] and price[j] == price[i] for j in front)
+
+
+def brute_frontier(cost_items):
+    P, L, T, Q = np.meshgrid(_grid(10, 20, 1.0), _grid(6, 10, 1.0), _grid(15, 25, 1.0),
+                             [1000.0, 5000.0], indexing='ij')
+    specs = {'P': P.ravel(), 'L': L.ravel(), 'T': T.ravel(), 'qty': Q.ravel()}
+    result = quote_batch(specs, cost_items, "Percentage (%)", 30.0)
+    idx = np.nonzero(result['valid'])[0]
+    volume = (P * L * T).ravel()
+    front = idx[pareto_front(volume[idx], result['unit_price'][idx])]
+    return sorted(zip(volume[front].round(6), result['unit_price'][front].round(6)))
+
+
+@pytest.mark.parametrize("cost_items", [COST_ITEMS, COST_ITEMS + [AREA_ITEM]])
+def test_frontier_matches_the_unpruned_grid(cost_items):
+    front = bag_frontier(cost_items, **RANGES)
+    assert sorted(zip(front['volume_cm3'].round(6), front['unit_price'].round(6))) == brute_frontier(cost_items)
+    assert (np.diff(front['unit_price']) >= 0).all()
+    assert (np.diff(front['volume_cm3']) > 0).all()
+
+
+@pytest.mark.parametrize("production", [None, ProductionRules(overs=3.0)])
+def test_min_qty_for_price(production):
+    curve = price_curve(np.arange(1, 20001), 4, 1081.25, COST_ITEMS, "Percentage (%)", 30, production)
+    target = float(curve['unit_price'][4999])
+    q = min_qty_for_price(target, 4, 1081.25, COST_ITEMS, q_max=20000, production=production)
+    assert curve['unit_price'][q - 1] <= target
+    assert (curve['unit_price'][:q - 1] > target).all()
+    assert min_qty_for_price(1.0, 4, 1081.25, COST_ITEMS, q_max=20000, production=production) is None
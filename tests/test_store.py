@@ -0,0 +1,85 @@
+import itertools
+
+import pytest
+
+from paperbag import store as store_module
+from paperbag.layout import BlockLayout, PlanoLayout
+from paperbag.store import ResultStore, decode_layout, encode_layout, spec_hash
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # One tick per call, so "most recently used" is never a tie
+    clock = itertools.count(1000.0)
+    monkeypatch.setattr(store_module.time, "time", lambda: next(clock))
+    result = ResultStore(str(tmp_path / "store.sqlite3"), max_layouts=3)
+    yield result
+    result.close()
+
+
+def test_layouts_round_trip(store):
+    grid = PlanoLayout(109, 79, 23.0, 17.0)
+    blocks = BlockLayout(109, 79, 23.0, 17.0, [(0.0, 0.0, 4, 2, False), (0.0, 34.0, 3, 2, True)], 0.3)
+    store.put((109.0, 79.0, 23.0, 17.0, "grid"), (grid, 104.0, 74.0))
+    store.put((109.0, 79.0, 23.0, 17.0, "guillotine"), blocks)
+
+    layout, final_w, final_h = store.get((109.0, 79.0, 23.0, 17.0, "grid"))
+    assert isinstance(layout, PlanoLayout) and (final_w, final_h) == (104.0, 74.0)
+    assert (layout.positions == grid.positions).all()
+    again = store.get((109.0, 79.0, 23.0, 17.0, "guillotine"))
+    assert again.blocks == blocks.blocks and again.gap == 0.3
+    assert store.get(("missing",), "default") == "default"
+
+
+def test_encode_layout_keeps_grid_compact():
+    data = encode_layout(PlanoLayout(109, 79, 23.0, 17.0))
+    assert data == {"canvas": [109, 79], "item": [23.0, 17.0], "kind": "grid"}
+    assert len(decode_layout(data)) == len(PlanoLayout(109, 79, 23.0, 17.0))
+
+
+def test_prune_drops_least_recently_used(store):
+    for i in range(4):
+        store.put(("size", i), PlanoLayout(100, 70, 10.0 + i, 10.0))
+    store.get(("size", 0))
+    assert store.prune_layouts() == 1
+    assert store.get(("size", 1)) is None
+    assert [key for key, _ in store.recent_layouts(10)] == [("size", 0), ("size", 3), ("size", 2)]
+
+
+def test_store_reopens_with_its_data(tmp_path):
+    path = str(tmp_path / "nested" / "store.sqlite3")
+    first = ResultStore(path)
+    first.put(("size",), PlanoLayout(100, 70, 10.0, 10.0))
+    first.save_catalog("cost_items", [{"name": "Paper", "price": 5000}])
+    first.close()
+
+    second = ResultStore(path, max_layouts=None)
+    assert len(second.get(("size",))) == len(PlanoLayout(100, 70, 10.0, 10.0))
+    assert second.load_catalog("cost_items") == [{"name": "Paper", "price": 5000}]
+    assert second.load_catalog("missing", []) == []
+    second.close()
+
+
+def test_spec_hash_covers_costs_and_margin():
+    spec = {"P": 15, "L": 8, "T": 20, "qty": 1000}
+    items = [{"name": "Paper", "price": 5000}]
+    digest = spec_hash(spec, items, "Percentage (%)", 30)
+    assert digest == spec_hash(dict(reversed(list(spec.items()))), items, "Percentage (%)", 30)
+    assert digest != spec_hash(spec, items, "Percentage (%)", 35)
+    assert digest != spec_hash(spec, [{"name": "Paper", "price": 5500}], "Percentage (%)", 30)
+    assert digest != spec_hash({**spec, "layout_rules": ["long", 1.0, None, 1, 1, 1, 1]}, items, "Percentage (%)", 30)
+
+
+def test_quotes_found_by_hash_latest_first(store):
+    spec = {"P": 15, "L": 8, "T": 20, "qty": 1000}
+    items = [{"name": "Paper", "price": 5000}]
+    digest = store.save_quote(spec, {"unit_price": 1200}, items, "Percentage (%)", 30)
+    assert store.save_quote(spec, {"unit_price": 1100}, items, "Percentage (%)", 30) == digest
+    store.save_quote({**spec, "qty": 5000}, {"unit_price": 900}, items, "Percentage (%)", 30)
+
+    found = store.find_quote(digest)
+    assert found["result"] == {"unit_price": 1100}
+    assert found["spec"] == spec and found["costs"] == items and found["margin"] == ["Percentage (%)", 30]
+    assert store.find_quote(spec_hash(spec)) is None
+    assert [q["result"]["unit_price"] for q in store.recent_quotes()] == [900, 1100, 1200]
+    assert len(store.recent_quotes(limit=1)) == 1